@@ -1,22 +1,72 @@
-from flask import Flask, jsonify, request, render_template, session, redirect, url_for
+from flask import Flask, jsonify, request, render_template, session, redirect, url_for, g, Response, abort
+from flask import send_from_directory, stream_with_context
+from flask import has_request_context, before_render_template, template_rendered
 import psycopg2
 from psycopg2 import extras
 import os
 import datetime
 import uuid
+import time
+import threading
+import re
+import sys
+import random
+import hashlib
+import math
+import collections
+import hmac
+import io
+import cProfile
+import json
+import queue
+import select
+import pstats
+import fcntl
 from werkzeug.utils import secure_filename
 from decimal import Decimal
 
 from typing import Optional, List
 from functools import wraps
+from contextlib import contextmanager
 
 app = Flask(__name__)
 
-# --- 세션 사용을 위한 secret_key 설정 ---
-app.secret_key = os.urandom(24)
 
-# --- 임시 관리자 인증 번호 ---
-ADMIN_AUTH_CODE = "ADMIN4567"
+# 비밀 값 읽기: 환경 변수 NAME, 없으면 NAME_FILE이 가리키는 파일 내용 (Docker/K8s secret 마운트용)
+def read_secret(name, default=None):
+    value = os.environ.get(name)
+    if value:
+        return value
+    secret_file = os.environ.get(f"{name}_FILE")
+    if secret_file:
+        with open(secret_file, encoding='utf-8') as f:
+            return f.read().strip()
+    return default
+
+
+# --- 세션 사용을 위한 secret_key 설정 ---
+# 모든 워커/노드가 같은 키를 써야 한 워커에서 발급한 세션이 다른 워커와 재시작 후에도 유효함
+# 외부에서 주어지지 않으면 개발용으로 임의 키를 생성 (프로세스마다 달라짐)
+app.config['SECRET_KEY_EXTERNAL'] = bool(read_secret('SECRET_KEY'))
+app.secret_key = read_secret('SECRET_KEY') or os.urandom(24)
+
+# --- 관리자 가입 인증 번호 ---
+# 기본값은 개발용 (운영에서는 create_app(require_secret=True)가 기본값인 채로 시작하지 않음)
+DEFAULT_ADMIN_AUTH_CODE = 'ADMIN4567'
+app.config['ADMIN_AUTH_CODE'] = read_secret('ADMIN_AUTH_CODE', DEFAULT_ADMIN_AUTH_CODE)
+
+# --- DB 접속 설정 ---
+app.config['DB_HOST'] = os.environ.get('DB_HOST', '127.0.0.1')
+app.config['DB_PORT'] = os.environ.get('DB_PORT', '5432')
+app.config['DB_NAME'] = os.environ.get('DB_NAME', 'project2025')
+app.config['DB_USER'] = os.environ.get('DB_USER', 'db2025')
+app.config['DB_PASSWORD'] = read_secret('DB_PASSWORD', 'db!2025')
+
+# --- 읽기 전용 복제본(streaming replica) 설정 ---
+# 쉼표로 구분한 libpq 접속 문자열 목록 (예: "host=10.0.0.2 port=5432 dbname=project2025 user=db2025 password=...")
+# 비어 있으면 모든 조회가 primary로 감
+app.config['DB_REPLICA_DSNS'] = [dsn.strip() for dsn in (read_secret('DB_REPLICA_DSNS') or '').split(',') if dsn.strip()]
+app.config['DB_REPLICA_RETRY_INTERVAL'] = float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', '5'))  # 접속 실패한 복제본 제외 시간 (초)
 
 # --- 파일 업로드 설정 (로컬 서버 경로) ---
 UPLOAD_FOLDER = 'static/uploads' # 파일을 저장할 경로 (static/uploads)
@@ -24,6 +74,1076 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# --- 상품별 가격 비교 집계(ProductPriceSummary)의 condition 구분 값 ---
+PRICE_SUMMARY_ALL = '전체'  # 상품 전체 집계 행
+PRICE_SUMMARY_NO_CONDITION = '미표기'  # condition이 없는 Listing(1차 판매 등)의 집계 행
+PRICE_SUMMARY_LOCK_CLASS = 5026  # pg_advisory_xact_lock(PRICE_SUMMARY_LOCK_CLASS, product_id)
+
+# --- 상품 상세 캐시 설정 (초 단위, 0이면 캐시 사용 안 함) ---
+# 무효화는 쓰기를 처리한 워커에서만 일어나므로 다른 워커에서는 최대 TTL(기본 10초)까지 이전 값이 보일 수 있음
+app.config['PRODUCT_DETAIL_CACHE_TTL'] = float(os.environ.get('PRODUCT_DETAIL_CACHE_TTL', '10'))
+app.config['PRODUCT_DETAIL_CACHE_MAX'] = int(os.environ.get('PRODUCT_DETAIL_CACHE_MAX', '2000'))
+
+
+# 프로세스 내 TTL 캐시 (스레드 안전, 워커 프로세스마다 따로 유지됨)
+# generation: 무효화할 때마다 증가. 조회 시작 전에 읽어 두고 set(..., generation=)에 넘기면
+# 조회 도중 무효화가 있었을 때 이전 값을 다시 저장하지 않음
+class TTLCache:
+    def __init__(self, ttl, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._data = {}  # key -> (만료 시각, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ttl=None, generation=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if key not in self._data and len(self._data) >= self.max_entries:
+                self._evict()
+            self._data[key] = (expires_at, value)
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        # value 기준으로 조건에 맞는 항목을 모두 제거
+        with self._lock:
+            self.generation += 1
+            for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def _evict(self):
+        # 1순위: 만료된 항목 제거, 그래도 가득 차 있으면 가장 오래 저장된 항목 제거
+        now = time.monotonic()
+        for key in [k for k, (exp, _) in self._data.items() if exp <= now]:
+            del self._data[key]
+        if len(self._data) >= self.max_entries:
+            del self._data[next(iter(self._data))]
+
+
+# 상품 상세 캐시 (key: listing_id)
+product_detail_cache = TTLCache(app.config['PRODUCT_DETAIL_CACHE_TTL'], app.config['PRODUCT_DETAIL_CACHE_MAX'])
+
+# --- 사용자 프로필 캐시 설정 (마이페이지 상단 프로필, 초 단위, 0이면 캐시 사용 안 함) ---
+# 본인 수정은 세션의 profile_version이 키에 들어가므로 어느 워커에서든 바로 보임
+# 다른 사용자가 일으킨 변경(관리자 피드백 승인에 따른 판매자 등급 등)은 처리한 워커에서만 무효화되므로
+# 다른 워커에서는 최대 TTL(기본 10초)까지 이전 값이 보일 수 있음
+app.config['USER_PROFILE_CACHE_TTL'] = float(os.environ.get('USER_PROFILE_CACHE_TTL', '10'))
+app.config['USER_PROFILE_CACHE_MAX'] = int(os.environ.get('USER_PROFILE_CACHE_MAX', '10000'))
+
+# 사용자 프로필 캐시 (key: (user_id, 세션의 profile_version))
+user_profile_cache = TTLCache(app.config['USER_PROFILE_CACHE_TTL'], app.config['USER_PROFILE_CACHE_MAX'])
+
+# --- 동일 조회 요청 합치기(single-flight) 대기 시간 (초) ---
+app.config['SINGLE_FLIGHT_TIMEOUT'] = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '5'))
+
+
+# 같은 키로 동시에 들어온 조회를 한 번의 DB 실행으로 합치는 클래스
+# 먼저 들어온 요청(leader)만 실제로 실행하고, 나머지는 결과를 기다렸다가 그대로 받음
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # key -> {'done': Event, 'result': ..., 'error': ...}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+
+        if is_leader:
+            try:
+                call['result'] = fn()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                # 완료 후에는 키를 제거하여 다음 요청은 새로 실행 (이후는 캐시가 담당)
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
+        elif not call['done'].wait(timeout):
+            raise TimeoutError(f"single-flight 대기 시간 초과: {key}")
+
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+
+read_flight = SingleFlight()
+
+
+# --- DB 장애 시 마지막 정상 조회 결과(stale) 보관 시간 (초) ---
+app.config['STALE_CACHE_TTL'] = float(os.environ.get('STALE_CACHE_TTL', '3600'))
+app.config['STALE_CACHE_MAX'] = int(os.environ.get('STALE_CACHE_MAX', '5000'))
+
+# 조회 함수별 마지막 정상 결과 (key: single-flight 키와 동일)
+last_good_cache = TTLCache(app.config['STALE_CACHE_TTL'], app.config['STALE_CACHE_MAX'])
+
+# 현재 스레드에서 DB 연결/조회 실패가 있었는지 기록
+# (get_db_connection과, 오류 시 빈 결과를 반환하는 stale_fallback 조회 함수의 except 블록이 설정)
+db_state = threading.local()
+
+
+# 조회 함수를 실행하고, DB 연결/조회에 실패했으면 마지막 정상 결과로 대체
+# 실패 시 반환되는 빈 결과([]/None)는 정상 결과로 저장하지 않음
+# 반환값: (결과, stale 여부)
+def run_with_stale_fallback(key, func, args, kwargs):
+    db_state.failed = False
+    result = func(*args, **kwargs)
+    if not db_state.failed:
+        if result is not None:
+            last_good_cache.set(key, result)
+        return result, False
+
+    stale_result = last_good_cache.get(key)
+    if stale_result is None:
+        return result, False
+    return stale_result, True
+
+
+# 응답이 오래된(stale) 데이터로 만들어졌음을 표시 (템플릿 배너, Warning 헤더)
+def mark_response_stale():
+    g.served_stale = True
+
+
+# 조회 함수용 데코레이터: 같은 인자로 동시에 호출되면 DB 조회를 한 번만 실행
+# timeout_result: 대기 시간 초과 시 반환할 값 (각 함수의 조회 실패 반환값과 동일하게 지정)
+# stale_fallback: DB 연결 실패(차단기 열림 포함) 시 마지막 정상 결과를 대신 반환
+# 복제본을 쓰는 경우 세션의 마지막 쓰기 위치(last_write_lsn)도 키에 포함
+# (방금 쓴 사용자가 그 위치를 모르는 다른 요청이 복제본에서 읽은 결과를 받지 않도록)
+def single_flight(timeout_result=None, stale_fallback=False):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            if stale_fallback:
+                run = lambda: run_with_stale_fallback(key, func, args, kwargs)
+            else:
+                run = lambda: (func(*args, **kwargs), False)
+            flight_key = key
+            if app.config['DB_REPLICA_DSNS'] and has_request_context() and session.get('last_write_lsn'):
+                flight_key = key + (parse_lsn(session['last_write_lsn']),)
+            try:
+                result, is_stale = read_flight.do(flight_key, run, app.config['SINGLE_FLIGHT_TIMEOUT'])
+            except TimeoutError as e:
+                print(f"동시 조회 대기 중 오류: {e}")
+                return timeout_result
+            # 기다린 요청들도 각자 응답에 stale 표시
+            if is_stale:
+                mark_response_stale()
+            return result
+        return wrapper
+    return decorator
+
+
+# --- DB 연결 차단기(circuit breaker) 설정 ---
+app.config['DB_CONNECT_TIMEOUT'] = int(os.environ.get('DB_CONNECT_TIMEOUT', '3'))  # 접속 대기 최대 시간 (초)
+app.config['DB_BREAKER_FAILURE_THRESHOLD'] = int(os.environ.get('DB_BREAKER_FAILURE_THRESHOLD', '5'))  # 연속 실패 허용 횟수
+app.config['DB_BREAKER_PROBE_INTERVAL'] = float(os.environ.get('DB_BREAKER_PROBE_INTERVAL', '5'))  # 복구 확인 주기 (초)
+
+
+# DB 연결 차단기: 연속으로 접속에 실패하면 열림(open) 상태가 되어 이후 요청은 접속을 시도하지 않고 바로 실패
+# 열린 동안에는 백그라운드 스레드가 주기적으로 DB 접속을 시도하고, 성공하면 다시 닫힘(closed)
+class CircuitBreaker:
+    def __init__(self, failure_threshold, probe_interval, probe):
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe = probe  # 복구 확인 함수 (성공 시 True)
+        self.state = 'closed'
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        return self.state != 'open'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state == 'open':
+                print("DB 연결 차단기: DB가 복구되어 다시 연결을 허용합니다.")
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'closed' and self.failures >= self.failure_threshold:
+                self.state = 'open'
+                print(f"DB 연결 차단기: 연속 {self.failures}회 실패로 연결을 차단합니다.")
+                threading.Thread(target=self._probe_loop, name='db-breaker-probe', daemon=True).start()
+
+    def _probe_loop(self):
+        while self.state == 'open':
+            time.sleep(self.probe_interval)
+            try:
+                if self.probe():
+                    self.record_success()
+            except Exception as e:
+                print(f"DB 연결 차단기: 복구 확인 실패 ({e})")
+
+
+# --- 성능 지표(metrics) 수집 설정 ---
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+# 응답에 Server-Timing 헤더(연결/쿼리 구간/템플릿/전체 시간)를 붙일지 여부
+app.config['SERVER_TIMING_ENABLED'] = os.environ.get('SERVER_TIMING_ENABLED', '0') == '1'
+
+# 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 요청당 쿼리/연결 수 히스토그램 구간
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+# Prometheus 텍스트 형식의 라벨 값 이스케이프 (\, ", 줄바꿈)
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Prometheus 텍스트 형식의 라벨 문자열 생성
+def format_metric_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+# 누적 카운터 (라벨 조합별)
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def copy_values(self):
+        with self._lock:
+            return dict(self._values)
+
+    # 파일 저장용 (JSON 목록: [라벨 값 목록, 값])
+    def snapshot(self, values=None):
+        values = self.copy_values() if values is None else values
+        return [[list(label_values), value] for label_values, value in values.items()]
+
+    # 다른 워커의 snapshot을 values에 더함
+    def merge(self, values, entries):
+        for label_values, value in entries:
+            key = tuple(label_values)
+            values[key] = values.get(key, 0) + value
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        values = self.copy_values() if values is None else values
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_metric_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+# 히스토그램 (라벨 조합별 구간 카운트, 합계, 개수)
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._values = {}  # label_values -> [구간별 카운트 리스트, 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def copy_values(self):
+        with self._lock:
+            return {label_values: [list(bucket_counts), total, count]
+                    for label_values, (bucket_counts, total, count) in self._values.items()}
+
+    # 파일 저장용 (JSON 목록: [라벨 값 목록, 구간별 카운트, 합계, 개수])
+    def snapshot(self, values=None):
+        values = self.copy_values() if values is None else values
+        return [[list(label_values), bucket_counts, total, count]
+                for label_values, (bucket_counts, total, count) in values.items()]
+
+    # 다른 워커의 snapshot을 values에 더함
+    def merge(self, values, entries):
+        for label_values, bucket_counts, total, count in entries:
+            entry = values.setdefault(tuple(label_values), [[0] * len(self.buckets), 0.0, 0])
+            entry[0] = [a + b for a, b in zip(entry[0], bucket_counts)]
+            entry[1] += total
+            entry[2] += count
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        values = self.copy_values() if values is None else values
+        for label_values, (bucket_counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = format_metric_labels(self.label_names, label_values, ('le', bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_metric_labels(self.label_names, label_values, ('le', '+Inf'))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = format_metric_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram('app_request_seconds', '라우트별 전체 응답 시간', ('route', 'method'))
+REQUEST_DB_SECONDS = Histogram('app_request_db_seconds', '라우트별 요청당 SQL 실행 시간 합계', ('route', 'method'))
+REQUEST_TEMPLATE_SECONDS = Histogram('app_request_template_seconds', '라우트별 요청당 템플릿 렌더링 시간', ('route', 'method'))
+REQUEST_QUERIES = Histogram('app_request_queries', '라우트별 요청당 SQL 실행 횟수', ('route', 'method'), COUNT_BUCKETS)
+REQUEST_CONNECTIONS = Histogram('app_request_db_connections', '라우트별 요청당 DB 연결 횟수', ('route', 'method'), COUNT_BUCKETS)
+REQUESTS_TOTAL = Counter('app_requests_total', '라우트별 요청 수 (상태 코드별)', ('route', 'method', 'status'))
+REQUEST_ERRORS_TOTAL = Counter('app_request_errors_total', '라우트별 5xx 응답 및 처리되지 않은 예외 수', ('route', 'method'))
+DB_CONNECT_SECONDS = Histogram('app_db_connect_seconds', 'DB 연결 획득 시간')
+DB_CONNECTIONS_TOTAL = Counter('app_db_connections_total', 'DB 연결 시도 결과 (ok, error, rejected)', ('result',))
+DB_QUERY_ERRORS_TOTAL = Counter('app_db_query_errors_total', 'SQL 실행 오류 수', ('route',))
+TX_RETRIES_TOTAL = Counter('app_db_transaction_retries_total', '일시적 충돌로 재시도한 트랜잭션 수', ('route', 'reason'))
+TX_RETRIES_EXHAUSTED_TOTAL = Counter('app_db_transaction_retries_exhausted_total',
+                                     '재시도 횟수/시간을 모두 써서 실패한 트랜잭션 수', ('route', 'reason'))
+DB_READ_ROUTING_TOTAL = Counter('app_db_read_routing_total',
+                                '읽기 전용 조회의 연결 대상 (replica, lagging, replica_error, primary)', ('result',))
+RATE_LIMITED_TOTAL = Counter('app_rate_limited_total',
+                             '입장 제어로 거절(429/503)한 요청 수 (user, listing, concurrency, streams)', ('route', 'reason'))
+
+METRICS = [
+    REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_TEMPLATE_SECONDS, REQUEST_QUERIES, REQUEST_CONNECTIONS,
+    REQUESTS_TOTAL, REQUEST_ERRORS_TOTAL, DB_CONNECT_SECONDS, DB_CONNECTIONS_TOTAL, DB_QUERY_ERRORS_TOTAL,
+    TX_RETRIES_TOTAL, TX_RETRIES_EXHAUSTED_TOTAL, DB_READ_ROUTING_TOTAL, RATE_LIMITED_TOTAL
+]
+
+# --- 여러 워커 프로세스의 지표 합산 ---
+# 지표는 워커 프로세스마다 따로 쌓이므로 gunicorn 워커가 여러 개이면 /metrics가 응답한 워커의 값만 보여줌
+# METRICS_MULTIPROC_DIR을 설정하면 각 워커가 METRICS_FLUSH_INTERVAL초마다 자기 값을 이 디렉터리에 저장하고
+# /metrics는 모든 워커의 파일을 합산해 응답함 (다른 워커의 값은 최대 METRICS_FLUSH_INTERVAL초 늦게 반영)
+# 비워 두면 워커가 하나일 때만 정확함. 종료된 워커의 값은 metrics-retired.json에 합쳐 카운터가 줄어들지 않게 하고
+# 디렉터리는 gunicorn.conf.py의 on_starting에서 비움 (강제 종료된 워커는 마지막 저장 이후의 값이 빠짐)
+app.config['METRICS_MULTIPROC_DIR'] = os.environ.get('METRICS_MULTIPROC_DIR', '')
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+
+
+def read_json_file(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# 임시 파일에 쓴 뒤 교체 (읽는 쪽이 쓰다 만 파일을 보지 않도록)
+def write_json_file(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# 워커별 지표 파일 저장/합산 (파일 이름: metrics-<pid>-<토큰>.json, pid 재사용에도 이전 워커 파일을 덮어쓰지 않음)
+class MetricsFileStore:
+    RETIRED_FILE = 'metrics-retired.json'
+    LOCK_FILE = 'metrics.lock'
+
+    def __init__(self, metrics):
+        self.metrics = {metric.name: metric for metric in metrics}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._path = None
+
+    def ensure_started(self):
+        with self._lock:
+            # fork(gunicorn preload) 이후 워커 안에서 처음 필요할 때 시작 (워커마다 새 파일)
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._path = os.path.join(app.config['METRICS_MULTIPROC_DIR'],
+                                          f"metrics-{self._pid}-{uuid.uuid4().hex[:8]}.json")
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(app.config['METRICS_FLUSH_INTERVAL'])
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"지표 파일 저장 오류: {e}")
+
+    def flush(self):
+        self.ensure_started()
+        snapshot = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        with self._flush_lock:
+            write_json_file(self._path, snapshot)
+
+    # 워커 종료 시 (gunicorn worker_exit) 마지막 값을 저장하고 retired로 합침
+    def close(self):
+        if not app.config['METRICS_MULTIPROC_DIR'] or self._pid != os.getpid():
+            return
+        self.flush()
+        with self._locked_dir():
+            self._retire([self._path])
+
+    # 모든 워커 파일과 retired를 합산 -> {지표 이름: 라벨 값별 누적값}
+    def collect(self):
+        self.flush()
+        directory = app.config['METRICS_MULTIPROC_DIR']
+        totals = {name: {} for name in self.metrics}
+        with self._locked_dir():
+            self._retire([os.path.join(directory, name) for name in self._worker_files()
+                          if not self._is_alive(name)])
+            retired = read_json_file(os.path.join(directory, self.RETIRED_FILE)) or {}
+            snapshots = [retired.get('metrics', {})]
+            snapshots.extend(read_json_file(os.path.join(directory, name)) or {} for name in self._worker_files())
+        for snapshot in snapshots:
+            for name, entries in snapshot.items():
+                if name in self.metrics:
+                    self.metrics[name].merge(totals[name], entries)
+        return totals
+
+    @contextmanager
+    def _locked_dir(self):
+        # 합산/정리는 워커 간에 한 번에 하나만 (close 시 파일 잠금도 해제됨)
+        with open(os.path.join(app.config['METRICS_MULTIPROC_DIR'], self.LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _worker_files(self):
+        return [name for name in os.listdir(app.config['METRICS_MULTIPROC_DIR'])
+                if name.startswith('metrics-') and name.endswith('.json') and name != self.RETIRED_FILE]
+
+    def _is_alive(self, name):
+        pid = int(name.split('-')[1])
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    # 종료된 워커 파일을 retired에 더한 뒤 삭제
+    # 합친 파일 이름을 retired에 함께 기록하므로 삭제 전에 중단되어도 다음 정리 때 두 번 더하지 않음
+    def _retire(self, paths):
+        directory = app.config['METRICS_MULTIPROC_DIR']
+        retired_path = os.path.join(directory, self.RETIRED_FILE)
+        retired = read_json_file(retired_path) or {'merged': [], 'metrics': {}}
+        for name in retired['merged']:
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        merged = [path for path in paths if os.path.basename(path) not in retired['merged']]
+        if not merged:
+            return
+        totals = {}
+        for name, entries in retired['metrics'].items():
+            if name in self.metrics:
+                self.metrics[name].merge(totals.setdefault(name, {}), entries)
+        for path in merged:
+            for name, entries in (read_json_file(path) or {}).items():
+                if name in self.metrics:
+                    self.metrics[name].merge(totals.setdefault(name, {}), entries)
+        write_json_file(retired_path, {
+            'merged': [os.path.basename(path) for path in merged],
+            'metrics': {name: self.metrics[name].snapshot(values) for name, values in totals.items()}
+        })
+        for path in merged:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+metrics_file_store = MetricsFileStore(METRICS)
+
+
+# 현재 요청의 지표 누적값 (요청 밖의 백그라운드 스레드에서는 None)
+def current_request_metrics():
+    if not has_request_context():
+        return None
+    return g.get('request_metrics')
+
+
+# 현재 요청의 라우트 이름 (URL 규칙 기준이라 listing_id 등의 값으로 라벨이 늘어나지 않음)
+def current_route_label():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return 'unmatched'
+
+
+# --- 느린 쿼리 로그 / SQL 지문(fingerprint) 통계 설정 ---
+app.config['QUERY_STATS_ENABLED'] = os.environ.get('QUERY_STATS_ENABLED', '1') == '1'
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', '200'))  # 이 시간(ms)을 넘으면 로그 출력
+# 느린 SELECT 중 EXPLAIN (ANALYZE, BUFFERS) 실행 계획을 수집할 비율 (0이면 수집 안 함)
+app.config['SLOW_QUERY_EXPLAIN_SAMPLE_RATE'] = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0'))
+
+SQL_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+SQL_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+SQL_PLACEHOLDER_PATTERN = re.compile(r"%\(\w+\)s|%s")
+SQL_IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+SQL_SPACE_PATTERN = re.compile(r"\s+")
+
+
+# SQL 문을 정규화하여 지문 생성 (리터럴/파라미터를 ?로 바꾸고 공백·주석 제거)
+# 같은 형태의 쿼리는 값이 달라도 같은 지문으로 집계됨. 로그에는 실제 파라미터 값이 남지 않음
+def fingerprint_sql(query):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    normalized = SQL_COMMENT_PATTERN.sub(' ', str(query))
+    normalized = SQL_STRING_PATTERN.sub('?', normalized)
+    normalized = SQL_PLACEHOLDER_PATTERN.sub('?', normalized)
+    normalized = SQL_NUMBER_PATTERN.sub('?', normalized)
+    normalized = SQL_IN_LIST_PATTERN.sub('(?+)', normalized)
+    normalized = SQL_SPACE_PATTERN.sub(' ', normalized).strip().lower()
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+# 지문별 실행 통계 (호출 수, 시간 분포, 반환/변경 행 수, 호출 위치, EXPLAIN 샘플)
+class QueryStats:
+    def __init__(self, sample_size=1000):
+        self.sample_size = sample_size  # 백분위 계산용으로 지문마다 보관하는 최근 실행 시간 수
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed, rows, caller):
+        fingerprint, normalized = fingerprint_sql(query)
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is None:
+                entry = self._stats[fingerprint] = {
+                    'fingerprint': fingerprint,
+                    'query': normalized,
+                    'calls': 0,
+                    'total_seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'rows': 0,
+                    'slow_calls': 0,
+                    'samples': collections.deque(maxlen=self.sample_size),
+                    'callers': set(),
+                    'explain': None
+                }
+            entry['calls'] += 1
+            entry['total_seconds'] += elapsed
+            entry['max_seconds'] = max(entry['max_seconds'], elapsed)
+            entry['rows'] += max(rows, 0)
+            entry['samples'].append(elapsed)
+            entry['callers'].add(caller)
+        return fingerprint, normalized
+
+    def record_slow(self, fingerprint, explain_plan=None):
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is not None:
+                entry['slow_calls'] += 1
+                if explain_plan is not None:
+                    entry['explain'] = explain_plan
+
+    def report(self, top_n=20, order_by='total'):
+        # order_by: total(누적 시간), p99, calls(호출 수), max(최대 시간)
+        with self._lock:
+            rows = []
+            for entry in self._stats.values():
+                samples = sorted(entry['samples'])
+                rows.append({
+                    'fingerprint': entry['fingerprint'],
+                    'query': entry['query'],
+                    'calls': entry['calls'],
+                    'slow_calls': entry['slow_calls'],
+                    'total_ms': round(entry['total_seconds'] * 1000, 3),
+                    'avg_ms': round(entry['total_seconds'] * 1000 / entry['calls'], 3),
+                    'p50_ms': round(percentile(samples, 50) * 1000, 3),
+                    'p99_ms': round(percentile(samples, 99) * 1000, 3),
+                    'max_ms': round(entry['max_seconds'] * 1000, 3),
+                    'rows': entry['rows'],
+                    'callers': sorted(entry['callers']),
+                    'explain': entry['explain']
+                })
+        sort_keys = {'total': 'total_ms', 'p99': 'p99_ms', 'calls': 'calls', 'max': 'max_ms'}
+        rows.sort(key=lambda row: row[sort_keys.get(order_by, 'total_ms')], reverse=True)
+        return rows[:top_n]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# 정렬된 값 목록에서 백분위 값 계산 (nearest-rank)
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+query_stats = QueryStats()
+
+
+# SQL을 호출한 함수 이름 (커서 래퍼 내부 프레임은 건너뜀)
+def find_sql_caller():
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__ and frame.f_code.co_name in (
+            'execute', 'executemany', 'record_query'):
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else 'unknown'
+
+
+# --- 요청 처리 시간 예산(deadline) 설정 ---
+# 라우트마다 @route_deadline(ms)로 예산을 선언하고, 선언하지 않은 라우트는 기본값을 사용
+# 예산은 DB 연결의 statement_timeout / lock_timeout으로 적용되고, 요청 안의 다음 쿼리는 남은 시간만 사용함
+app.config['DEADLINES_ENABLED'] = os.environ.get('DEADLINES_ENABLED', '1') == '1'
+app.config['DEFAULT_DEADLINE_MS'] = int(os.environ.get('DEFAULT_DEADLINE_MS', '5000'))
+app.config['DEFAULT_LOCK_TIMEOUT_MS'] = int(os.environ.get('DEFAULT_LOCK_TIMEOUT_MS', '2000'))
+# 연결에 적용된 statement_timeout이 남은 시간보다 이만큼 이상 길어지면 다시 설정 (SET 왕복을 줄이기 위한 여유)
+app.config['DEADLINE_RESET_SLACK_MS'] = int(os.environ.get('DEADLINE_RESET_SLACK_MS', '100'))
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# 라우트의 처리 시간 예산 선언 (deadline_ms=None이면 제한 없음, 예: 스트리밍 응답)
+def route_deadline(deadline_ms, lock_timeout_ms=None):
+    def decorator(func):
+        func.deadline_ms = deadline_ms
+        func.lock_timeout_ms = lock_timeout_ms
+        return func
+
+    return decorator
+
+
+@app.before_request
+def start_request_deadline():
+    g.deadline = None
+    if not app.config['DEADLINES_ENABLED']:
+        return
+    view = app.view_functions.get(request.endpoint)
+    deadline_ms = getattr(view, 'deadline_ms', app.config['DEFAULT_DEADLINE_MS'])
+    if deadline_ms:
+        g.deadline = time.monotonic() + deadline_ms / 1000.0
+        g.lock_timeout_ms = getattr(view, 'lock_timeout_ms', None) or app.config['DEFAULT_LOCK_TIMEOUT_MS']
+
+
+# 현재 요청의 남은 시간 (ms, 요청 밖이거나 예산이 없으면 None)
+def deadline_remaining_ms():
+    if not has_request_context() or g.get('deadline') is None:
+        return None
+    return int((g.deadline - time.monotonic()) * 1000)
+
+
+# statement_timeout / lock_timeout 값 계산 (lock_timeout도 남은 시간을 넘지 않음)
+def deadline_timeouts():
+    remaining_ms = deadline_remaining_ms()
+    if remaining_ms is None:
+        return None, None
+    remaining_ms = max(remaining_ms, 1)
+    return remaining_ms, min(g.lock_timeout_ms, remaining_ms)
+
+
+# 예산 초과/잠금 대기 초과를 기록 (응답은 after_request에서 504/503으로 통일)
+# 커밋한 뒤에는 deadline이 해제되므로 기록되지 않음 (InstrumentedConnection.commit)
+def mark_deadline_error(kind):
+    if has_request_context() and g.get('deadline') is not None:
+        g.deadline_error = kind
+
+
+@app.after_request
+def deadline_error_response(response):
+    kind = g.get('deadline_error')
+    # 커밋한 요청은 실제 결과를 그대로 반환 (504로 바꾸면 이미 반영된 주문/입찰을 다시 시도하게 됨)
+    if kind is None or g.get('committed'):
+        return response
+    if kind == 'lock_timeout':
+        message, status = "다른 요청이 같은 데이터를 처리 중입니다. 잠시 후 다시 시도해주세요.", 503
+    else:
+        message, status = "요청 처리 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", 504
+    print(f"[처리 시간 초과] {current_route_label()} {kind}")
+    if request.path.startswith('/api/'):
+        error_response = jsonify({"error": message})
+    else:
+        error_response = Response(message, content_type='text/plain; charset=utf-8')
+    error_response.status_code = status
+    if status == 503:
+        error_response.headers['Retry-After'] = '1'
+    return error_response
+
+
+# 느린 쿼리 EXPLAIN ANALYZE(다시 실행)에서 제외할 문장: 데이터 변경, 행 잠금, 부수 효과가 있는 함수
+EXPLAIN_UNSAFE_SQL_RE = re.compile(
+    r'\b(insert|update|delete|merge|truncate|for share|pg_notify|nextval|setval|pg_advisory\w*)\b')
+
+
+# SQL 실행 시간을 측정하는 커서 (DictCursor 등 기존 커서 클래스와 함께 상속하여 사용)
+# 요청별 지표 누적, 지문별 통계, 느린 쿼리 로그/EXPLAIN 샘플 수집, 요청 deadline 적용을 함께 처리
+class TimedCursorMixin:
+    def execute(self, query, vars=None):
+        self.connection.apply_deadline()
+        start = time.perf_counter()
+        failed = False
+        try:
+            return super().execute(query, vars)
+        except Exception as e:
+            failed = True
+            DB_QUERY_ERRORS_TOTAL.inc(current_route_label())
+            reason = classify_db_error(e) if isinstance(e, psycopg2.Error) else None
+            if reason == 'query_canceled':
+                mark_deadline_error('deadline')
+            elif reason == 'lock_timeout':
+                mark_deadline_error('lock_timeout')
+            raise
+        finally:
+            self.record_query(query, vars, time.perf_counter() - start, failed=failed)
+
+    def executemany(self, query, vars_list):
+        # executemany는 파라미터 묶음마다 서버와 한 번씩 왕복하므로 왕복 횟수를 따로 기록
+        vars_list = list(vars_list)
+        self.connection.apply_deadline()
+        start = time.perf_counter()
+        failed = False
+        try:
+            return super().executemany(query, vars_list)
+        except Exception:
+            failed = True
+            DB_QUERY_ERRORS_TOTAL.inc(current_route_label())
+            raise
+        finally:
+            self.record_query(query, None, time.perf_counter() - start, round_trips=len(vars_list), failed=failed)
+
+    # failed: 실행 중 오류가 난 쿼리 (트랜잭션이 중단된 상태일 수 있으므로 EXPLAIN하지 않음)
+    def record_query(self, query, vars, elapsed, round_trips=1, failed=False):
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics['db_seconds'] += elapsed
+            metrics['queries'] += 1
+
+        for listener in query_listeners:
+            listener(query, elapsed, round_trips)
+
+        if not app.config['QUERY_STATS_ENABLED']:
+            return
+
+        route = current_route_label()
+        function_name = find_sql_caller()
+        fingerprint, normalized = query_stats.record(query, elapsed, self.rowcount, f"{route} {function_name}")
+
+        if elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+            explain_plan = None
+            if not failed and random.random() < app.config['SLOW_QUERY_EXPLAIN_SAMPLE_RATE']:
+                explain_plan = self.explain_analyze(query, vars, normalized)
+            query_stats.record_slow(fingerprint, explain_plan)
+            print(f"[느린 쿼리] {elapsed * 1000:.1f}ms route={route} func={function_name} "
+                  f"fingerprint={fingerprint} sql={normalized[:300]}")
+
+    def explain_analyze(self, query, vars, normalized):
+        # 읽기 전용 SELECT만 다시 실행하여 실행 계획 수집
+        # (데이터 변경 CTE, 잠금(FOR UPDATE/SHARE), NOTIFY/시퀀스 등 부수 효과가 있는 문장은 제외)
+        if not (normalized.startswith('select') or normalized.startswith('with')) \
+                or EXPLAIN_UNSAFE_SQL_RE.search(normalized):
+            return None
+        in_transaction = not self.connection.autocommit
+        # 측정용이 아닌 기본 커서를 직접 생성 (EXPLAIN 자체는 통계에 집계하지 않음)
+        explain_cur = psycopg2.extensions.cursor(self.connection)
+        try:
+            # 다시 실행한 결과가 남지 않도록 항상 되돌림 (요청의 트랜잭션 안이면 SAVEPOINT, autocommit이면 별도 트랜잭션)
+            explain_cur.execute("SAVEPOINT slow_query_explain" if in_transaction else "BEGIN")
+            try:
+                explain_cur.execute(b"EXPLAIN (ANALYZE, BUFFERS) " + explain_cur.mogrify(query, vars))
+                return '\n'.join(row[0] for row in explain_cur.fetchall())
+            finally:
+                explain_cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain" if in_transaction else "ROLLBACK")
+        except Exception as e:
+            print(f"느린 쿼리 실행 계획 수집 오류: {e}")
+            return None
+        finally:
+            explain_cur.close()
+
+
+# 실행된 모든 SQL을 전달받는 콜백 목록 (query, elapsed, round_trips)
+# 테스트용 쿼리 수 검사 도구(query_budget.py)가 등록해서 사용
+query_listeners = []
+
+
+timed_cursor_classes = {}
+
+
+# cursor_factory에 맞는 측정용 커서 클래스 생성 (클래스별로 한 번만 만들어 재사용)
+def timed_cursor_class(cursor_factory):
+    timed_class = timed_cursor_classes.get(cursor_factory)
+    if timed_class is None:
+        timed_class = type(f"Timed{cursor_factory.__name__}", (TimedCursorMixin, cursor_factory), {})
+        timed_cursor_classes[cursor_factory] = timed_class
+    return timed_class
+
+
+# 모든 커서를 측정용 커서로 바꿔 주는 연결 클래스 (psycopg2 connection_factory로 사용)
+# 요청 deadline을 statement_timeout / lock_timeout으로 적용하는 기능도 함께 가짐
+class InstrumentedConnection(psycopg2.extensions.connection):
+    # 접속 옵션으로 지정한 값 (open_db_connection에서 설정)
+    initial_statement_timeout_ms = None
+    statement_timeout_ms = None
+
+    is_replica = False
+
+    def cursor(self, *args, **kwargs):
+        cursor_factory = kwargs.pop('cursor_factory', None) or self.cursor_factory or psycopg2.extensions.cursor
+        return super().cursor(*args, cursor_factory=timed_cursor_class(cursor_factory), **kwargs)
+
+    # 쿼리 실행 전 호출: 남은 시간이 없으면 DB에 보내지 않고 실패,
+    # 적용된 statement_timeout이 남은 시간보다 많이 길면 남은 시간으로 줄임
+    def apply_deadline(self):
+        statement_timeout_ms, lock_timeout_ms = deadline_timeouts()
+        if statement_timeout_ms is None:
+            return
+        if deadline_remaining_ms() <= 0:
+            mark_deadline_error('deadline')
+            raise DeadlineExceeded("요청 처리 시간 예산을 초과했습니다.")
+        if (self.statement_timeout_ms is None
+                or self.statement_timeout_ms - statement_timeout_ms > app.config['DEADLINE_RESET_SLACK_MS']):
+            # 측정용이 아닌 기본 커서로 설정 (SET 두 개를 한 번의 왕복으로 전송)
+            set_cur = psycopg2.extensions.cursor(self)
+            try:
+                set_cur.execute(f"SET statement_timeout = {int(statement_timeout_ms)}; "
+                                f"SET lock_timeout = {int(lock_timeout_ms)}")
+            finally:
+                set_cur.close()
+            self.statement_timeout_ms = statement_timeout_ms
+
+    # 트랜잭션 안에서 실행한 SET은 롤백되면 취소되므로 접속 시 값으로 되돌려 기록
+    def rollback(self):
+        super().rollback()
+        self.statement_timeout_ms = self.initial_statement_timeout_ms
+
+    # primary에서 커밋한 뒤:
+    # - 요청을 '커밋됨'으로 표시하고 deadline을 해제 (이미 반영된 변경을 504로 바꾸면 클라이언트가 다시 실행하게 됨,
+    #   커밋 이후 작업(장바구니 수량, WAL 위치 조회 등)은 예산 없이 실행)
+    # - WAL 위치를 세션에 기록 (이후 조회가 이 위치까지 따라온 복제본에서만 실행되도록)
+    def commit(self):
+        if not self.is_replica and has_request_context():
+            mark_idempotency_committed(self)
+        super().commit()
+        if self.is_replica or not has_request_context():
+            return
+        g.committed = True
+        g.deadline = None
+        if self.statement_timeout_ms != self.initial_statement_timeout_ms:
+            # 남은 시간으로 줄여 둔 statement_timeout / lock_timeout을 접속 시 값으로 되돌림
+            reset_cur = psycopg2.extensions.cursor(self)
+            try:
+                reset_cur.execute("RESET statement_timeout; RESET lock_timeout")
+                super().commit()  # RESET도 트랜잭션 안에서 실행되므로 이후 rollback에 취소되지 않게 확정
+            finally:
+                reset_cur.close()
+            self.statement_timeout_ms = self.initial_statement_timeout_ms
+        if app.config['DB_REPLICA_DSNS']:
+            record_write_lsn(self)
+
+
+@app.before_request
+def start_request_metrics():
+    if app.config['METRICS_ENABLED'] or app.config['SERVER_TIMING_ENABLED']:
+        g.request_metrics = {
+            'start': time.perf_counter(),
+            'db_seconds': 0.0,
+            'queries': 0,
+            'connections': 0,
+            'connect_seconds': 0.0,
+            'template_seconds': 0.0,
+            'template_start': None,
+            'phases': collections.OrderedDict()
+        }
+
+
+# 이름 붙인 처리 구간의 소요 시간 기록 (Server-Timing 헤더에 phase-<이름>으로 표시)
+# 예: with timing_phase('orders'): orders = get_orders_for_buyer(...)
+@contextmanager
+def timing_phase(name):
+    metrics = current_request_metrics()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics['phases'][name] = metrics['phases'].get(name, 0.0) + time.perf_counter() - start
+
+
+# Server-Timing 헤더 값 생성 (dur은 밀리초 단위)
+def build_server_timing(metrics):
+    entries = [
+        f'conn;dur={metrics["connect_seconds"] * 1000:.1f};desc="connections={metrics["connections"]}"'
+    ]
+    for name, seconds in metrics['phases'].items():
+        entries.append(f'phase-{re.sub(r"[^A-Za-z0-9_-]", "_", name)};dur={seconds * 1000:.1f}')
+    entries.append(f'db;dur={metrics["db_seconds"] * 1000:.1f};desc="queries={metrics["queries"]}"')
+    entries.append(f'tpl;dur={metrics["template_seconds"] * 1000:.1f}')
+    entries.append(f'total;dur={(time.perf_counter() - metrics["start"]) * 1000:.1f}')
+    return ', '.join(entries)
+
+
+@app.after_request
+def record_response_status(response):
+    g.response_status = response.status_code
+    metrics = current_request_metrics()
+    if metrics is not None and app.config['SERVER_TIMING_ENABLED']:
+        response.headers['Server-Timing'] = build_server_timing(metrics)
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    metrics = g.pop('request_metrics', None)
+    if metrics is None or not app.config['METRICS_ENABLED']:
+        return
+    route = current_route_label()
+    method = request.method
+    status = 500 if exc is not None else g.get('response_status', 500)
+
+    REQUEST_SECONDS.observe(time.perf_counter() - metrics['start'], route, method)
+    REQUEST_DB_SECONDS.observe(metrics['db_seconds'], route, method)
+    REQUEST_TEMPLATE_SECONDS.observe(metrics['template_seconds'], route, method)
+    REQUEST_QUERIES.observe(metrics['queries'], route, method)
+    REQUEST_CONNECTIONS.observe(metrics['connections'], route, method)
+    REQUESTS_TOTAL.inc(route, method, str(status))
+    if status >= 500:
+        REQUEST_ERRORS_TOTAL.inc(route, method)
+    if app.config['METRICS_MULTIPROC_DIR']:
+        metrics_file_store.ensure_started()
+
+
+# 템플릿 렌더링 시간 측정 (Flask 템플릿 signal 사용)
+def start_template_timer(sender, template, context, **extra):
+    metrics = current_request_metrics()
+    if metrics is not None:
+        metrics['template_start'] = time.perf_counter()
+
+
+def stop_template_timer(sender, template, context, **extra):
+    metrics = current_request_metrics()
+    if metrics is not None and metrics['template_start'] is not None:
+        metrics['template_seconds'] += time.perf_counter() - metrics['template_start']
+        metrics['template_start'] = None
+
+
+before_render_template.connect(start_template_timer, app)
+template_rendered.connect(stop_template_timer, app)
+
+
+# --- 요청 프로파일링 설정 ---
+# PROFILE_SAMPLE_RATE: 무작위로 프로파일링할 요청 비율 (0이면 표본 추출 안 함)
+# PROFILE_TOKEN: 요청 헤더 X-Profile-Token 값이 이 토큰과 같으면 해당 요청을 프로파일링 (비어 있으면 사용 안 함)
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN', '')
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+app.config['PROFILE_MAX_FILES'] = int(os.environ.get('PROFILE_MAX_FILES', '20'))  # 라우트별 보관 개수
+
+
+# 표본 추출된 요청 또는 인증 헤더가 있는 요청을 cProfile로 실행하는 WSGI 미들웨어
+# 결과는 PROFILE_DIR/<endpoint>/ 아래 .prof 파일로 저장되고, 라우트별로 최근 N개만 유지됨
+class SampledProfilerMiddleware:
+    def __init__(self, wsgi_app, flask_app):
+        self.wsgi_app = wsgi_app
+        self.flask_app = flask_app
+
+    def should_profile(self, environ):
+        token = self.flask_app.config['PROFILE_TOKEN']
+        header_token = environ.get('HTTP_X_PROFILE_TOKEN', '')
+        if token and header_token and hmac.compare_digest(token, header_token):
+            return True
+        return random.random() < self.flask_app.config['PROFILE_SAMPLE_RATE']
+
+    def endpoint_for(self, environ):
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+            return endpoint
+        except Exception:
+            return 'unmatched'
+
+    def __call__(self, environ, start_response):
+        if not self.should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        endpoint = self.endpoint_for(environ)
+        filename = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{environ.get('REQUEST_METHOD', 'GET')}.prof"
+
+        content_types = []
+
+        def start_response_with_id(status, headers, exc_info=None):
+            headers.append(('X-Profile-Id', f"{endpoint}/{filename}"))
+            content_types.extend(value for name, value in headers if name.lower() == 'content-type')
+            return start_response(status, headers, exc_info)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        body = []
+        try:
+            app_iter = profiler.runcall(self.wsgi_app, environ, start_response_with_id)
+            # 스트리밍 응답(SSE)은 본문을 모아 두면 연결이 끝날 때까지 아무것도 전송되지 않으므로
+            # 라우트 함수 실행까지만 프로파일링하고 본문은 그대로 흘려보냄
+            if any(value.startswith('text/event-stream') for value in content_types):
+                return app_iter
+            # 응답 본문까지 모두 만들어질 때까지 프로파일링
+            try:
+                body = profiler.runcall(list, app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            self.save_profile(profiler, endpoint, filename, time.perf_counter() - start)
+        return body
+
+    def save_profile(self, profiler, endpoint, filename, elapsed):
+        try:
+            route_dir = os.path.join(self.flask_app.config['PROFILE_DIR'], endpoint)
+            os.makedirs(route_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(route_dir, filename))
+            print(f"[프로파일] {endpoint} {elapsed * 1000:.1f}ms -> {filename}")
+
+            # 라우트별 보관 개수를 넘는 오래된 파일 삭제 (파일명이 시각 순으로 정렬됨)
+            files = sorted(f for f in os.listdir(route_dir) if f.endswith('.prof'))
+            for old_file in files[:-self.flask_app.config['PROFILE_MAX_FILES']]:
+                os.remove(os.path.join(route_dir, old_file))
+        except Exception as e:
+            print(f"프로파일 저장 오류: {e}")
+
+
+app.wsgi_app = SampledProfilerMiddleware(app.wsgi_app, app)
+
+
 # PostgreSQL Role 이름 매핑 함수 생성
 def map_role_to_db_role(app_role):
     role_map = {
@@ -36,32 +1156,721 @@ def map_role_to_db_role(app_role):
     return role_map.get(app_role, None)
 
 #  DB 접속 설정 함수
-def get_db_connection(role=None):
-    try:
+def open_db_connection(role=None, statement_timeout_ms=None, lock_timeout_ms=None, dsn=None):
+    # Role과 시간 제한은 접속 시작 옵션(-c name=value)으로 지정 -> 별도의 SET / COMMIT 왕복이 없음
+    options = []
+    if role:
+        options.append(f"-c role={role}")
+    if statement_timeout_ms:
+        options.append(f"-c statement_timeout={int(statement_timeout_ms)}")
+    if lock_timeout_ms:
+        options.append(f"-c lock_timeout={int(lock_timeout_ms)}")
+    if dsn:
+        # 복제본: 접속 대상/계정은 접속 문자열에 지정된 값을 사용
+        conn = psycopg2.connect(
+            dsn,
+            client_encoding='UTF8',
+            connect_timeout=app.config['DB_CONNECT_TIMEOUT'],
+            connection_factory=InstrumentedConnection,
+            options=' '.join(options) or None
+        )
+        conn.is_replica = True
+    else:
         conn = psycopg2.connect(
-            host="127.0.0.1",
-            database="project2025",
-            user="db2025",
-            password="db!2025",
-            port="5432",
-            client_encoding='UTF8'
+            host=app.config['DB_HOST'],
+            database=app.config['DB_NAME'],
+            user=app.config['DB_USER'],
+            password=app.config['DB_PASSWORD'],
+            port=app.config['DB_PORT'],
+            client_encoding='UTF8',
+            connect_timeout=app.config['DB_CONNECT_TIMEOUT'],
+            connection_factory=InstrumentedConnection,  # 모든 커서의 SQL 실행 시간 측정
+            options=' '.join(options) or None
         )
+    conn.initial_statement_timeout_ms = conn.statement_timeout_ms = statement_timeout_ms
+    return conn
+
+
+# --- 복제본 라우팅 / read-your-writes ---
+# 세션에 마지막 쓰기의 WAL 위치(LSN)를 저장하고, 읽기 전용 조회는 그 위치까지 재생한 복제본에서만 실행
+# 복제본별로 확인된 재생 위치를 기억해 두어, 이미 따라온 것이 확인된 경우에는 추가 확인 쿼리 없이 사용
+replica_states = {}  # dsn -> {'down_until': 접속 재시도 가능 시각, 'replay_lsn': 확인된 재생 위치}
+replica_states_lock = threading.Lock()
+
+
+# 'XXXXXXXX/YYYYYYYY' 형식의 LSN을 비교 가능한 정수로 변환
+def parse_lsn(value):
+    high, low = value.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
 
+
+def record_write_lsn(conn):
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_current_wal_lsn()")
+        lsn = cur.fetchone()[0]
+        cur.close()
+        conn.rollback()  # 조회로 시작된 트랜잭션 종료
+    except Exception as e:
+        # 커밋은 이미 끝났으므로 요청은 실패시키지 않음 (이후 조회가 잠시 이전 데이터를 볼 수 있음)
+        print(f"WAL 위치 조회 오류: {e}")
+        return
+    previous = session.get('last_write_lsn')
+    if previous is None or parse_lsn(lsn) > parse_lsn(previous):
+        session['last_write_lsn'] = lsn
+
+
+def replica_state(dsn):
+    with replica_states_lock:
+        return replica_states.setdefault(dsn, {'down_until': 0.0, 'replay_lsn': 0})
+
+
+# 세션의 마지막 쓰기 위치까지 재생한 복제본에 연결 (사용할 수 있는 복제본이 없으면 None -> primary 사용)
+def open_replica_connection(role, statement_timeout_ms, lock_timeout_ms):
+    last_write_lsn = session.get('last_write_lsn') if has_request_context() else None
+    required_lsn = parse_lsn(last_write_lsn) if last_write_lsn else 0
+    metrics = current_request_metrics()
+
+    dsns = list(app.config['DB_REPLICA_DSNS'])
+    random.shuffle(dsns)  # 복제본 간 부하 분산
+    for dsn in dsns:
+        state = replica_state(dsn)
+        if state['down_until'] > time.monotonic():
+            continue
+
+        start = time.perf_counter()
+        try:
+            conn = open_db_connection(role=role, statement_timeout_ms=statement_timeout_ms,
+                                      lock_timeout_ms=lock_timeout_ms, dsn=dsn)
+        except Exception as e:
+            state['down_until'] = time.monotonic() + app.config['DB_REPLICA_RETRY_INTERVAL']
+            DB_READ_ROUTING_TOTAL.inc('replica_error')
+            print(f"복제본 연결 오류: {e}")
+            continue
+        finally:
+            DB_CONNECT_SECONDS.observe(time.perf_counter() - start)
+            if metrics is not None:
+                metrics['connections'] += 1
+                metrics['connect_seconds'] += time.perf_counter() - start
+
+        if state['replay_lsn'] < required_lsn:
+            # 기억해 둔 위치로는 부족 -> 현재 재생 위치를 직접 확인 (NULL이면 복구 중이 아닌 서버이므로 최신)
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT pg_last_wal_replay_lsn()")
+                replay_lsn = cur.fetchone()[0]
+                cur.close()
+            except Exception as e:
+                conn.close()
+                state['down_until'] = time.monotonic() + app.config['DB_REPLICA_RETRY_INTERVAL']
+                DB_READ_ROUTING_TOTAL.inc('replica_error')
+                print(f"복제본 재생 위치 조회 오류: {e}")
+                continue
+            if replay_lsn is not None:
+                state['replay_lsn'] = max(state['replay_lsn'], parse_lsn(replay_lsn))
+            if replay_lsn is not None and state['replay_lsn'] < required_lsn:
+                conn.close()
+                DB_READ_ROUTING_TOTAL.inc('lagging')
+                continue
+
+        DB_READ_ROUTING_TOTAL.inc('replica')
         if role:
-            cur = conn.cursor()
-            #cur.execute("SELECT set_app_role(%s)", (role,))
-            cur.execute(f"SET ROLE {role}")
-            cur.close()
-            conn.commit()
+            print(f"DB 연결(복제본): Role '{role}' 권한으로 설정됨")
+        return conn
+    return None
+
+
+# 차단기 복구 확인용 접속 테스트
+def probe_db_connection():
+    open_db_connection().close()
+    return True
+
+
+db_breaker = CircuitBreaker(
+    app.config['DB_BREAKER_FAILURE_THRESHOLD'],
+    app.config['DB_BREAKER_PROBE_INTERVAL'],
+    probe_db_connection
+)
+
 
+# readonly=True: 조회만 하는 함수용. 복제본이 설정되어 있으면 복제본에 연결하고, 쓸 수 있는 복제본이 없으면 primary 사용
+def get_db_connection(role=None, readonly=False):
+    # 요청 처리 시간 예산을 이미 다 쓴 경우 연결하지 않고 실패 (DB 장애가 아니므로 차단기에는 기록하지 않음)
+    statement_timeout_ms, lock_timeout_ms = deadline_timeouts()
+    if statement_timeout_ms is not None and deadline_remaining_ms() <= 0:
+        mark_deadline_error('deadline')
+        return None
+
+    if readonly and app.config['DB_REPLICA_DSNS']:
+        conn = open_replica_connection(role, statement_timeout_ms, lock_timeout_ms)
+        if conn is not None:
+            return conn
+        DB_READ_ROUTING_TOTAL.inc('primary')
+
+    # 차단기가 열려 있으면 DB에 접속을 시도하지 않고 바로 실패 (장애 중인 DB에 부하를 더하지 않음)
+    if not db_breaker.allow_request():
+        db_state.failed = True
+        DB_CONNECTIONS_TOTAL.inc('rejected')
+        return None
+
+    metrics = current_request_metrics()
+    if metrics is not None:
+        metrics['connections'] += 1
+
+    start = time.perf_counter()
+    try:
+        conn = open_db_connection(role=role, statement_timeout_ms=statement_timeout_ms,
+                                  lock_timeout_ms=lock_timeout_ms)
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - start)
+        if metrics is not None:
+            metrics['connect_seconds'] += time.perf_counter() - start
+        DB_CONNECTIONS_TOTAL.inc('ok')
+        db_breaker.record_success()
+
+        if role:
             print(f"DB 연결: Role '{role}' 권한으로 설정됨")
 
         return conn
     except Exception as e:
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - start)
+        if metrics is not None:
+            metrics['connect_seconds'] += time.perf_counter() - start
+        DB_CONNECTIONS_TOTAL.inc('error')
+        db_breaker.record_failure()
+        db_state.failed = True
         print(f"DB 연결 오류: {e}")
         return None
 
 
+# --- 트랜잭션 재시도 설정 ---
+app.config['TX_RETRY_MAX_ATTEMPTS'] = int(os.environ.get('TX_RETRY_MAX_ATTEMPTS', '4'))  # 최초 시도 포함
+app.config['TX_RETRY_BASE_DELAY'] = float(os.environ.get('TX_RETRY_BASE_DELAY', '0.02'))  # 초
+app.config['TX_RETRY_MAX_DELAY'] = float(os.environ.get('TX_RETRY_MAX_DELAY', '0.5'))  # 초
+app.config['TX_RETRY_DEADLINE'] = float(os.environ.get('TX_RETRY_DEADLINE', '2.0'))  # 재시도를 포함한 전체 허용 시간 (초)
+
+# PostgreSQL SQLSTATE 분류
+# 직렬화 실패/교착 상태는 트랜잭션 전체가 롤백된 것이므로 처음부터 다시 실행해도 안전함
+SQLSTATE_REASONS = {
+    '40001': 'serialization_failure',
+    '40P01': 'deadlock',
+    '55P03': 'lock_timeout',
+    '57014': 'query_canceled',
+}
+RETRYABLE_DB_ERRORS = ('serialization_failure', 'deadlock')
+
+
+def classify_db_error(error):
+    pgcode = getattr(error, 'pgcode', None)
+    if pgcode is None:
+        return 'connection' if isinstance(error, psycopg2.OperationalError) else 'other'
+    return SQLSTATE_REASONS.get(pgcode, 'other')
+
+
+def is_retryable_db_error(error):
+    return isinstance(error, psycopg2.Error) and classify_db_error(error) in RETRYABLE_DB_ERRORS
+
+
+# 트랜잭션 라우트 재시도 데코레이터
+# 라우트는 except 블록에서 rollback 후 is_retryable_db_error(e)이면 예외를 다시 발생시키고,
+# 이 데코레이터가 지터를 둔 지수 백오프 후 라우트 전체(새 연결, 새 트랜잭션)를 다시 실행함
+# commit 이후의 작업(캐시 무효화, 세션 갱신)은 성공한 시도에서만 한 번 실행됨
+def retry_transaction(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except psycopg2.Error as e:
+                if not is_retryable_db_error(e):
+                    raise
+                reason = classify_db_error(e)
+                route = current_route_label()
+                # full jitter: 0 ~ min(최대 대기, 기본 대기 * 2^(시도-1)) 사이에서 무작위 대기
+                delay = random.uniform(0, min(app.config['TX_RETRY_MAX_DELAY'],
+                                              app.config['TX_RETRY_BASE_DELAY'] * (2 ** (attempt - 1))))
+                remaining_ms = deadline_remaining_ms()
+                if (attempt >= app.config['TX_RETRY_MAX_ATTEMPTS']
+                        or time.monotonic() - started + delay > app.config['TX_RETRY_DEADLINE']
+                        or (remaining_ms is not None and delay * 1000 >= remaining_ms)):
+                    TX_RETRIES_EXHAUSTED_TOTAL.inc(route, reason)
+                    print(f"트랜잭션 재시도 실패: {route} {reason} ({attempt}회 시도)")
+                    return jsonify({"error": "요청이 몰려 처리하지 못했습니다. 잠시 후 다시 시도해주세요."}), 503
+                TX_RETRIES_TOTAL.inc(route, reason)
+                time.sleep(delay)
+                attempt += 1
+
+    return wrapper
+
+
+# --- 멱등성 키(Idempotency-Key) 설정 (sql/idempotency_keys.sql) ---
+app.config['IDEMPOTENCY_TTL'] = int(os.environ.get('IDEMPOTENCY_TTL', '86400'))  # 응답 보관 시간 (초)
+app.config['IDEMPOTENCY_LOCK_SECONDS'] = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '30'))  # 처리 중 표시가 유효한 시간 (초, 워커 비정상 종료 대비)
+app.config['IDEMPOTENCY_WAIT_SECONDS'] = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '2'))  # 동시 재시도가 먼저 온 요청의 결과를 기다리는 최대 시간
+app.config['IDEMPOTENCY_CACHE_TTL'] = float(os.environ.get('IDEMPOTENCY_CACHE_TTL', '60'))  # 프로세스 내 완료 응답 캐시 (초)
+app.config['IDEMPOTENCY_PURGE_SAMPLE_RATE'] = float(os.environ.get('IDEMPOTENCY_PURGE_SAMPLE_RATE', '0.01'))  # 만료 키 정리 확률
+
+# 완료된 응답 캐시 (key: (user_id, endpoint, idem_key)) -> 같은 워커로 온 재시도는 DB도 거치지 않음
+idempotency_cache = TTLCache(app.config['IDEMPOTENCY_CACHE_TTL'], 10000)
+
+
+# 키를 선점(INSERT)하거나, 이미 있으면 기존 기록을 한 번의 왕복으로 조회
+# 만료된 키나 오래된 처리 중(in_progress) 표시는 새 요청이 가져감
+# committed(처리 트랜잭션은 커밋됐지만 응답 저장 전) 키는 오래돼도 가져가지 않음 -> 다시 실행되지 않음
+# 반환: {'claimed': 선점 여부, 'request_hash', 'state', 'response_status', 'response_body', 'content_type',
+#        'created_at': 선점 시각 (선점 확인용 토큰), 'lock_expired': 처리 중 표시 유효 시간이 지났는지}
+def claim_idempotency_key(cur, scope, request_hash):
+    params = {
+        'user_id': scope[0], 'endpoint': scope[1], 'key': scope[2], 'hash': request_hash,
+        'ttl': app.config['IDEMPOTENCY_TTL'], 'lock_seconds': app.config['IDEMPOTENCY_LOCK_SECONDS']
+    }
+    # 다른 트랜잭션이 방금 커밋한 키는 이 문장의 스냅샷에 안 보일 수 있으므로 한 번 더 시도
+    for _ in range(3):
+        cur.execute(
+            """
+            WITH claimed AS (
+                INSERT INTO IdempotencyKey (user_id, endpoint, idem_key, request_hash, expires_at)
+                VALUES (%(user_id)s, %(endpoint)s, %(key)s, %(hash)s, NOW() + %(ttl)s * INTERVAL '1 second')
+                ON CONFLICT (user_id, endpoint, idem_key) DO UPDATE
+                    SET request_hash = EXCLUDED.request_hash, state = 'in_progress', response_status = NULL,
+                        response_body = NULL, content_type = NULL, created_at = NOW(), expires_at = EXCLUDED.expires_at
+                    WHERE IdempotencyKey.expires_at < NOW()
+                       OR (IdempotencyKey.state = 'in_progress'
+                           AND IdempotencyKey.created_at < NOW() - %(lock_seconds)s * INTERVAL '1 second')
+                RETURNING TRUE AS claimed, request_hash, state, response_status, response_body, content_type,
+                          created_at, FALSE AS lock_expired
+            )
+            SELECT * FROM claimed
+            UNION ALL
+            SELECT FALSE, request_hash, state, response_status, response_body, content_type,
+                   created_at, created_at < NOW() - %(lock_seconds)s * INTERVAL '1 second'
+            FROM IdempotencyKey
+            WHERE user_id = %(user_id)s AND endpoint = %(endpoint)s AND idem_key = %(key)s
+              AND NOT EXISTS (SELECT 1 FROM claimed)
+            """,
+            params
+        )
+        record = cur.fetchone()
+        if record is not None:
+            return record
+    return None
+
+
+# 이 요청이 선점한 키만 삭제 (그 사이 다른 요청이 가져간 키는 건드리지 않음)
+def delete_idempotency_claim(cur, claim):
+    cur.execute(
+        "DELETE FROM IdempotencyKey WHERE user_id = %s AND endpoint = %s AND idem_key = %s AND created_at = %s",
+        claim
+    )
+
+
+def replay_idempotent_response(record):
+    response = Response(record['response_body'], status=record['response_status'],
+                        content_type=record['content_type'])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+# 처리 트랜잭션 안에서 키를 committed로 표시 (InstrumentedConnection.commit이 커밋 직전에 호출)
+# 주문/입찰 등의 변경과 같은 트랜잭션이므로, 커밋 후 응답을 저장하기 전에 워커가 죽어도 키는 committed로 남아 다시 실행되지 않음
+# 선점 시각이 다르면(오래 걸리는 사이 다른 요청이 키를 가져감) 오류를 내서 이 트랜잭션을 커밋하지 않음
+class IdempotencyClaimLost(Exception):
+    pass
+
+
+def mark_idempotency_committed(conn):
+    claim = g.get('idempotency_claim')
+    if claim is None:
+        return
+    cur = psycopg2.extensions.cursor(conn)
+    try:
+        cur.execute(
+            """
+            UPDATE IdempotencyKey SET state = 'committed'
+            WHERE user_id = %s AND endpoint = %s AND idem_key = %s AND created_at = %s
+              AND state IN ('in_progress', 'committed')
+            """,
+            claim
+        )
+        if cur.rowcount == 0:
+            raise IdempotencyClaimLost("멱등성 키를 다른 요청이 가져가 커밋하지 않습니다.")
+    finally:
+        cur.close()
+
+
+# 클라이언트가 Idempotency-Key 헤더를 보내면 같은 키의 재시도에 처음 응답을 그대로 돌려주는 데코레이터
+# - 처음 요청: 키를 선점하고 실행한 뒤 응답을 저장
+#   처리 트랜잭션의 커밋과 함께 키를 committed로 표시 (mark_idempotency_committed)
+#   커밋하지 못한 5xx/시간 초과만 키를 풀어 다시 실행할 수 있게 함 (커밋했으면 어떤 응답이든 저장 -> 재시도가 다시 실행되지 않음)
+# - 응답을 저장하지 못하고 committed로 남은 키: 재시도는 다시 실행하지 않고 409 (내역 확인 안내)
+# - 재시도: 저장된 응답 반환 / 아직 처리 중이면 IDEMPOTENCY_WAIT_SECONDS까지 기다렸다가 반환, 그래도 안 끝나면 409
+# - 같은 키로 본문이 다른 요청: 422
+# 헤더가 없으면 기존과 똑같이 실행 (retry_transaction보다 바깥에 두어 재시도를 포함한 한 번의 실행만 기록)
+def idempotent(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key or 'user_id' not in session:
+            return func(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"error": "Idempotency-Key는 255자 이하여야 합니다."}), 400
+
+        scope = (session['user_id'], request.endpoint, key)
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        cached = idempotency_cache.get(scope)
+        if cached is not None:
+            if cached['request_hash'] != request_hash:
+                return jsonify({"error": "같은 Idempotency-Key로 다른 요청을 보낼 수 없습니다."}), 422
+            return replay_idempotent_response(cached)
+
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"error": "데이터베이스 연결 실패"}), 500
+        conn.autocommit = True
+        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        try:
+            # 1. 키 선점 (먼저 온 같은 키 요청이 처리 중이면 끝날 때까지 잠깐씩 기다림)
+            wait_until = time.monotonic() + app.config['IDEMPOTENCY_WAIT_SECONDS']
+            remaining_ms = deadline_remaining_ms()
+            if remaining_ms is not None:
+                wait_until = min(wait_until, time.monotonic() + remaining_ms / 1000.0 / 2)
+            poll_delay = 0.02
+            while True:
+                record = claim_idempotency_key(cur, scope, request_hash)
+                if record is None or record['claimed']:
+                    break
+                if record['request_hash'] != request_hash:
+                    return jsonify({"error": "같은 Idempotency-Key로 다른 요청을 보낼 수 없습니다."}), 422
+                if record['state'] == 'done':
+                    idempotency_cache.set(scope, dict(record))
+                    return replay_idempotent_response(record)
+                if record['state'] == 'committed' and record['lock_expired']:
+                    return jsonify({"error": "이미 처리된 요청이지만 응답이 저장되지 않았습니다. 주문/입찰 내역을 확인해주세요."}), 409
+                if time.monotonic() + poll_delay > wait_until:
+                    response = jsonify({"error": "같은 요청을 처리하고 있습니다. 잠시 후 다시 시도해주세요."})
+                    response.status_code = 409
+                    response.headers['Retry-After'] = '1'
+                    return response
+                time.sleep(poll_delay)
+                poll_delay = min(poll_delay * 2, 0.2)
+            if record is None:
+                return jsonify({"error": "요청 중복 확인에 실패했습니다. 잠시 후 다시 시도해주세요."}), 503
+
+            # 2. 실제 처리 (커밋 여부는 InstrumentedConnection.commit이 g.committed로 표시)
+            claim = scope + (record['created_at'],)
+            g.committed = False
+            g.idempotency_claim = claim
+            try:
+                response = app.make_response(func(*args, **kwargs))
+            except BaseException as e:
+                if not g.get('committed'):
+                    delete_idempotency_claim(cur, claim)
+                    raise
+                if not isinstance(e, Exception):
+                    raise
+                # 커밋 이후의 오류: 같은 키로 다시 실행하지 않도록 오류 응답을 완료로 저장
+                print(f"[멱등성 키] 커밋 이후 오류: {current_route_label()}")
+                response = jsonify({"error": "요청은 처리되었지만 응답을 만들지 못했습니다. 내역을 확인해주세요."})
+                response.status_code = 500
+            finally:
+                g.idempotency_claim = None
+
+            # 3. 결과 저장 (커밋하지 못한 일시적인 실패는 저장하지 않음 -> 같은 키로 다시 실행 가능)
+            if not g.get('committed') and (response.status_code >= 500 or g.get('deadline_error')):
+                delete_idempotency_claim(cur, claim)
+            else:
+                record = {
+                    'request_hash': request_hash, 'state': 'done', 'response_status': response.status_code,
+                    'response_body': response.get_data(as_text=True), 'content_type': response.content_type
+                }
+                cur.execute(
+                    """
+                    UPDATE IdempotencyKey
+                    SET state = 'done', response_status = %s, response_body = %s, content_type = %s
+                    WHERE user_id = %s AND endpoint = %s AND idem_key = %s AND created_at = %s
+                    """,
+                    (record['response_status'], record['response_body'], record['content_type']) + claim
+                )
+                if cur.rowcount:
+                    idempotency_cache.set(scope, record)
+                if random.random() < app.config['IDEMPOTENCY_PURGE_SAMPLE_RATE']:
+                    cur.execute(
+                        """
+                        DELETE FROM IdempotencyKey
+                        WHERE ctid = ANY (ARRAY(SELECT ctid FROM IdempotencyKey WHERE expires_at < NOW() LIMIT 1000))
+                        """
+                    )
+            return response
+        finally:
+            cur.close()
+            conn.close()
+
+    return wrapper
+
+
+# --- 입장 제어(admission control) / 요청 속도 제한 설정 ---
+# 한정 수량 판매나 경매 마감 때 봇이 입찰/주문 API를 몰아 호출해도, DB 연결을 잡기 전에 바로 429로 돌려보냄
+# - 토큰 버킷: 초당 RATE개씩 채워지고 최대 BURST개까지 쌓이며, 요청 1건이 1개를 사용 (사용자별 / 상품별)
+# - 동시 실행 수: 쓰기 라우트는 워커 프로세스마다 WRITE_CONCURRENCY_MAX개까지만 동시에 DB 작업
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+# 버킷 저장소: memory(워커 프로세스마다 따로) / postgres(sql/rate_limit_buckets.sql, 모든 워커와 서버가 공유)
+app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+app.config['RATE_LIMIT_USER_RATE'] = float(os.environ.get('RATE_LIMIT_USER_RATE', '2'))  # 사용자별 초당 요청 수 (라우트마다 따로, 0이면 제한 없음)
+app.config['RATE_LIMIT_USER_BURST'] = int(os.environ.get('RATE_LIMIT_USER_BURST', '10'))
+app.config['RATE_LIMIT_LISTING_RATE'] = float(os.environ.get('RATE_LIMIT_LISTING_RATE', '50'))  # 상품(판매 목록/경매)별 초당 요청 수 (0이면 제한 없음)
+app.config['RATE_LIMIT_LISTING_BURST'] = int(os.environ.get('RATE_LIMIT_LISTING_BURST', '100'))
+app.config['RATE_LIMIT_MAX_BUCKETS'] = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', '100000'))  # memory 저장소의 최대 버킷 수
+app.config['RATE_LIMIT_PURGE_SAMPLE_RATE'] = float(os.environ.get('RATE_LIMIT_PURGE_SAMPLE_RATE', '0.001'))  # postgres 저장소의 오래된 버킷 정리 확률
+app.config['RATE_LIMIT_MAX_TARGETS'] = int(os.environ.get('RATE_LIMIT_MAX_TARGETS', '20'))  # 요청 1건이 사용할 수 있는 상품별 버킷 수 (넘으면 400)
+# 워커당 쓰기 라우트 동시 실행 수
+# gunicorn gthread 워커는 GUNICORN_THREADS개 요청만 동시에 처리하므로 이 값이 스레드 수 이상이면 제한이 걸리지 않음
+# 기본값은 스레드 수 - 1 (쓰기가 몰려도 조회 요청이 쓸 스레드 1개를 남김)
+app.config['WRITE_CONCURRENCY_MAX'] = int(os.environ.get(
+    'WRITE_CONCURRENCY_MAX', max(1, int(os.environ.get('GUNICORN_THREADS', '4')) - 1)))
+# 워커당 동시 SSE 스트림 수: 스트림은 연결이 유지되는 동안(최대 ORDER_FEED_MAX_SECONDS) 스레드 1개를 계속 잡음
+# 기본값은 스레드 수의 절반 (넘으면 503 + Retry-After, 클라이언트는 조회 API로 확인)
+app.config['SSE_STREAMS_MAX'] = int(os.environ.get(
+    'SSE_STREAMS_MAX', max(1, int(os.environ.get('GUNICORN_THREADS', '4')) // 2)))
+
+
+# 프로세스 안에서만 쓰는 토큰 버킷 저장소
+class MemoryTokenBuckets:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._buckets = {}  # key -> [남은 토큰, 마지막 갱신 시각, rate, burst]
+        self._lock = threading.Lock()
+
+    # limits: [(key, rate, burst), ...]
+    # 모두 통과하면 각 버킷에서 1개씩 쓰고 None, 하나라도 비어 있으면 아무 버킷도 쓰지 않고 (key, 다시 시도까지 초) 반환
+    def take(self, limits):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) + len(limits) > self.max_entries:
+                self._evict(now)
+            refilled = []
+            for key, rate, burst in limits:
+                bucket = self._buckets.get(key)
+                tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+                if tokens < 1:
+                    return key, (1 - tokens) / rate
+                refilled.append((key, tokens, rate, burst))
+            for key, tokens, rate, burst in refilled:
+                self._buckets[key] = [tokens - 1, now, rate, burst]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _evict(self, now):
+        # 1순위: 이미 가득 찬 버킷 제거 (지워도 새로 만든 버킷과 같음), 그래도 넘치면 먼저 만든 버킷부터 제거
+        for key in [k for k, (tokens, updated, rate, burst) in self._buckets.items()
+                    if tokens + (now - updated) * rate >= burst]:
+            del self._buckets[key]
+        while self._buckets and len(self._buckets) >= self.max_entries:
+            del self._buckets[next(iter(self._buckets))]
+
+
+# 여러 워커/서버가 공유하는 토큰 버킷 저장소 (RateLimitBucket 테이블)
+# 요청마다 짧은 autocommit 연결이 하나 더 필요하므로, 워커 간에 같은 한도를 지켜야 할 때만 사용
+class PostgresTokenBuckets:
+    def take(self, limits):
+        conn = get_db_connection()
+        if conn is None:
+            raise psycopg2.OperationalError("속도 제한 저장소 DB 연결 실패")
+        conn.autocommit = True
+        cur = conn.cursor()
+        try:
+            params = {
+                'keys': [key for key, _, _ in limits],
+                'rates': [rate for _, rate, _ in limits],
+                'bursts': [burst for _, _, burst in limits],
+                'count': len(limits)
+            }
+            rows = self._take(cur, params)
+            if len(rows) < len(limits):
+                # 처음 보는 버킷은 가득 찬 상태로 만든 뒤 다시 시도
+                cur.execute(
+                    """
+                    INSERT INTO RateLimitBucket (bucket_key, tokens)
+                    SELECT bucket_key, burst FROM unnest(%(keys)s::text[], %(bursts)s::float8[]) AS r (bucket_key, burst)
+                    ON CONFLICT (bucket_key) DO NOTHING
+                    """,
+                    params
+                )
+                rows = self._take(cur, params)
+            if random.random() < app.config['RATE_LIMIT_PURGE_SAMPLE_RATE']:
+                cur.execute(
+                    """
+                    DELETE FROM RateLimitBucket
+                    WHERE ctid = ANY (ARRAY(SELECT ctid FROM RateLimitBucket
+                                            WHERE updated_at < NOW() - INTERVAL '10 minutes' LIMIT 1000))
+                    """
+                )
+        finally:
+            cur.close()
+            conn.close()
+
+        if rows and rows[0][3]:
+            return None
+        key, tokens, rate, _ = min(rows, key=lambda row: row[1])
+        return key, (1 - tokens) / rate
+
+    def _take(self, cur, params):
+        # 버킷 행을 키 순서로 잠그고(교착 방지) 다시 채운 값을 계산한 뒤, 모두 1개 이상이면 한꺼번에 1개씩 사용
+        # 반환: [(key, 다시 채운 토큰, rate, 통과 여부), ...]
+        cur.execute(
+            """
+            WITH locked AS (
+                SELECT b.bucket_key, r.rate,
+                       LEAST(r.burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * r.rate) AS tokens
+                FROM RateLimitBucket b
+                JOIN unnest(%(keys)s::text[], %(rates)s::float8[], %(bursts)s::float8[]) AS r (bucket_key, rate, burst)
+                  ON r.bucket_key = b.bucket_key
+                ORDER BY b.bucket_key
+                FOR UPDATE OF b
+            ),
+            decision AS (
+                SELECT COUNT(*) = %(count)s AND COALESCE(bool_and(tokens >= 1), FALSE) AS allowed FROM locked
+            ),
+            taken AS (
+                UPDATE RateLimitBucket b
+                SET tokens = locked.tokens - 1, updated_at = clock_timestamp()
+                FROM locked, decision
+                WHERE b.bucket_key = locked.bucket_key AND decision.allowed
+            )
+            SELECT locked.bucket_key, locked.tokens, locked.rate, decision.allowed
+            FROM locked, decision
+            """,
+            params
+        )
+        return cur.fetchall()
+
+
+# 쓰기 라우트 동시 실행 수 제한 (기다리지 않고 자리가 없으면 바로 거절)
+class ConcurrencyLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+memory_rate_buckets = MemoryTokenBuckets(app.config['RATE_LIMIT_MAX_BUCKETS'])
+postgres_rate_buckets = PostgresTokenBuckets()
+write_limiter = ConcurrencyLimiter(app.config['WRITE_CONCURRENCY_MAX'])
+stream_limiter = ConcurrencyLimiter(app.config['SSE_STREAMS_MAX'])
+
+
+# 상품별 버킷 키: 정수 ID만 허용 (본문의 임의 문자열마다 버킷이 새로 만들어지지 않도록)
+# 정수가 아니면 ValueError -> admission_control이 400으로 응답
+def rate_limit_target(prefix, value):
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"유효하지 않은 ID: {value!r}")
+    return f"{prefix}:{value}"
+
+
+# 현재 요청이 사용할 버킷 목록: 사용자(비로그인은 IP) x 라우트, 그리고 targets가 본문에서 뽑은 상품별 버킷
+# 상품별 버킷이 RATE_LIMIT_MAX_TARGETS개를 넘으면 ValueError
+def rate_limits_for_request(targets):
+    limits = []
+    if app.config['RATE_LIMIT_USER_RATE'] > 0:
+        client = f"user:{session['user_id']}" if 'user_id' in session else f"ip:{request.remote_addr}"
+        limits.append((f"{request.endpoint}:{client}", app.config['RATE_LIMIT_USER_RATE'],
+                       app.config['RATE_LIMIT_USER_BURST']))
+    if targets is not None and app.config['RATE_LIMIT_LISTING_RATE'] > 0:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            target_keys = sorted(set(targets(data)))
+            if len(target_keys) > app.config['RATE_LIMIT_MAX_TARGETS']:
+                raise ValueError(f"한 번에 {app.config['RATE_LIMIT_MAX_TARGETS']}개 상품까지 요청할 수 있습니다.")
+            for target in target_keys:
+                limits.append((target, app.config['RATE_LIMIT_LISTING_RATE'], app.config['RATE_LIMIT_LISTING_BURST']))
+    return limits
+
+
+# 버킷에서 토큰을 가져옴 (postgres 저장소에 접속할 수 없으면 이 워커의 memory 저장소로 대신 제한)
+def take_rate_limit_tokens(limits):
+    if not limits:
+        return None
+    if app.config['RATE_LIMIT_BACKEND'] == 'postgres':
+        try:
+            return postgres_rate_buckets.take(limits)
+        except psycopg2.Error as e:
+            print(f"[속도 제한] 공유 저장소 오류로 워커 내 버킷을 사용합니다. ({e})")
+    return memory_rate_buckets.take(limits)
+
+
+def too_many_requests_response(reason, retry_after):
+    RATE_LIMITED_TOTAL.inc(current_route_label(), reason)
+    response = jsonify({"error": "요청이 너무 많습니다. 잠시 후 다시 시도해주세요."})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+# SSE 응답 생성: 워커당 SSE_STREAMS_MAX개까지만 열고, 연결이 닫히면(응답 close) 자리를 반환
+# 자리가 없으면 503 + Retry-After
+def limited_event_stream(generate, retry_after=5):
+    if not stream_limiter.try_acquire():
+        RATE_LIMITED_TOTAL.inc(current_route_label(), 'streams')
+        response = jsonify({"error": "실시간 연결이 많아 잠시 후 다시 시도해주세요."})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    try:
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except Exception:
+        stream_limiter.release()
+        raise
+    response.call_on_close(stream_limiter.release)
+    return response
+
+
+# 입장 제어 데코레이터: 라우트 본문(검증, DB 연결)보다 먼저 동시 실행 수와 토큰 버킷을 확인
+# targets: 요청 본문(JSON)에서 상품별 버킷 키 목록을 뽑는 함수 (None이면 상품별 제한 없음)
+# buckets=False이면 동시 실행 수만 제한
+# @idempotent보다 바깥에 두어, 거절된 요청은 멱등성 키도 선점하지 않음
+def admission_control(targets=None, buckets=True):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not app.config['RATE_LIMIT_ENABLED']:
+                return func(*args, **kwargs)
+            if not write_limiter.try_acquire():
+                return too_many_requests_response('concurrency', 1)
+            try:
+                if buckets:
+                    try:
+                        limits = rate_limits_for_request(targets)
+                    except ValueError as e:
+                        return jsonify({"error": f"유효하지 않은 요청입니다. ({e})"}), 400
+                    blocked = take_rate_limit_tokens(limits)
+                    if blocked is not None:
+                        key, retry_after = blocked
+                        reason = 'user' if key.startswith(f"{request.endpoint}:") else 'listing'
+                        return too_many_requests_response(reason, retry_after)
+                return func(*args, **kwargs)
+            finally:
+                write_limiter.release()
+
+        return wrapper
+
+    return decorator
+
+
 # DB 연결 상태를 확인하는 함수
 def check_db_connection():
     conn = get_db_connection()
@@ -106,9 +1915,18 @@ def format_number(value):
 app.jinja_env.filters['number_format'] = format_number
 
 
+# DB 장애로 마지막 정상 결과(stale)를 보여준 응답에는 Warning 헤더 추가
+@app.after_request
+def add_stale_warning_header(response):
+    if g.get('served_stale'):
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    return response
+
+
 # DB에서 상품을 조회하는 공통 함수
+@single_flight(timeout_result=([], 0), stale_fallback=True)
 def get_products_from_db(role=None, category=None, search_term=None, auction_only=False, sort_by='latest'):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return [], 0
 
@@ -203,15 +2021,76 @@ def get_products_from_db(role=None, category=None, search_term=None, auction_onl
         conn.close()
 
     except Exception as e:
+        db_state.failed = True  # 빈 목록을 마지막 정상 결과로 저장하지 않도록
         if conn:
             conn.close()
         print(f"상품 조회 중 오류 발생: {str(e)}")
 
     return products, len(products)
 
+
+# 상품별(Product) 묶음 보기용 조회 함수 (ProductPriceSummary의 미리 계산된 행만 읽음)
+@single_flight(timeout_result=([], 0), stale_fallback=True)
+def get_product_groups_from_db(role=None, category=None, search_term=None, sort_by='latest'):
+    conn = get_db_connection(role=role, readonly=True)
+    if conn is None:
+        return [], 0
+
+    groups = []
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+        sql_query = """
+            SELECT P.product_id,
+                   P.name      AS product_name,
+                   P.category,
+                   P.rating    AS product_rating,
+                   P.image_url,
+                   S.listing_count,
+                   S.min_price,
+                   S.max_price,
+                   S.avg_price,
+                   S.cheapest_listing_id
+            FROM ProductPriceSummary S
+                     JOIN Product P ON S.product_id = P.product_id
+            WHERE S.condition = %s
+        """
+        params = [PRICE_SUMMARY_ALL]
+
+        if category:
+            sql_query += " AND P.category = %s"
+            params.append(category)
+        if search_term:
+            sql_query += " AND P.name LIKE %s"
+            params.append(f"%{search_term}%")
+
+        # 정렬 로직 (상품 단위이므로 최저가/최고가 기준)
+        if sort_by == 'low_price':
+            sql_query += " ORDER BY S.min_price ASC, P.product_id DESC"
+        elif sort_by == 'high_price':
+            sql_query += " ORDER BY S.max_price DESC, P.product_id DESC"
+        elif sort_by == 'rating':
+            sql_query += " ORDER BY P.rating DESC NULLS LAST, P.product_id DESC"
+        else:
+            sql_query += " ORDER BY P.product_id DESC"
+
+        cur.execute(sql_query, tuple(params))
+        groups = [dict(row) for row in cur.fetchall()]
+
+        cur.close()
+        conn.close()
+
+    except Exception as e:
+        db_state.failed = True  # 빈 목록을 마지막 정상 결과로 저장하지 않도록
+        if conn:
+            conn.close()
+        print(f"상품별 가격 비교 조회 중 오류 발생: {str(e)}")
+
+    return groups, len(groups)
+
 #Product 테이블에 등록된 모든 상품 이름을 조회
 def get_all_product_names(role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return []
     names = []
@@ -234,7 +2113,13 @@ def get_all_product_names(role=None):
 
 # 사용자 정보 가져오는 함수
 def get_user_profile_data(user_id, role):
-    conn = get_db_connection(role=map_role_to_db_role(role))
+    # 캐시에 있으면 DB를 거치지 않음 (프로필 수정/판매자 등급 변경 시 invalidate_user_profile로 제거)
+    cache_key = (user_id, session.get('profile_version') if has_request_context() else None)
+    user_profile = user_profile_cache.get(cache_key)
+    if user_profile is not None:
+        return user_profile
+
+    conn = get_db_connection(role=map_role_to_db_role(role), readonly=True)
     if conn is None:
         return None
 
@@ -242,28 +2127,32 @@ def get_user_profile_data(user_id, role):
     cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
     try:
-        # 1. Users 테이블에서 이름 조회 (세션에 이름이 없는 경우 대비)
-        cur.execute("SELECT name, role FROM Users WHERE user_id = %s", (user_id,))
-        user_data = cur.fetchone()
-        if user_data:
-            user_profile['user']['name'] = user_data['name']
-            user_profile['user']['role'] = user_data['role']  # 혹시 세션과 다를 경우 갱신
-
-        # 2. 역할별 상세 프로필 조회
+        # Users와 역할별 프로필(BuyerProfile / SellerProfile + SellerEvaluation)을 한 번에 조회
+        cur.execute(
+            """
+            SELECT u.name, u.role, bp.address, sp.store_name, se.grade, se.avg_score
+            FROM Users u
+            LEFT JOIN BuyerProfile bp ON bp.user_id = u.user_id
+            LEFT JOIN SellerProfile sp ON sp.user_id = u.user_id
+            LEFT JOIN SellerEvaluation se ON se.seller_id = u.user_id
+            WHERE u.user_id = %s
+            """,
+            (user_id,)
+        )
+        row = cur.fetchone()
+        if row:
+            user_profile['user']['name'] = row['name']
+            user_profile['user']['role'] = row['role']  # 혹시 세션과 다를 경우 갱신
+
+        # 역할별 상세 프로필 구성
         if role == 'Buyer':
-            cur.execute("SELECT address FROM BuyerProfile WHERE user_id = %s", (user_id,))
-            user_profile['buyer_profile'] = dict(cur.fetchone()) if cur.rowcount > 0 else {}
+            user_profile['buyer_profile'] = {'address': row['address']} if row and row['address'] is not None else {}
         elif role in ['PrimarySeller', 'Reseller']:
-            #  SellerProfile에서 기본 정보 (상점 이름) 조회
-            cur.execute("SELECT store_name FROM SellerProfile WHERE user_id = %s", (user_id,))
-            seller_profile = dict(cur.fetchone()) if cur.rowcount > 0 else {}
-            # SellerEvaluation에서 등급 및 점수 조회
-            cur.execute("SELECT grade, avg_score FROM SellerEvaluation WHERE seller_id = %s", (user_id,))
-            evaluation_data = cur.fetchone()
-            # 조회된 데이터 통합
-            if evaluation_data:
+            seller_profile = {'store_name': row['store_name']} if row and row['store_name'] is not None else {}
+            if row and row['grade'] is not None:
                 # 평가 데이터가 있으면 프로필에 추가
-                seller_profile.update(dict(evaluation_data))
+                seller_profile['grade'] = row['grade']
+                seller_profile['avg_score'] = row['avg_score']
             else:
                 seller_profile['grade'] = 'Bronze'
                 seller_profile['avg_score'] = 0.0
@@ -273,6 +2162,8 @@ def get_user_profile_data(user_id, role):
 
         cur.close()
         conn.close()
+        if row:
+            user_profile_cache.set(cache_key, user_profile)
         return user_profile
 
     except Exception as e:
@@ -282,10 +2173,18 @@ def get_user_profile_data(user_id, role):
         return None
 
 
+# 사용자 프로필 캐시 무효화 함수 (쓰기 API에서 commit 이후 호출)
+def invalidate_user_profile(user_id):
+    user_profile_cache.invalidate_where(lambda profile: profile['user']['id'] == user_id)
+    # 본인 요청이면 profile_version을 바꿔 다른 워커에 남은 이전 항목도 이 세션에서는 쓰이지 않게 함
+    if has_request_context() and session.get('user_id') == user_id:
+        session['profile_version'] = uuid.uuid4().hex
+
+
 
 #관리자용 상품 목록 조회
 def get_products_for_admin_rating(role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return jsonify({"error": "DB 연결 실패"}), 500
     try:
@@ -322,16 +2221,62 @@ def get_products_for_admin_rating(role=None):
             conn.close()
         return jsonify({"error": f"상품 목록 조회 오류: {str(e)}"}), 500
 
+# --- 구매자 주문 내역 페이지 설정 ---
+app.config['ORDER_HISTORY_PAGE_SIZE'] = int(os.environ.get('ORDER_HISTORY_PAGE_SIZE', '20'))
+
+# 주문 상태 값 (주문 내역 상태 필터에 사용)
+ORDER_STATUSES = ['상품 준비중', '배송 중', '배송 완료', '구매 확정', '환불', '교환']
+
+
+# 주문 내역 페이지 커서: 마지막으로 보여준 주문의 정렬 키를 '_'로 이어 붙인 문자열
+# 예: '2025-01-02T10:00:00.123456_812' (후기 탭은 앞에 후기 작성 여부 0/1이 붙음)
+def encode_order_cursor(order, with_feedback=False):
+    parts = [order['order_date'].isoformat(), str(order['order_id'])]
+    if with_feedback:
+        parts.insert(0, '1' if order['feedback_submitted_flag'] else '0')
+    return '_'.join(parts)
+
+
+def decode_order_cursor(cursor, with_feedback=False):
+    # 잘못된 커서는 첫 페이지로 처리
+    if not cursor:
+        return None
+    try:
+        parts = cursor.split('_')
+        feedback_submitted = None
+        if with_feedback:
+            feedback_submitted = {'0': False, '1': True}[parts.pop(0)]
+        order_date_text, order_id_text = parts
+        return feedback_submitted, datetime.datetime.fromisoformat(order_date_text), int(order_id_text)
+    except (ValueError, KeyError):
+        return None
+
+
 # 주문 목록 조회 함수 (구매자 전용)
-def get_orders_for_buyer(user_id, order_status, role=None):
-    conn = get_db_connection(role=role)
+# (order_date, order_id) 기준 keyset 페이지네이션: 주문 이력이 아무리 길어도 한 페이지만 인덱스로 읽음
+# order_status: 'all_status' (주문/배송 내역 탭) / 'finished_order' (후기 탭: 구매 확정 주문, 후기 미작성 먼저)
+# status_filter: 주문 상태로 거르기 (all_status에서만 사용) / after: 이전 페이지의 next_cursor
+# 반환: (주문 목록, 다음 페이지 커서 - 마지막 페이지면 None)
+def get_orders_for_buyer(user_id, order_status, role=None, status_filter=None, after=None, page_size=None):
+    page_size = page_size or app.config['ORDER_HISTORY_PAGE_SIZE']
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
-        return [], 0
+        return [], None
     orders = []
     try:
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         if order_status == 'all_status':
-            cur.execute("""
+            conditions = ["O.buyer_id = %s"]
+            params = [user_id]
+            if status_filter:
+                conditions.append("O.status = %s")
+                params.append(status_filter)
+            position = decode_order_cursor(after)
+            if position:
+                conditions.append("(O.order_date, O.order_id) < (%s, %s)")
+                params.extend(position[1:])
+            # 분쟁은 주문당 가장 최근 건만 (주문 1건 = 1행으로 유지해야 페이지 크기가 정확함)
+            cur.execute(f"""
                         SELECT O.order_id,
                            O.quantity,
                            O.total_price,
@@ -345,54 +2290,82 @@ def get_orders_for_buyer(user_id, order_status, role=None):
                            D.issue_type
                     FROM orderb O
                     JOIN v_all_products V ON O.listing_id = V.listing_id
-                    LEFT JOIN Dispute D ON O.order_id = D.order_id
-                    WHERE O.buyer_id = %s
-                      and O.listing_id = V.listing_id
-                    ORDER BY O.order_date DESC;
-                    """, (user_id,))
+                    LEFT JOIN LATERAL (
+                        SELECT status, issue_type FROM Dispute
+                        WHERE Dispute.order_id = O.order_id
+                        ORDER BY dispute_id DESC
+                        LIMIT 1
+                    ) D ON TRUE
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY O.order_date DESC, O.order_id DESC
+                    LIMIT %s;
+                    """, params + [page_size + 1])
+            orders = [dict(row) for row in cur.fetchall()]
+            next_cursor = encode_order_cursor(orders[page_size - 1]) if len(orders) > page_size else None
 
         elif order_status == 'finished_order':
-            cur.execute("""
-                               SELECT 
-                               O.order_id,
-                               O.order_date,
-                               V.product_name,
-                               V.seller_name,
-                               V.seller_id,
-                               V.image_url,
-                               V.listing_id,
-                               
-                               -- 후기 정보 추가
-                               F.rating AS feedback_rating,
-                               F.comment AS feedback_comment,
-                               
-                               -- 후기 제출 여부 플래그: Feedback 행이 있으면 TRUE
-                               CASE WHEN F.feedback_id IS NOT NULL THEN TRUE ELSE FALSE END AS feedback_submitted
-                               
-                        FROM orderb O
-                        JOIN v_all_products V ON O.listing_id = V.listing_id
-                        LEFT JOIN Feedback F ON O.order_id = F.order_id 
-                        
-                        WHERE O.buyer_id = %s
-                          AND O.status = '구매 확정'
-                          
-                        ORDER BY feedback_submitted ASC,
-                            O.order_date DESC;
-                        """, (user_id,))
-        orders = [dict(row) for row in cur.fetchall()]
+            # 후기 미작성(feedback_submitted = FALSE) 구간을 먼저, 그다음 작성 완료 구간을 최신순으로 보여줌
+            # 구간마다 인덱스 범위 하나만 읽도록 나눠서 조회 (한 페이지에 최대 2번)
+            position = decode_order_cursor(after, with_feedback=True)
+            sections = [False, True]
+            if position:
+                sections = sections[sections.index(position[0]):]
+            for submitted in sections:
+                params = [user_id, submitted]
+                keyset = ""
+                if position and position[0] == submitted:
+                    keyset = "AND (O.order_date, O.order_id) < (%s, %s)"
+                    params.extend(position[1:])
+                cur.execute(f"""
+                                   SELECT 
+                                   O.order_id,
+                                   O.order_date,
+                                   O.feedback_submitted AS feedback_submitted_flag,
+                                   V.product_name,
+                                   V.seller_name,
+                                   V.seller_id,
+                                   V.image_url,
+                                   V.listing_id,
+                                   
+                                   -- 후기 정보 추가
+                                   F.rating AS feedback_rating,
+                                   F.comment AS feedback_comment,
+                                   
+                                   -- 후기 제출 여부 플래그: Feedback 행이 있으면 TRUE
+                                   CASE WHEN F.feedback_id IS NOT NULL THEN TRUE ELSE FALSE END AS feedback_submitted
+                                   
+                            FROM orderb O
+                            JOIN v_all_products V ON O.listing_id = V.listing_id
+                            LEFT JOIN Feedback F ON O.order_id = F.order_id 
+                            
+                            WHERE O.buyer_id = %s
+                              AND O.status = '구매 확정'
+                              AND O.feedback_submitted = %s
+                              {keyset}
+                              
+                            ORDER BY O.order_date DESC, O.order_id DESC
+                            LIMIT %s;
+                            """, params + [page_size + 1 - len(orders)])
+                orders.extend(dict(row) for row in cur.fetchall())
+                if len(orders) > page_size:
+                    break
+            next_cursor = (encode_order_cursor(orders[page_size - 1], with_feedback=True)
+                           if len(orders) > page_size else None)
+        else:
+            next_cursor = None
         cur.close()
         conn.close()
-        return orders
+        return orders[:page_size], next_cursor
     except Exception as e:
         if conn:
             conn.close()
         print(f"주문/배송 내역 조회 중 오류 발생: {str(e)}")
-        return []  # 오류 시 빈 리스트 반환
+        return [], None  # 오류 시 빈 리스트 반환
 
 
 # ---  판매자 주문/판매 내역 조회 함수 (Seller 전용) ---
 def get_sales_for_seller(user_id, role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return []
 
@@ -436,7 +2409,7 @@ def get_sales_for_seller(user_id, role=None):
 
 #판매자 본인 판매 상품 총 매줓 조회 함수
 def show_seller_sales(user_id, role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
 
     if not conn:
         return "DB 연결 오류", 500
@@ -470,7 +2443,7 @@ def show_seller_sales(user_id, role=None):
 
 #판매자 본인 등록 상품 조회 함수
 def get_my_products_list(user_id, role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return []
 
@@ -520,7 +2493,7 @@ def calculate_cart_count(user_id, role=None):
     if not user_id:
         return 0
 
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return 0
 
@@ -543,7 +2516,7 @@ def calculate_cart_count(user_id, role=None):
 
 #관리자 분쟁 조정 함수 (모든 분쟁 조회)
 def get_disputes(role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return []
 
@@ -583,7 +2556,7 @@ def get_disputes(role=None):
 
 #구매자의 분쟁 조회 함수
 def get_disputes_for_buyer(buyer_id, role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return []
 
@@ -620,7 +2593,7 @@ def get_disputes_for_buyer(buyer_id, role=None):
 
 #구매자가 등록한 모든 피드백 조회 함수 (관리자용)
 def get_all_feedback_for_admin(role=None):
-    conn = get_db_connection(role=role)
+    conn = get_db_connection(role=role, readonly=True)
     if conn is None:
         return []
 
@@ -701,69 +2674,619 @@ def update_seller_evaluation(cur, conn, seller_id):
         (final_score, final_grade, seller_id)
     )
 
-    # 4. SellerProfile에도 등급 수정 (SellerEvaluation의 확정 등급을 반영)
-    cur.execute(
-        """
-        UPDATE SellerProfile
-        SET grade = %s
-        WHERE user_id = %s
-        """,
-        (final_grade, seller_id,)
-    )
-    #update_seller_evaluation 함수 내에서는 commit을 수행하지 않고, 트랜잭션의 최종 commit은 api_admin_seller_eval에서 한 번만 처리함.
+    # 4. SellerProfile에도 등급 수정 (SellerEvaluation의 확정 등급을 반영)
+    cur.execute(
+        """
+        UPDATE SellerProfile
+        SET grade = %s
+        WHERE user_id = %s
+        """,
+        (final_grade, seller_id,)
+    )
+    #update_seller_evaluation 함수 내에서는 commit을 수행하지 않고, 트랜잭션의 최종 commit은 api_admin_seller_eval에서 한 번만 처리함.
+    #프로필 캐시(user_profile_cache)도 commit 이후 호출한 쪽에서 invalidate_user_profile(seller_id)로 무효화함.
+
+
+#상품별 가격 비교 집계 갱신 함수 (ProductPriceSummary)
+def refresh_product_price_summary(cur, product_id):
+    refresh_product_price_summaries(cur, [product_id])
+
+
+# 여러 상품의 집계를 상품 수와 관계없이 같은 수의 SQL로 갱신 (주문 한 건에 여러 상품이 있을 때)
+def refresh_product_price_summaries(cur, product_ids):
+    # 해당 product_id의 집계 행만 다시 계산 (카탈로그 전체를 스캔하지 않음)
+    # 판매중이면서 재고가 남은 Listing만 '활성 판매'로 집계
+    # 같은 상품을 동시에 갱신하는 트랜잭션은 advisory lock으로 차례대로 실행
+    # (둘 다 DELETE 후 INSERT하면 나중 INSERT가 기본 키 충돌로 실패함, 잠금은 트랜잭션이 끝날 때 풀림)
+    # 여러 상품을 잠글 때는 product_id 순서로 잠가 교착 상태를 피함
+    product_ids = sorted({product_id for product_id in product_ids if product_id is not None})
+    if not product_ids:
+        return
+    cur.execute(
+        """
+        SELECT pg_advisory_xact_lock(%s, P.product_id) FROM UNNEST(%s::int[]) AS P(product_id);
+        DELETE FROM ProductPriceSummary WHERE product_id = ANY(%s::int[])
+        """,
+        (PRICE_SUMMARY_LOCK_CLASS, product_ids, product_ids)
+    )
+    cur.execute(
+        """
+        INSERT INTO ProductPriceSummary (product_id, condition, listing_count, min_price, max_price, avg_price,
+                                         cheapest_listing_id)
+        SELECT product_id,
+               CASE WHEN GROUPING(condition) = 1 THEN %s ELSE COALESCE(condition::text, %s) END,
+               COUNT(*),
+               MIN(price),
+               MAX(price),
+               ROUND(AVG(price), 0),
+               (ARRAY_AGG(listing_id ORDER BY price ASC, listing_id ASC))[1]
+        FROM Listing
+        WHERE product_id = ANY(%s::int[])
+          AND status = '판매중'
+          AND stock > 0
+        GROUP BY GROUPING SETS ((product_id), (product_id, condition))
+        """,
+        (PRICE_SUMMARY_ALL, PRICE_SUMMARY_NO_CONDITION, product_ids)
+    )
+    #이 함수도 commit을 수행하지 않음. Listing 변경과 같은 트랜잭션에서 함께 commit됨.
+
+
+# --- 주문 이벤트 로그 (sql/order_events.sql) ---
+app.config['ORDER_EVENT_CHANNEL'] = os.environ.get('ORDER_EVENT_CHANNEL', 'order_events')  # NOTIFY 채널 이름
+
+
+#주문 이벤트 기록 함수
+# events: [(order_id, event_type, from_status, to_status), ...]
+# 트랜잭션에서 생긴 이벤트를 모아 INSERT 한 번으로 기록하고, 같은 문장에서 이벤트마다 NOTIFY를 보냄
+# (NOTIFY는 commit 시점에 전달되므로 롤백된 변경은 구독자에게 전달되지 않음)
+def record_order_events(cur, events):
+    if not events:
+        return
+    order_ids, event_types, from_statuses, to_statuses = (list(column) for column in zip(*events))
+    cur.execute(
+        """
+        WITH new_events AS (
+            INSERT INTO OrderEvent (order_id, buyer_id, seller_id, event_type, from_status, to_status)
+            SELECT E.order_id, O.buyer_id, L.seller_id, E.event_type, E.from_status, E.to_status
+            FROM UNNEST(%s::int[], %s::varchar[], %s::varchar[], %s::varchar[]) WITH ORDINALITY
+                     AS E(order_id, event_type, from_status, to_status, seq)
+                     JOIN Orderb O ON O.order_id = E.order_id
+                     JOIN Listing L ON L.listing_id = O.listing_id
+            ORDER BY E.seq
+            RETURNING event_id, order_id, buyer_id, seller_id, event_type, from_status, to_status, created_at
+        )
+        SELECT pg_notify(%s, row_to_json(new_events)::text) FROM new_events
+        """,
+        (order_ids, event_types, from_statuses, to_statuses, app.config['ORDER_EVENT_CHANNEL'])
+    )
+    #commit은 호출한 쪽의 트랜잭션에서 함께 수행됨.
+
+
+# event_id(BIGSERIAL)는 INSERT 순서로 정해지고 커밋 순서와 다를 수 있음
+# (먼저 번호를 받은 트랜잭션이 나중에 커밋되면, 더 큰 event_id를 이미 받은 뒤에 작은 event_id가 도착함)
+# 따라서 "마지막 event_id 이하는 이미 받음"으로 걸러내면 늦게 커밋된 이벤트를 잃음 -> 받은 event_id를 직접 기억해서 중복을 거름
+app.config['ORDER_EVENT_SEEN_MAX'] = int(os.environ.get('ORDER_EVENT_SEEN_MAX', '10000'))  # 중복 확인용으로 기억하는 최근 event_id 수
+app.config['ORDER_EVENT_RESUME_OVERLAP'] = int(os.environ.get('ORDER_EVENT_RESUME_OVERLAP', '1000'))  # 이어 받을 때 마지막 event_id보다 이만큼 앞에서부터 다시 읽음
+app.config['ORDER_EVENT_BACKLOG_PAGE'] = int(os.environ.get('ORDER_EVENT_BACKLOG_PAGE', '500'))  # 밀린 이벤트를 한 번에 읽는 수
+
+
+# 최근에 받은 event_id 집합 (max_entries개를 넘으면 먼저 받은 것부터 잊음)
+# high_water: 지금까지 받은 가장 큰 event_id (이어 받을 위치 계산용)
+class RecentEventIds:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.high_water = 0
+        self._ids = set()
+        self._order = collections.deque()
+
+    # 처음 받은 event_id이면 기억하고 True, 이미 받은 것이면 False
+    def add(self, event_id):
+        if event_id in self._ids:
+            return False
+        self._ids.add(event_id)
+        self._order.append(event_id)
+        while len(self._order) > self.max_entries:
+            self._ids.discard(self._order.popleft())
+        self.high_water = max(self.high_water, event_id)
+        return True
+
+
+# 주문 이벤트 구독 (집계/캐시/판매자 피드 등 소비자용)
+# 전용 연결에서 LISTEN을 먼저 시작한 뒤 after_event_id 이후의 밀린 이벤트를 테이블에서 읽고, 이후 NOTIFY로 들어온 이벤트를 이어서 전달
+# (LISTEN 이후에 읽으므로 그 사이에 커밋된 이벤트도 빠지지 않고, 중복은 seen으로 걸러냄)
+# 밀린 이벤트는 ORDER_EVENT_BACKLOG_PAGE개씩 나눠 읽음 (after_event_id=0이어도 테이블 전체를 한 번에 메모리로 읽지 않음)
+# seen: 재접속할 때 이전 연결에서 쓰던 RecentEventIds를 넘기면 after_event_id보다 ORDER_EVENT_RESUME_OVERLAP만큼 앞에서부터
+#       다시 읽어, 끊기기 전에 번호만 받고 늦게 커밋된 이벤트도 받음 (이미 받은 이벤트는 seen으로 건너뜀)
+# 전달은 최소 한 번(at-least-once): seen에서 잊힌 event_id는 다시 올 수 있으므로 소비자는 event_id로 멱등하게 처리할 것
+# idle_timeout초 동안 새 이벤트가 없으면 None을 내보냄 (호출한 쪽이 연결 상태 확인/keep-alive에 사용)
+def iter_order_events(after_event_id=0, seller_id=None, idle_timeout=15.0, seen=None):
+    if seen is None:
+        seen = RecentEventIds(app.config['ORDER_EVENT_SEEN_MAX'])
+        read_from = after_event_id
+    else:
+        read_from = max(0, after_event_id - app.config['ORDER_EVENT_RESUME_OVERLAP'])
+
+    conn = open_db_connection()
+    conn.autocommit = True
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    try:
+        cur.execute(f"LISTEN {app.config['ORDER_EVENT_CHANNEL']}")
+        while True:
+            cur.execute(
+                """
+                SELECT event_id, order_id, buyer_id, seller_id, event_type, from_status, to_status, created_at
+                FROM OrderEvent
+                WHERE event_id > %s
+                  AND (%s::int IS NULL OR seller_id = %s::int)
+                ORDER BY event_id
+                LIMIT %s
+                """,
+                (read_from, seller_id, seller_id, app.config['ORDER_EVENT_BACKLOG_PAGE'])
+            )
+            backlog = cur.fetchall()
+            for event in backlog:
+                read_from = event['event_id']
+                if not seen.add(event['event_id']):
+                    continue
+                event = dict(event)
+                event['created_at'] = event['created_at'].isoformat()  # NOTIFY로 받은 이벤트(JSON)와 같은 형식
+                yield event
+            if len(backlog) < app.config['ORDER_EVENT_BACKLOG_PAGE']:
+                break
+
+        while True:
+            if select.select([conn], [], [], idle_timeout) == ([], [], []):
+                yield None
+                continue
+            conn.poll()
+            while conn.notifies:
+                event = json.loads(conn.notifies.pop(0).payload)
+                if not seen.add(event['event_id']):
+                    continue
+                if seller_id is None or event['seller_id'] == seller_id:
+                    yield event
+    finally:
+        cur.close()
+        conn.close()
+
+
+# --- 프로세스 내 주문 이벤트 배포(pub/sub) ---
+app.config['ORDER_EVENT_QUEUE_MAX'] = int(os.environ.get('ORDER_EVENT_QUEUE_MAX', '1000'))  # 구독자별 대기 이벤트 최대 수
+app.config['ORDER_EVENT_RECONNECT_DELAY'] = float(os.environ.get('ORDER_EVENT_RECONNECT_DELAY', '2'))  # 초
+
+
+# 워커 프로세스마다 LISTEN 연결 하나만 열고, 받은 이벤트를 판매자별 구독자 큐로 나눠 주는 클래스
+# (구독자마다 DB 연결을 열지 않음) 연결이 끊기면 같은 seen(RecentEventIds)으로 iter_order_events를 다시 열어 이어 받음
+# 처음 시작할 때는 최근 이벤트 ID로 seen을 채워 두고 시작 -> 그보다 작은 번호로 아직 커밋 중인 이벤트도 받음
+class OrderEventHub:
+    def __init__(self):
+        self._subscribers = {}  # seller_id -> set(queue.Queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.seen = None  # RecentEventIds (수신 스레드가 처음 시작할 때 채움)
+
+    def subscribe(self, seller_id):
+        subscriber = queue.Queue(maxsize=app.config['ORDER_EVENT_QUEUE_MAX'])
+        subscriber.overflowed = False
+        with self._lock:
+            self._subscribers.setdefault(seller_id, set()).add(subscriber)
+            # fork(gunicorn preload) 이후 첫 구독 시 워커 안에서 수신 스레드 시작
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='order-event-hub', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, seller_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(seller_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[seller_id]
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['seller_id'], ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # 너무 느린 구독자는 끊고, 다시 접속할 때 Last-Event-ID로 테이블에서 이어 받게 함
+                subscriber.overflowed = True
+
+    def _run(self):
+        while True:
+            try:
+                if self.seen is None:
+                    self.seen = load_recent_order_event_ids()
+                for event in iter_order_events(after_event_id=self.seen.high_water, seen=self.seen):
+                    if event is not None:
+                        self.publish(event)
+            except Exception as e:
+                print(f"주문 이벤트 수신 오류: {e}")
+                time.sleep(app.config['ORDER_EVENT_RECONNECT_DELAY'])
+
+
+# 이미 커밋된 최근 이벤트 ID로 채운 RecentEventIds (허브 시작 시점 이전 이벤트는 다시 배포하지 않기 위해)
+# iter_order_events가 high_water - ORDER_EVENT_RESUME_OVERLAP부터 읽으므로 그만큼 채움
+def load_recent_order_event_ids():
+    seen = RecentEventIds(app.config['ORDER_EVENT_SEEN_MAX'])
+    conn = open_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT event_id FROM OrderEvent ORDER BY event_id DESC LIMIT %s",
+            (app.config['ORDER_EVENT_RESUME_OVERLAP'],)
+        )
+        for row in reversed(cur.fetchall()):
+            seen.add(row[0])
+        return seen
+    finally:
+        conn.close()
+
+
+order_event_hub = OrderEventHub()
+
+
+# --- 한정 판매(flash sale) 주문 대기열 (sql/flash_sale.sql) ---
+# FlashSaleListing에 등록된 판매 목록은 place_order가 Listing을 잠그지 않고 FlashSaleTicket에 대기표만 넣은 뒤 202로 응답
+# 판매 목록마다 소비자 하나(advisory lock)가 대기표를 접수 순서대로 묶어서 꺼내고,
+# Listing 잠금 한 번과 SQL 한 문장으로 재고 차감/주문 생성/대기표 결과 기록을 처리
+# -> 구매자가 몰려도 Listing 행 잠금을 기다리는 요청이 쌓이지 않고, 잠금 시간은 묶음 크기에만 비례
+app.config['FLASH_SALE_CHANNEL'] = os.environ.get('FLASH_SALE_CHANNEL', 'flash_sale_tickets')  # 새 대기표 NOTIFY 채널 이름
+app.config['FLASH_SALE_BATCH_SIZE'] = int(os.environ.get('FLASH_SALE_BATCH_SIZE', '200'))  # 한 번에 처리할 대기표 수
+app.config['FLASH_SALE_MAX_QUANTITY'] = int(os.environ.get('FLASH_SALE_MAX_QUANTITY', '5'))  # 대기표 1장의 최대 주문 수량
+app.config['FLASH_SALE_POLL_INTERVAL'] = float(os.environ.get('FLASH_SALE_POLL_INTERVAL', '1'))  # 대기열/대기표 결과 확인 주기 (초, NOTIFY를 놓쳤을 때 대비)
+app.config['FLASH_SALE_LISTING_CACHE_TTL'] = float(os.environ.get('FLASH_SALE_LISTING_CACHE_TTL', '5'))  # 한정 판매 목록 캐시 (초)
+app.config['FLASH_SALE_TICKET_RETRY_AFTER'] = int(os.environ.get('FLASH_SALE_TICKET_RETRY_AFTER', '2'))  # 대기 중인 대기표를 다시 조회할 간격 (초, Retry-After 헤더)
+
+FLASH_SALE_LOCK_CLASS = 5050  # pg_try_advisory_xact_lock(FLASH_SALE_LOCK_CLASS, listing_id)
+
+# 한정 판매 listing_id 집합 캐시 (key: 'listing_ids')
+flash_sale_listing_cache = TTLCache(app.config['FLASH_SALE_LISTING_CACHE_TTL'], 1)
+# 마지막으로 DB에서 읽은 집합 (캐시가 만료된 뒤 DB 조회에 실패해도 계속 사용, 아직 한 번도 못 읽었으면 None)
+flash_sale_listing_state = {'listing_ids': None}
+
+
+# 한정 판매로 지정된 listing_id 집합 (문자열, 주문 요청의 listing_id가 숫자/문자열 어느 쪽이든 비교할 수 있게)
+# query_db=False이면 DB에 접속하지 않고 캐시/마지막으로 읽은 집합만 사용 (입장 제어에서 호출할 때)
+# DB 조회에 실패하면 마지막으로 읽은 집합을 반환 (빈 집합으로 바뀌어 한정 판매 주문이 Listing 잠금 경로로 몰리지 않도록)
+def get_flash_sale_listing_ids(query_db=True):
+    listing_ids = flash_sale_listing_cache.get('listing_ids')
+    if listing_ids is not None:
+        return listing_ids
+    last_known = flash_sale_listing_state['listing_ids']
+    if last_known is None:
+        last_known = frozenset()
+    if not query_db:
+        return last_known
+
+    conn = get_db_connection(readonly=True)
+    if conn is None:
+        return last_known
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT listing_id FROM FlashSaleListing")
+        listing_ids = frozenset(str(row[0]) for row in cur.fetchall())
+        cur.close()
+    except psycopg2.Error as e:
+        print(f"[한정 판매] 목록 조회 실패, 마지막으로 읽은 목록을 사용합니다. ({e})")
+        return last_known
+    finally:
+        conn.close()
+    flash_sale_listing_state['listing_ids'] = listing_ids
+    flash_sale_listing_cache.set('listing_ids', listing_ids)
+    return listing_ids
+
+
+# 대기표 처리 결과를 API 응답 형식으로 변환 (조회 API와 결과 스트림이 함께 사용)
+def format_flash_sale_ticket(ticket):
+    result = {
+        "ticket_id": ticket['ticket_id'],
+        "status": ticket['status'],  # queued / confirmed / rejected
+        "order_ids": [ticket['order_id']] if ticket['order_id'] else []
+    }
+    if ticket['status'] == 'confirmed':
+        result["message"] = f"주문({ticket['order_id']})이 성공적으로 접수되었습니다."
+    elif ticket['status'] == 'rejected':
+        result["message"] = ticket['reject_reason']
+    else:
+        result["message"] = "주문 대기 중입니다."
+    return result
+
+
+# 한 판매 목록의 대기표 한 묶음 처리 (conn: autocommit이 아닌 소비자 전용 연결)
+# 반환: 처리한 대기표 수 (다른 소비자가 이 판매 목록을 처리 중이면 None)
+def process_flash_sale_batch(conn, listing_id):
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        # 1. 판매 목록별 소비자는 하나만 (트랜잭션이 끝나면 자동으로 풀림)
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (FLASH_SALE_LOCK_CLASS, listing_id))
+        if not cur.fetchone()[0]:
+            conn.rollback()
+            return None
+
+        # 2. Listing 잠금은 묶음마다 한 번
+        cur.execute(
+            "SELECT price, stock, status, product_id FROM Listing WHERE listing_id = %s FOR UPDATE",
+            (listing_id,)
+        )
+        listing_info = cur.fetchone()
+        cur.execute(
+            """
+            SELECT ticket_id, quantity
+            FROM FlashSaleTicket
+            WHERE listing_id = %s
+              AND status = 'queued'
+            ORDER BY ticket_id
+            LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """,
+            (listing_id, app.config['FLASH_SALE_BATCH_SIZE'])
+        )
+        tickets = cur.fetchall()
+        if not tickets:
+            conn.rollback()
+            return 0
+
+        # 3. 접수 순서대로 남은 재고 배정 (남은 재고보다 많이 주문한 대기표만 거절하고, 뒤의 대기표는 계속 배정)
+        remaining = listing_info['stock'] if listing_info and listing_info['status'] == '판매중' else 0
+        accepted, reasons = [], []
+        sold = 0
+        for ticket in tickets:
+            if not listing_info:
+                reason = f"판매 목록 ID {listing_id}를 찾을 수 없습니다."
+            elif listing_info['status'] not in ('판매중', '품절'):
+                reason = f"상품 ID {listing_id}는 현재 판매 중이 아닙니다. (상태: {listing_info['status']})"
+            elif ticket['quantity'] > remaining:
+                reason = f"재고 부족: 상품 ID {listing_id}의 재고({remaining})가 부족합니다."
+            else:
+                reason = None
+                remaining -= ticket['quantity']
+                sold += ticket['quantity']
+            accepted.append(reason is None)
+            reasons.append(reason)
+
+        # 4. 주문 생성, 대기표 결과, 재고 차감, 장바구니 정리를 한 문장으로
+        # (order_id를 먼저 발급해 두어야 대기표와 새 주문을 연결할 수 있음)
+        cur.execute(
+            """
+            WITH decided AS (
+                SELECT D.ticket_id, D.accepted, D.reason, T.buyer_id, T.quantity, T.cart_id,
+                       CASE WHEN D.accepted THEN nextval(pg_get_serial_sequence('orderb', 'order_id')) END AS order_id
+                FROM UNNEST(%(ticket_ids)s::bigint[], %(accepted)s::boolean[], %(reasons)s::varchar[])
+                         AS D(ticket_id, accepted, reason)
+                         JOIN FlashSaleTicket T ON T.ticket_id = D.ticket_id
+            ),
+            new_orders AS (
+                INSERT INTO Orderb (order_id, buyer_id, listing_id, quantity, total_price, status)
+                SELECT order_id, buyer_id, %(listing_id)s, quantity, quantity * %(price)s, '상품 준비중'
+                FROM decided
+                WHERE accepted
+                ORDER BY ticket_id
+            ),
+            ticket_results AS (
+                UPDATE FlashSaleTicket T
+                SET status        = CASE WHEN D.accepted THEN 'confirmed' ELSE 'rejected' END,
+                    order_id      = D.order_id,
+                    reject_reason = D.reason,
+                    processed_at  = NOW()
+                FROM decided D
+                WHERE T.ticket_id = D.ticket_id
+            ),
+            stock_update AS (
+                UPDATE Listing
+                SET stock  = stock - %(sold)s,
+                    status = CASE WHEN stock - %(sold)s = 0 THEN '품절' ELSE status END
+                WHERE listing_id = %(listing_id)s
+                  AND %(sold)s > 0
+            ),
+            cart_cleanup AS (
+                DELETE
+                FROM ShoppingCart C
+                    USING decided D
+                WHERE D.accepted
+                  AND C.cart_id = D.cart_id
+                  AND C.buyer_id = D.buyer_id
+            )
+            SELECT order_id FROM decided WHERE accepted ORDER BY ticket_id
+            """,
+            {
+                'ticket_ids': [ticket['ticket_id'] for ticket in tickets], 'accepted': accepted, 'reasons': reasons,
+                'listing_id': listing_id, 'price': listing_info['price'] if listing_info else 0, 'sold': sold
+            }
+        )
+        order_ids = [row[0] for row in cur.fetchall()]
+        record_order_events(cur, [(order_id, 'placed', None, '상품 준비중') for order_id in order_ids])
+        if sold:
+            refresh_product_price_summary(cur, listing_info['product_id'])
+        conn.commit()
+
+        if sold:
+            invalidate_product_detail(product_id=listing_info['product_id'])
+        print(f"[한정 판매] listing {listing_id}: 대기표 {len(tickets)}건 처리 (확정 {len(order_ids)}건, 남은 재고 {remaining})")
+        return len(tickets)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# 워커 프로세스마다 하나씩 실행되는 대기열 소비자
+# 새 대기표 NOTIFY(또는 FLASH_SALE_POLL_INTERVAL)마다 대기표가 있는 판매 목록을 처리
+# 여러 워커가 같은 판매 목록을 처리하려 해도 advisory lock을 얻은 하나만 처리하고 나머지는 건너뜀
+class FlashSaleConsumer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def ensure_started(self):
+        with self._lock:
+            # fork(gunicorn preload) 이후 워커 안에서 처음 필요할 때 시작
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='flash-sale-consumer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._consume()
+            except Exception as e:
+                print(f"한정 판매 대기열 처리 오류: {e}")
+                time.sleep(app.config['ORDER_EVENT_RECONNECT_DELAY'])
+
+    def _consume(self):
+        listen_conn = open_db_connection()
+        listen_conn.autocommit = True
+        conn = open_db_connection()
+        try:
+            listen_cur = listen_conn.cursor()
+            listen_cur.execute(f"LISTEN {app.config['FLASH_SALE_CHANNEL']}")
+            while True:
+                listen_cur.execute("SELECT DISTINCT listing_id FROM FlashSaleTicket WHERE status = 'queued'")
+                drained = True
+                for (listing_id,) in listen_cur.fetchall():
+                    processed = process_flash_sale_batch(conn, listing_id)
+                    if processed is not None and processed >= app.config['FLASH_SALE_BATCH_SIZE']:
+                        drained = False  # 남은 대기표가 있을 수 있으므로 기다리지 않고 바로 다음 묶음
+                if drained and select.select([listen_conn], [], [], app.config['FLASH_SALE_POLL_INTERVAL']) != ([], [], []):
+                    listen_conn.poll()
+                    listen_conn.notifies.clear()
+        finally:
+            listen_conn.close()
+            conn.close()
+
+
+# 대기표 결과 스트림용: 워커마다 스레드 하나가 기다리는 대기표들의 상태를 한 번에 조회해 전달
+# (기다리는 구매자마다 DB 연결/쿼리를 만들지 않음)
+class FlashSaleTicketWatcher:
+    def __init__(self):
+        self._waiters = {}  # ticket_id -> set(queue.Queue)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, ticket_id):
+        waiter = queue.Queue(maxsize=1)
+        with self._lock:
+            self._waiters.setdefault(ticket_id, set()).add(waiter)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='flash-sale-ticket-watcher', daemon=True)
+                self._thread.start()
+        return waiter
+
+    def unwatch(self, ticket_id, waiter):
+        with self._lock:
+            waiters = self._waiters.get(ticket_id)
+            if waiters:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[ticket_id]
+
+    def _run(self):
+        while True:
+            time.sleep(app.config['FLASH_SALE_POLL_INTERVAL'])
+            with self._lock:
+                ticket_ids = list(self._waiters)
+            if not ticket_ids:
+                continue
+            try:
+                conn = open_db_connection()
+                try:
+                    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                    cur.execute(
+                        """
+                        SELECT ticket_id, status, order_id, reject_reason
+                        FROM FlashSaleTicket
+                        WHERE ticket_id = ANY (%s)
+                          AND status <> 'queued'
+                        """,
+                        (ticket_ids,)
+                    )
+                    finished = cur.fetchall()
+                    cur.close()
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"한정 판매 대기표 확인 오류: {e}")
+                continue
+            for ticket in finished:
+                with self._lock:
+                    waiters = list(self._waiters.get(ticket['ticket_id'], ()))
+                for waiter in waiters:
+                    try:
+                        waiter.put_nowait(format_flash_sale_ticket(ticket))
+                    except queue.Full:
+                        pass
+
+
+flash_sale_consumer = FlashSaleConsumer()
+flash_sale_ticket_watcher = FlashSaleTicketWatcher()
 
 # 페이지 렌더링 라우터 (HTML)
 
 # --- 메인 페이지 (전체 상품) ---
 @app.route('/')
+@route_deadline(2000)
 def show_main_page():
     # 정렬 기준 가져오기
     user_role = session.get('user_role')
     db_role = map_role_to_db_role(user_role)
     sort_by = request.args.get('sort_by', 'latest')
+    group_by = request.args.get('group_by', 'listing')
 
-    # '전체 상품'을 조회
-    products, product_count = get_products_from_db(role=db_role, sort_by=sort_by)
+    # '전체 상품'을 조회 (group_by=product 이면 상품별 가격 비교 보기)
+    with timing_phase('products'):
+        if group_by == 'product':
+            products, product_count = get_product_groups_from_db(role=db_role, sort_by=sort_by)
+        else:
+            products, product_count = get_products_from_db(role=db_role, sort_by=sort_by)
 
     return render_template(
         'index.html',
         products=products,
         product_count=product_count,
         page_title="전체 상품",
-        sort_by=sort_by
+        sort_by=sort_by,
+        group_by=group_by
     )
 
 
 # --- 카테고리별 상품 페이지 ---
 @app.route('/category/<category_name>')
+@route_deadline(2000)
 def show_category_page(category_name):
     user_role = session.get('user_role')
     db_role = map_role_to_db_role(user_role)
 
     # 정렬 기준 가져오기
     sort_by = request.args.get('sort_by', 'latest')
+    group_by = request.args.get('group_by', 'listing')
 
     # '카테고리'로 필터링하여 상품 조회
-    products, product_count = get_products_from_db(role=db_role, category=category_name, sort_by=sort_by)
+    with timing_phase('products'):
+        if group_by == 'product':
+            products, product_count = get_product_groups_from_db(role=db_role, category=category_name, sort_by=sort_by)
+        else:
+            products, product_count = get_products_from_db(role=db_role, category=category_name, sort_by=sort_by)
 
     return render_template(
         'index.html',
         products=products,
         product_count=product_count,
         page_title=f"{category_name} 상품",
-        sort_by=sort_by
+        sort_by=sort_by,
+        group_by=group_by
     )
 
 
-# --- 상품 상세 페이지 ---
-@app.route('/product/<int:listing_id>')
-def show_product_detail(listing_id):
-    user_role = session.get('user_role')
-    db_role = map_role_to_db_role(user_role)
-
-    conn = get_db_connection(role=db_role)
+# 상품 상세 데이터 조회 함수 (템플릿에 전달할 product/listing/seller/경매 정보 구성)
+# 반환값: detail 딕셔너리 (조회 실패 시 None). 상태 전이가 없는 정상 조회 결과만 캐시에 저장
+@single_flight(timeout_result=None, stale_fallback=True)
+def load_product_detail(listing_id, role=None):
+    conn = get_db_connection(role=role)
     if conn is None:
-        return render_template('product_detail.html', product=None, listing_id=listing_id)
+        return None
 
     product = None
     listing = None
@@ -771,11 +3294,20 @@ def show_product_detail(listing_id):
     resale_images = []
     auction = None  # 경매 변수 초기화
     is_auction_ended = False  # 경매 완료 확인
+    price_summary = None  # 동일 상품 전체 가격 비교 집계
+    price_by_condition = []  # 상품 상태(condition)별 가격 비교 집계
+    cacheable = True  # 상태 전이(쓰기)가 일어난 요청은 캐시하지 않음
+    cache_ttl = app.config['PRODUCT_DETAIL_CACHE_TTL']
+    # 조회 전에 읽어 둔 세대: 조회 중 commit 후 무효화가 있었다면 읽은 값은 이전 값이므로 저장하지 않음
+    cache_generation = product_detail_cache.generation
 
     try:
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-        # 1. Listing 및 Product 정보 조회 (기존 쿼리 유지)
+        # 1. 상세 페이지에 필요한 모든 정보를 한 번의 쿼리(1 round trip)로 조회
+        #    - Listing/Product/Seller 기본 정보
+        #    - 실물 이미지(ListingImage)와 가격 비교 집계(ProductPriceSummary)는 JSON 배열로 집계
+        #    - 경매 정보, 최고 입찰자 이름, 시작/마감 여부(시간 비교)도 함께 계산
         cur.execute(
             """
             SELECT L.listing_id,
@@ -794,11 +3326,40 @@ def show_product_detail(listing_id):
                    P.image_url,
                    U.name   AS seller_name,
                    SP.store_name,
-                   SP.grade AS seller_grade
+                   SP.grade AS seller_grade,
+                   COALESCE((SELECT json_agg(json_build_object('image_url', LI.image_url, 'is_main', LI.is_main)
+                                             ORDER BY LI.is_main DESC, LI.image_id ASC)
+                             FROM ListingImage LI
+                             WHERE LI.listing_id = L.listing_id
+                               AND L.listing_type = 'Resale'), '[]'::json) AS resale_images,
+                   COALESCE((SELECT json_agg(json_build_object('condition', S.condition,
+                                                               'listing_count', S.listing_count,
+                                                               'min_price', S.min_price,
+                                                               'max_price', S.max_price,
+                                                               'avg_price', S.avg_price,
+                                                               'cheapest_listing_id', S.cheapest_listing_id)
+                                             ORDER BY S.min_price ASC)
+                             FROM ProductPriceSummary S
+                             WHERE S.product_id = L.product_id), '[]'::json) AS price_summary_rows,
+                   A.auction_id,
+                   A.start_price,
+                   A.current_price,
+                   A.start_date,
+                   A.end_date,
+                   A.current_highest_bidder_id,
+                   HB.name  AS highest_bidder_name,
+                   COALESCE(NOW() AT TIME ZONE 'KST' > A.end_date, FALSE)   AS is_auction_ended,
+                   COALESCE(NOW() AT TIME ZONE 'KST' > A.start_date, FALSE) AS is_auction_started,
+                   -- 캐시 만료 시각을 경매 시작/마감 시각에 맞추기 위한 남은 시간(초)
+                   EXTRACT(EPOCH FROM (A.start_date - NOW() AT TIME ZONE 'KST')) AS seconds_to_start,
+                   EXTRACT(EPOCH FROM (A.end_date - NOW() AT TIME ZONE 'KST'))   AS seconds_to_end
             FROM Listing L
                      JOIN Product P ON L.product_id = P.product_id
                      JOIN SellerProfile SP ON L.seller_id = SP.user_id
                      JOIN Users U ON SP.user_id = U.user_id
+                     LEFT JOIN Auction A ON A.listing_id = L.listing_id
+                         AND L.status IN ('경매 중', '경매 예정', '판매 종료')
+                     LEFT JOIN Users HB ON A.current_highest_bidder_id = HB.user_id
             WHERE L.listing_id = %s
             """,
             (listing_id,)
@@ -831,133 +3392,158 @@ def show_product_detail(listing_id):
                 'seller_grade': data['seller_grade']
             }
 
-            # 2. 2차 판매자(Resale)일 경우 실물 이미지 조회 (유지)
-            if data['listing_type'] == 'Resale':
-                cur.execute(
-                    "SELECT image_url, is_main FROM ListingImage WHERE listing_id = %s ORDER BY is_main DESC, image_id ASC",
-                    (listing_id,)
-                )
-                resale_images = [dict(row) for row in cur.fetchall()]
-
-            # 3. 경매 상품일 경우 Auction 정보 조회 추가
-            if data['status'] in ['경매 중', '경매 예정','판매 종료']:
-                cur.execute(
-                    """
-                    SELECT auction_id,
-                           start_price,
-                           current_price,
-                           start_date,
-                           end_date,
-                           current_highest_bidder_id
-                    FROM Auction
-                    WHERE listing_id = %s
-                    """,
-                    (listing_id,)
-                )
-                auction_data = cur.fetchone()
-
-                if auction_data:
-                    # 조회된 결과를 auction 변수에 딕셔너리로 담음
-                    auction = dict(auction_data)
+            # 2. 2차 판매자(Resale)일 경우 실물 이미지 (JSON 집계 결과)
+            resale_images = data['resale_images']
 
-                    # 최고 입찰자 이름 조회 (선택 사항: 템플릿에서 bidder_name 사용 시)
-                    if auction['current_highest_bidder_id']:
-                        cur.execute(
-                            "SELECT name FROM Users WHERE user_id = %s",
-                            (auction['current_highest_bidder_id'],)
-                        )
-                        bidder_info = cur.fetchone()
-                        if bidder_info:
-                            auction['highest_bidder_name'] = bidder_info['name']
-                    else:
-                        auction['highest_bidder_name'] = None
+            # 2-1. 동일 상품(Product)의 가격 비교 집계
+            for row in data['price_summary_rows']:
+                if row['condition'] == PRICE_SUMMARY_ALL:
+                    price_summary = row
+                else:
+                    price_by_condition.append(row)
+
+            # 3. 경매 상품일 경우 Auction 정보 구성 (LEFT JOIN 결과)
+            if data['auction_id'] is not None:
+                auction = {
+                    'auction_id': data['auction_id'],
+                    'start_price': data['start_price'],
+                    'current_price': data['current_price'],
+                    'start_date': data['start_date'],
+                    'end_date': data['end_date'],
+                    'current_highest_bidder_id': data['current_highest_bidder_id'],
+                    'highest_bidder_name': data['highest_bidder_name']
+                }
+
+                # 현재 시간과 시작/마감 시간 비교 결과 (같은 쿼리에서 DB 시간 기준으로 계산됨)
+                is_auction_ended = data['is_auction_ended']
+                is_auction_started = data['is_auction_started']
+
+                # 경매 시작/마감 시각이 캐시 TTL 안에 있으면 그 시각에 맞춰 캐시를 만료시킴
+                for seconds_left in (data['seconds_to_start'], data['seconds_to_end']):
+                    if seconds_left is not None and seconds_left > 0:
+                        cache_ttl = min(cache_ttl, float(seconds_left))
+
+                if listing['status'] == '경매 예정' and is_auction_started and not is_auction_ended:
+                    cur.execute(
+                        "UPDATE Listing SET status = '경매 중' WHERE listing_id = %s",
+                        (listing_id,)
+                    )
+                    # DB 변경 후 상태를 즉시 반영
+                    listing['status'] = '경매 중'
+                    conn.commit()  # 상태 변경은 트랜잭션을 바로 커밋하여 반영
+                    cacheable = False
+
+                if is_auction_ended and listing['status'] != '판매 종료':
+                    auction_id_for_finalize = auction['auction_id']
+                    cacheable = False
+                    cur.close()
+                    conn.close()
+
+                    # DB 연결 (새로운 트랜잭션 필요)
+                    conn_finalize = get_db_connection(role='administrator_role')
+                    if conn_finalize:
+                        cur_finalize = conn_finalize.cursor(cursor_factory=psycopg2.extras.DictCursor)
+                        conn_finalize.autocommit = False
+
+                        try:
+                            # 1. 최종 경매 정보 확인
+                            cur_finalize.execute(
+                                "SELECT A.listing_id, A.current_price, A.current_highest_bidder_id, L.status FROM Auction A JOIN Listing L ON A.listing_id = L.listing_id WHERE A.auction_id = %s FOR UPDATE",
+                                (auction_id_for_finalize,))
+                            final_info = cur_finalize.fetchone()
+
+                            if final_info and final_info['status'] != '판매 종료':
+                                winner_id = final_info['current_highest_bidder_id']
+                                final_price = final_info['current_price']
+
+                                # 2. Listing 상태 '판매 종료'로 변경
+                                cur_finalize.execute(
+                                    "UPDATE Listing SET status = '판매 종료', stock = 0 WHERE listing_id = %s",
+                                    (listing_id,))
 
-                    # 현재 시간이 마감 시간을 초과했는지 DB에서 확인
-                    cur.execute("SELECT NOW() AT TIME ZONE 'KST' > %s", (auction['end_date'],))
-                    is_auction_ended = cur.fetchone()[0]
+                                # 3. 최고 입찰자에게 주문 생성 (Orderb 삽입)
+                                if winner_id:
+                                    cur_finalize.execute(
+                                        """
+                                        INSERT INTO Orderb (buyer_id, listing_id, quantity, total_price, status)
+                                        VALUES (%s, %s, 1, %s, '상품 준비중') RETURNING order_id
+                                        """,
+                                        (winner_id, listing_id, final_price)
+                                    )
+                                    record_order_events(cur_finalize, [
+                                        (cur_finalize.fetchone()[0], 'auction_won', None, '상품 준비중')
+                                    ])
+
+                                conn_finalize.commit()
+
+                                # 템플릿 렌더링을 위해 listing 상태를 업데이트
+                                listing['status'] = '판매 종료'
+                                listing['stock'] = 0
+
+                        except Exception as e:
+                            print(f"경매 최종 처리 중 오류: {e}")
+                            conn_finalize.rollback()
+                        finally:
+                            cur_finalize.close()
+                            conn_finalize.close()
+
+                        # 원래 함수로 돌아와 최종 렌더링을 진행
+                        # is_auction_ended는 여전히 True
+        else:
+            # 존재하지 않는 listing_id는 캐시하지 않음 (곧 등록될 수 있음)
+            cacheable = False
 
-                    # [신규 로직] 경매 시작 시간 확인
-                    cur.execute("SELECT NOW() AT TIME ZONE 'KST' > %s", (auction['start_date'],))
-                    is_auction_started = cur.fetchone()[0]
+        # 경매 최종 처리 경로에서 이미 닫힌 경우에도 안전하게 다시 닫을 수 있음
+        cur.close()
+        conn.close()
 
-                    if listing['status'] == '경매 예정' and is_auction_started and not is_auction_ended:
-                        cur.execute(
-                            "UPDATE Listing SET status = '경매 중' WHERE listing_id = %s",
-                            (listing_id,)
-                        )
-                        # DB 변경 후 상태를 즉시 반영
-                        listing['status'] = '경매 중'
-                        conn.commit()  # 상태 변경은 트랜잭션을 바로 커밋하여 반영
+        detail = {
+            'product': product,
+            'listing': listing,
+            'seller': seller,
+            'resale_images': resale_images,
+            'auction': auction,
+            'is_auction_ended': is_auction_ended,
+            'price_summary': price_summary,
+            'price_by_condition': price_by_condition
+        }
+        if cacheable and cache_ttl > 0:
+            product_detail_cache.set(listing_id, detail, ttl=cache_ttl, generation=cache_generation)
+        return detail
 
-                    if is_auction_ended and listing['status'] != '판매 종료':
-                        auction_id_for_finalize = auction['auction_id']
-                        cur.close()
-                        conn.close()
+    except Exception as e:
+        db_state.failed = True
+        if conn:
+            conn.close()
+        print(f"상품 상세 조회 중 오류 발생: {str(e)}")
+        return None
 
-                        # DB 연결 (새로운 트랜잭션 필요)
-                        conn_finalize = get_db_connection(role='administrator_role')
-                        if conn_finalize:
-                            cur_finalize = conn_finalize.cursor(cursor_factory=psycopg2.extras.DictCursor)
-                            conn_finalize.autocommit = False
 
-                            try:
-                                # 1. 최종 경매 정보 확인
-                                cur_finalize.execute(
-                                    "SELECT A.listing_id, A.current_price, A.current_highest_bidder_id, L.status FROM Auction A JOIN Listing L ON A.listing_id = L.listing_id WHERE A.auction_id = %s FOR UPDATE",
-                                    (auction_id_for_finalize,))
-                                final_info = cur_finalize.fetchone()
+# 상품 상세 캐시 무효화 함수 (쓰기 API에서 commit 이후 호출)
+# listing_id: 해당 판매글만 / product_id: 같은 상품의 모든 판매글 (상품 정보, 가격 비교 집계 공유)
+def invalidate_product_detail(listing_id=None, product_id=None):
+    if listing_id is not None:
+        product_detail_cache.invalidate(listing_id)
+    if product_id is not None:
+        product_detail_cache.invalidate_where(lambda detail: detail['product']['id'] == product_id)
 
-                                if final_info and final_info['status'] != '판매 종료':
-                                    winner_id = final_info['current_highest_bidder_id']
-                                    final_price = final_info['current_price']
 
-                                    # 2. Listing 상태 '판매 종료'로 변경
-                                    cur_finalize.execute(
-                                        "UPDATE Listing SET status = '판매 종료', stock = 0 WHERE listing_id = %s",
-                                        (listing_id,))
-
-                                    # 3. 최고 입찰자에게 주문 생성 (Orderb 삽입)
-                                    if winner_id:
-                                        cur_finalize.execute(
-                                            """
-                                            INSERT INTO Orderb (buyer_id, listing_id, quantity, total_price, status)
-                                            VALUES (%s, %s, 1, %s, '상품 준비중')
-                                            """,
-                                            (winner_id, listing_id, final_price)
-                                        )
-
-                                    conn_finalize.commit()
-
-                                    # 템플릿 렌더링을 위해 listing 상태를 업데이트
-                                    listing['status'] = '판매 종료'
-                                    listing['stock'] = 0
-
-                            except Exception as e:
-                                print(f"경매 최종 처리 중 오류: {e}")
-                                conn_finalize.rollback()
-                            finally:
-                                cur_finalize.close()
-                                conn_finalize.close()
-
-                            # 원래 함수로 돌아와 최종 렌더링을 진행
-                            # is_auction_ended는 여전히 True
+# --- 상품 상세 페이지 ---
+@app.route('/product/<int:listing_id>')
+@route_deadline(1500)
+def show_product_detail(listing_id):
+    user_role = session.get('user_role')
+    db_role = map_role_to_db_role(user_role)
 
-        return render_template(
-            'product_detail.html',
-            product=product,
-            listing=listing,
-            seller=seller,
-            resale_images=resale_images,
-            auction=auction,
-            is_auction_ended=is_auction_ended,
-            listing_id=listing_id
-        )
+    # 1. 캐시 우선 조회 (인기 상품은 DB를 거치지 않고 메모리에서 응답)
+    detail = product_detail_cache.get(listing_id)
+    if detail is None:
+        with timing_phase('detail'):
+            detail = load_product_detail(listing_id, role=db_role)
+        if detail is None:
+            return render_template('product_detail.html', product=None, listing_id=listing_id)
 
-    except Exception as e:
-        if conn:
-            conn.close()
-        print(f"상품 상세 조회 중 오류 발생: {str(e)}")
-        return render_template('product_detail.html', product=None, listing_id=listing_id)
+    return render_template('product_detail.html', listing_id=listing_id, **detail)
 
 
 # 장바구니 페이지
@@ -972,7 +3558,7 @@ def show_shopping_cart():
     buyer_id = session.get('user_id')
     cart_items = []
 
-    conn = get_db_connection(role=db_role)
+    conn = get_db_connection(role=db_role, readonly=True)
     if conn is None:
         return render_template('shopping_cart.html', cart_items=[], total_price=0, shipping_fee=0)
 
@@ -1045,21 +3631,28 @@ def show_shopping_cart():
 
 # --- 상품 검색 라우터 ---
 @app.route('/search')
+@route_deadline(2000)
 def search_products():
     user_role = session.get('user_role')
     db_role = map_role_to_db_role(user_role)
     search_query = request.args.get('query')
     sort_by = request.args.get('sort_by', 'latest')
+    group_by = request.args.get('group_by', 'listing')
 
     # '검색어'로 필터링하여 상품 조회
-    products, product_count = get_products_from_db(role=db_role, search_term=search_query, sort_by=sort_by)
+    with timing_phase('products'):
+        if group_by == 'product':
+            products, product_count = get_product_groups_from_db(role=db_role, search_term=search_query, sort_by=sort_by)
+        else:
+            products, product_count = get_products_from_db(role=db_role, search_term=search_query, sort_by=sort_by)
 
     return render_template(
         'index.html',
         products=products,
         product_count=product_count,
         page_title=f"'{search_query}' 검색 결과",
-        sort_by=sort_by
+        sort_by=sort_by,
+        group_by=group_by
     )
 
 
@@ -1100,13 +3693,15 @@ def show_product_register_page():
 
 # --- 경매 페이지 ---
 @app.route('/category/auction')
+@route_deadline(2000)
 def show_auction_page():
     user_role = session.get('user_role')
     db_role = map_role_to_db_role(user_role)
     sort_by = request.args.get('sort_by', 'latest')
 
     # '경매 중' 또는 '경매 예정' 상품만 조회
-    products, product_count = get_products_from_db(role=db_role, auction_only=True, sort_by=sort_by)
+    with timing_phase('products'):
+        products, product_count = get_products_from_db(role=db_role, auction_only=True, sort_by=sort_by)
 
     return render_template(
         'index.html',
@@ -1129,6 +3724,7 @@ def logout_user():
 
 # 마이 페이지
 @app.route('/mypage', methods=['GET'])
+@route_deadline(3000)
 def show_mypage():
     # 로그인 여부 확인
     if 'user_id' not in session:
@@ -1142,7 +3738,8 @@ def show_mypage():
     current_view = request.args.get('view', 'summary')
 
     # DB에서 사용자 역할에 따른 프로필 데이터 조회
-    user_profile = get_user_profile_data(user_id, user_role)
+    with timing_phase('profile'):
+        user_profile = get_user_profile_data(user_id, user_role)
 
     if user_profile is None:
         # DB 연결 실패 또는 데이터 조회 실패 시 임시 오류 처리
@@ -1159,25 +3756,44 @@ def show_mypage():
         "disputes": [],  # 기본값
         "admin_disputes": [],
         "products": [],  # product테이블의 모든 상품
-        "all_feedback": []
+        "all_feedback": [],
+        "order_statuses": ORDER_STATUSES,
+        "status_filter": None,
+        "next_cursor": None,  # 주문 내역 다음 페이지 커서
+        "is_first_page": not request.args.get('after')
     }
     if current_view == 'orders' and user_role == 'Buyer':
-        template_data["orders"] = get_orders_for_buyer(user_id, 'all_status', role=db_role)
+        with timing_phase('orders'):
+            status_filter = request.args.get('status')
+            if status_filter not in ORDER_STATUSES:
+                status_filter = None
+            template_data["orders"], template_data["next_cursor"] = get_orders_for_buyer(
+                user_id, 'all_status', role=db_role, status_filter=status_filter, after=request.args.get('after'))
+            template_data["status_filter"] = status_filter
     elif current_view == 'sales' and user_role in ['PrimarySeller', 'Reseller']:
-        template_data["sales_orders"] = get_sales_for_seller(user_id, role=db_role)
-        template_data["total_sales"] = show_seller_sales(user_id, role=db_role)
+        with timing_phase('sales'):
+            template_data["sales_orders"] = get_sales_for_seller(user_id, role=db_role)
+        with timing_phase('sales_total'):
+            template_data["total_sales"] = show_seller_sales(user_id, role=db_role)
     elif current_view == 'my_products' and user_role in ['PrimarySeller', 'Reseller']:
-        template_data["my_products"] = get_my_products_list(user_id, role=db_role)
+        with timing_phase('my_products'):
+            template_data["my_products"] = get_my_products_list(user_id, role=db_role)
     elif current_view == 'disputes' and user_role == 'Buyer':
-        template_data["disputes"] = get_disputes_for_buyer(user_id, role=db_role)
+        with timing_phase('disputes'):
+            template_data["disputes"] = get_disputes_for_buyer(user_id, role=db_role)
     elif current_view == 'admin_disputes' and user_role == 'Administrator':
-        template_data["admin_disputes"] = get_disputes(role=db_role)
+        with timing_phase('admin_disputes'):
+            template_data["admin_disputes"] = get_disputes(role=db_role)
     elif current_view == 'admin_rating' and user_role == 'Administrator':
-        template_data["products"] = get_products_for_admin_rating(role=db_role)
+        with timing_phase('admin_rating'):
+            template_data["products"] = get_products_for_admin_rating(role=db_role)
     elif current_view == 'feedback' and user_role == 'Buyer':
-        template_data["finished_orders"] = get_orders_for_buyer(user_id, 'finished_order',role=db_role)
+        with timing_phase('finished_orders'):
+            template_data["finished_orders"], template_data["next_cursor"] = get_orders_for_buyer(
+                user_id, 'finished_order', role=db_role, after=request.args.get('after'))
     elif current_view == 'admin_seller_eval' and user_role == 'Administrator':
-        template_data["all_feedback"] = get_all_feedback_for_admin(role=db_role)
+        with timing_phase('all_feedback'):
+            template_data["all_feedback"] = get_all_feedback_for_admin(role=db_role)
         # 5. 템플릿 렌더링
     return render_template('mypage.html', **template_data)
 
@@ -1227,7 +3843,7 @@ def signup_user():
     try:
         cur = conn.cursor()
 
-        if role == 'Administrator' and admin_code != ADMIN_AUTH_CODE:
+        if role == 'Administrator' and admin_code != app.config['ADMIN_AUTH_CODE']:
             conn.rollback()
             return jsonify({"message": "관리자 인증 번호가 올바르지 않습니다."}), 403
 
@@ -1527,7 +4143,12 @@ def product_register():
                         (listing_id,)
                     )
 
+        # --- 4. 상품별 가격 비교 집계 갱신 (같은 트랜잭션) ---
+        refresh_product_price_summary(cur, product_id)
+
         conn.commit()
+        # 같은 상품의 다른 판매글 상세 페이지에도 가격 비교 정보가 바뀌므로 캐시 무효화
+        invalidate_product_detail(product_id=product_id)
         return jsonify({
             "message": "상품 등록에 성공했습니다.",
             "product_id": product_id,
@@ -1545,8 +4166,17 @@ def product_register():
         conn.close()
 
 
+# 입찰 요청의 경매별 속도 제한 버킷
+def auction_bid_rate_targets(data):
+    return [rate_limit_target('auction', data.get('auction_id'))]
+
+
 # --- 경매 입찰 API ---
 @app.route('/api/auction/bid', methods=['POST'])
+@route_deadline(2000, lock_timeout_ms=500)
+@admission_control(targets=auction_bid_rate_targets)
+@idempotent
+@retry_transaction
 def auction_bid():
     data = request.json
     auction_id = data.get('auction_id')
@@ -1573,7 +4203,7 @@ def auction_bid():
         # 1. 상태, 가격, 시간, 판매자 ID 조회 (v_auction_status를 활용)
         cur.execute(
             """
-            SELECT current_price, start_date, end_date, status, seller_id
+            SELECT current_price, start_date, end_date, status, seller_id, listing_id
             FROM v_auction_status
             WHERE auction_id = %s
                 FOR UPDATE
@@ -1627,10 +4257,15 @@ def auction_bid():
         )
 
         conn.commit()
+        # 현재가/최고 입찰자가 바뀌었으므로 상세 캐시 무효화
+        invalidate_product_detail(listing_id=auction_info['listing_id'])
         return jsonify({"message": "입찰에 성공했습니다.", "new_price": bid_price, "bidder_id": buyer_id}), 200
 
     except Exception as e:
         conn.rollback()
+        # 직렬화 실패/교착 상태는 retry_transaction이 다시 실행
+        if is_retryable_db_error(e):
+            raise
         return jsonify({"error": f"입찰 처리 중 오류 발생: {str(e)}"}), 500
     finally:
         cur.close()
@@ -1639,6 +4274,8 @@ def auction_bid():
 
 #  경매 종료 및 자동 주문 기능
 @app.route('/api/auction/finalize', methods=['POST'])
+@route_deadline(3000, lock_timeout_ms=1000)
+@retry_transaction
 def finalize_auction():
     data = request.json
     auction_id = data.get('auction_id')
@@ -1674,8 +4311,8 @@ def finalize_auction():
 
         listing_id = auction_info['listing_id']
 
-        # 2. 경매 종료 시간 확인
-        cur.execute("SELECT NOW()")
+        # 2. 경매 종료 시간 확인 (end_date는 KST 기준 timestamp이므로 같은 기준으로 비교)
+        cur.execute("SELECT NOW() AT TIME ZONE 'KST'")
         now = cur.fetchone()[0]
 
         if now <= auction_info['end_date'] and auction_info['status'] != '판매 종료':
@@ -1707,7 +4344,9 @@ def finalize_auction():
                 (winner_id, listing_id, final_price)
             )
             order_id = cur.fetchone()[0]
+            record_order_events(cur, [(order_id, 'auction_won', None, '상품 준비중')])
             conn.commit()
+            invalidate_product_detail(listing_id=listing_id)
             return jsonify({
                 "message": "경매가 종료되었습니다. 최고 입찰자에게 주문이 자동 생성되었습니다.",
                 "auction_id": auction_id,
@@ -1718,6 +4357,7 @@ def finalize_auction():
         else:
             # 유찰된 경우 (입찰자가 없음)
             conn.commit()
+            invalidate_product_detail(listing_id=listing_id)
             return jsonify({
                 "message": "경매가 종료되었습니다. (입찰자 없음)",
                 "auction_id": auction_id,
@@ -1726,6 +4366,9 @@ def finalize_auction():
 
     except Exception as e:
         conn.rollback()
+        # 직렬화 실패/교착 상태는 retry_transaction이 다시 실행
+        if is_retryable_db_error(e):
+            raise
         return jsonify({"error": f"경매 종료 처리 중 오류 발생: {str(e)}"}), 500
     finally:
         cur.close()
@@ -1734,6 +4377,7 @@ def finalize_auction():
 
 # --- 장바구니에 상품 추가 API ---
 @app.route('/api/cart/add', methods=['POST'])
+@admission_control(buckets=False)
 def add_to_cart():
     # 1. 로그인 확인
     if 'user_id' not in session or session.get('user_role') != 'Buyer':
@@ -1812,6 +4456,9 @@ def add_to_cart():
 
 # --- 장바구니 수량 변경 API ---
 @app.route('/api/cart/update', methods=['POST'])
+@route_deadline(2000, lock_timeout_ms=1000)
+@admission_control(buckets=False)
+@retry_transaction
 def update_cart():
     if 'user_id' not in session or session.get('user_role') != 'Buyer':
         return jsonify({"error": "구매자만 장바구니를 수정할 수 있습니다."}), 401
@@ -1826,6 +4473,14 @@ def update_cart():
     if not cart_items or not isinstance(cart_items, list):
         return jsonify({"error": "유효한 장바구니 항목 목록이 필요합니다."}), 400
 
+    quantities = {}  # cart_id -> quantity (같은 항목이 여러 번 오면 마지막 값)
+    for item in cart_items:
+        cart_id = item.get('cart_id') if isinstance(item, dict) else None
+        quantity = item.get('quantity') if isinstance(item, dict) else None
+        if not isinstance(cart_id, int) or not isinstance(quantity, int) or quantity <= 0:
+            return jsonify({"error": "항목 ID와 유효한 수량이 필요합니다."}), 400
+        quantities[cart_id] = quantity
+
     conn = get_db_connection(role=db_role)
     if conn is None:
         return jsonify({"error": "데이터베이스 연결 실패"}), 500
@@ -1834,28 +4489,23 @@ def update_cart():
     cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
     try:
-        for item in cart_items:
-            cart_id = item.get('cart_id')
-            quantity = item.get('quantity')
-
-            if not all([cart_id, quantity]) or quantity <= 0:
-                conn.rollback()
-                return jsonify({"error": "항목 ID와 유효한 수량이 필요합니다."}), 400
-
-            # 1. 장바구니 항목의 소유권 및 재고 확인
-            cur.execute(
-                """
-                SELECT L.stock, L.status, SC.listing_id
-                FROM ShoppingCart SC
-                         JOIN Listing L ON SC.listing_id = L.listing_id
-                WHERE SC.cart_id = %s
-                  AND SC.buyer_id = %s
-                    FOR UPDATE
-                """,
-                (cart_id, buyer_id)
-            )
-            info = cur.fetchone()
+        # 1. 장바구니 항목의 소유권 및 재고 확인 (항목 수와 관계없이 한 번에, cart_id 순서로 잠금)
+        cur.execute(
+            """
+            SELECT SC.cart_id, L.stock, L.status, SC.listing_id
+            FROM ShoppingCart SC
+                     JOIN Listing L ON SC.listing_id = L.listing_id
+            WHERE SC.cart_id = ANY(%s)
+              AND SC.buyer_id = %s
+            ORDER BY SC.cart_id
+                FOR UPDATE
+            """,
+            (list(quantities), buyer_id)
+        )
+        cart_info = {row['cart_id']: row for row in cur.fetchall()}
 
+        for cart_id, quantity in quantities.items():
+            info = cart_info.get(cart_id)
             if not info:
                 conn.rollback()
                 return jsonify({"error": f"장바구니 ID {cart_id}를 찾을 수 없거나 소유권이 없습니다."}), 404
@@ -1868,11 +4518,17 @@ def update_cart():
                 conn.rollback()
                 return jsonify({"error": f"요청 수량({quantity})이 재고({info['stock']})를 초과합니다. (ID: {cart_id})"}), 400
 
-            # 2. 수량 업데이트 실행
-            cur.execute(
-                "UPDATE ShoppingCart SET quantity = %s WHERE cart_id = %s",
-                (quantity, cart_id)
-            )
+        # 2. 수량 업데이트 실행 (한 문장)
+        cur.execute(
+            """
+            UPDATE ShoppingCart SC
+            SET quantity = U.quantity
+            FROM UNNEST(%s::int[], %s::int[]) AS U(cart_id, quantity)
+            WHERE SC.cart_id = U.cart_id
+              AND SC.buyer_id = %s
+            """,
+            (list(quantities.keys()), list(quantities.values()), buyer_id)
+        )
 
         conn.commit()
         session['cart_count'] = calculate_cart_count(buyer_id, role=db_role)
@@ -1880,6 +4536,9 @@ def update_cart():
 
     except Exception as e:
         conn.rollback()
+        # 직렬화 실패/교착 상태는 retry_transaction이 다시 실행
+        if is_retryable_db_error(e):
+            raise
         return jsonify({"error": f"장바구니 업데이트 트랜잭션 실패: {str(e)}"}), 500
     finally:
         cur.close()
@@ -1888,6 +4547,7 @@ def update_cart():
 
 # --- 장바구니 항목 삭제 API ---
 @app.route('/api/cart/remove', methods=['POST'])
+@admission_control(buckets=False)
 def remove_cart_item():
     data = request.json
     cart_ids = data.get('cart_ids')  # [1, 5, 8]
@@ -1934,8 +4594,81 @@ def remove_cart_item():
         conn.close()
 
 
+# 주문 요청의 판매 목록별 속도 제한 버킷
+# 한정 판매 상품은 Listing을 잠그지 않고 대기열에 들어가므로 판매 목록별로 제한하지 않음 (사용자별 제한만 적용)
+# 속도 제한 확인 전에 DB 연결을 잡지 않도록 한정 판매 목록은 캐시/마지막으로 읽은 값만 사용 (갱신은 place_order가 함)
+def order_rate_targets(data):
+    items = data.get('items')
+    if not isinstance(items, list):
+        return []
+    if len(items) > app.config['RATE_LIMIT_MAX_TARGETS']:
+        raise ValueError(f"한 번에 {app.config['RATE_LIMIT_MAX_TARGETS']}개 상품까지 주문할 수 있습니다.")
+    flash_sale_listing_ids = get_flash_sale_listing_ids(query_db=False)
+    targets = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("주문 항목 형식이 올바르지 않습니다.")
+        target = rate_limit_target('listing', item.get('listing_id'))
+        if str(item.get('listing_id')) not in flash_sale_listing_ids:
+            targets.append(target)
+    return targets
+
+
+# 한정 판매 상품 주문: 재고를 확인/차감하지 않고 대기표만 발급 (처리는 FlashSaleConsumer)
+def enqueue_flash_sale_ticket(buyer_id, item, db_role):
+    quantity = item.get('quantity')
+    if not isinstance(quantity, int) or quantity <= 0:
+        return jsonify({"error": "유효하지 않은 주문 수량입니다."}), 400
+    if quantity > app.config['FLASH_SALE_MAX_QUANTITY']:
+        return jsonify({"error": f"한정 판매 상품은 한 번에 {app.config['FLASH_SALE_MAX_QUANTITY']}개까지 주문할 수 있습니다."}), 400
+
+    conn = get_db_connection(role=db_role)
+    if conn is None:
+        return jsonify({"error": "데이터베이스 연결 실패"}), 500
+
+    conn.autocommit = False
+    cur = conn.cursor()
+    try:
+        # 대기표 등록과 소비자 깨우기를 한 문장으로 (NOTIFY는 커밋 시점에 전달)
+        cur.execute(
+            """
+            WITH ticket AS (
+                INSERT INTO FlashSaleTicket (listing_id, buyer_id, quantity, cart_id)
+                VALUES (%s, %s, %s, %s)
+                RETURNING ticket_id, listing_id
+            )
+            SELECT ticket_id, pg_notify(%s, listing_id::text) FROM ticket
+            """,
+            (item.get('listing_id'), buyer_id, quantity, item.get('cart_id'), app.config['FLASH_SALE_CHANNEL'])
+        )
+        ticket_id = cur.fetchone()[0]
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        if is_retryable_db_error(e):
+            raise
+        return jsonify({"error": f"주문 대기열 등록 실패: {str(e)}"}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+    flash_sale_consumer.ensure_started()
+    return jsonify({
+        "message": "주문 대기열에 등록되었습니다. 접수 순서대로 처리됩니다.",
+        "ticket_id": ticket_id,
+        "status": "queued",
+        "status_url": url_for('show_order_ticket', ticket_id=ticket_id),
+        "stream_url": url_for('stream_order_ticket', ticket_id=ticket_id)
+    }), 202, {'Retry-After': str(app.config['FLASH_SALE_TICKET_RETRY_AFTER'])}
+
+
 # --- 주문 생성 API (주문 시 재고 검증 및 차감) ---
+# 한정 판매 상품은 바로 주문하지 않고 대기표를 발급해 202로 응답 (결과는 /api/order/tickets/<ticket_id>로 확인)
 @app.route('/api/order/place', methods=['POST'])
+@route_deadline(3000, lock_timeout_ms=1000)
+@admission_control(targets=order_rate_targets)
+@idempotent
+@retry_transaction
 def place_order():
     if 'user_id' not in session or session.get('user_role') != 'Buyer':
         return jsonify({"error": "로그인이 필요합니다."}), 401
@@ -1949,6 +4682,23 @@ def place_order():
     if not items_to_order or not isinstance(items_to_order, list):
         return jsonify({"error": "유효한 주문 항목 목록이 필요합니다."}), 400
 
+    # 판매 목록 ID/수량은 정수만 허용, 같은 판매 목록이 여러 번 있으면 수량을 합쳐 재고를 확인
+    requested = {}  # listing_id -> 총 주문 수량 (요청 순서 유지)
+    for item in items_to_order:
+        if not isinstance(item, dict) or isinstance(item.get('listing_id'), bool) \
+                or not isinstance(item.get('listing_id'), int):
+            return jsonify({"error": "유효한 판매 목록 ID가 필요합니다."}), 400
+        quantity = item.get('quantity')
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+            return jsonify({"error": "유효하지 않은 주문 수량입니다."}), 400
+        requested[item['listing_id']] = requested.get(item['listing_id'], 0) + quantity
+
+    flash_sale_listing_ids = get_flash_sale_listing_ids()
+    if any(str(item.get('listing_id')) in flash_sale_listing_ids for item in items_to_order):
+        if len(items_to_order) > 1:
+            return jsonify({"error": "한정 판매 상품은 다른 상품과 함께 주문할 수 없습니다."}), 400
+        return enqueue_flash_sale_ticket(buyer_id, items_to_order[0], db_role)
+
     conn = get_db_connection(role=db_role)
     if conn is None:
         return jsonify({"error": "데이터베이스 연결 실패"}), 500
@@ -1960,22 +4710,22 @@ def place_order():
         order_details = []
         total_order_price = Decimal('0.0')
 
-        # 1. 모든 항목에 대해 재고 확인 및 가격 계산 (트랜잭션으로 보호)
-        for item in items_to_order:
-            listing_id = item.get('listing_id')
-            quantity = item.get('quantity')
-
-            if quantity <= 0:
-                conn.rollback()
-                return jsonify({"error": "유효하지 않은 주문 수량입니다."}), 400
-
-            # 1-1. Listing 정보 잠금 및 재고/가격 확인
-            cur.execute(
-                "SELECT price, stock, status, seller_id FROM Listing WHERE listing_id = %s FOR UPDATE",
-                (listing_id,)
-            )
-            listing_info = cur.fetchone()
+        # 1. 모든 항목에 대해 재고 확인 및 가격 계산 (트랜잭션으로 보호, 항목 수와 관계없이 같은 수의 SQL)
+        # 1-1. Listing 정보 잠금 및 재고/가격 확인 (listing_id 순서로 잠가 교착 상태 방지)
+        cur.execute(
+            """
+            SELECT listing_id, price, stock, status, seller_id, product_id
+            FROM Listing
+            WHERE listing_id = ANY(%s)
+            ORDER BY listing_id
+                FOR UPDATE
+            """,
+            (list(requested),)
+        )
+        listings = {row['listing_id']: row for row in cur.fetchall()}
 
+        for listing_id, quantity in requested.items():
+            listing_info = listings.get(listing_id)
             if not listing_info:
                 conn.rollback()
                 return jsonify({"error": f"판매 목록 ID {listing_id}를 찾을 수 없습니다."}), 404
@@ -1988,27 +4738,33 @@ def place_order():
                 conn.rollback()
                 return jsonify({"error": f"재고 부족: 상품 ID {listing_id}의 재고({listing_info['stock']})가 부족합니다."}), 400
 
-            # 가격 계산
-            unit_price = listing_info['price']
-            item_total = unit_price * quantity
+        # 가격 계산 및 주문 상세 정보 저장 (요청 항목마다 주문 1건)
+        for item in items_to_order:
+            listing_info = listings[item['listing_id']]
+            item_total = listing_info['price'] * item['quantity']
             total_order_price += item_total
-
-            # 주문 상세 정보 저장
             order_details.append({
-                'listing_id': listing_id,
-                'quantity': quantity,
+                'listing_id': item['listing_id'],
+                'quantity': item['quantity'],
                 'item_total': item_total,
                 'seller_id': listing_info['seller_id']
             })
 
-            # 1-2. 재고 차감
-            new_stock = listing_info['stock'] - quantity
-            new_status = '품절' if new_stock == 0 else '판매중'
+        # 1-2. 재고 차감 (재고가 0이 되면 품절)
+        cur.execute(
+            """
+            UPDATE Listing L
+            SET stock  = L.stock - R.quantity,
+                status = CASE WHEN L.stock - R.quantity = 0 THEN '품절' ELSE '판매중' END
+            FROM UNNEST(%s::int[], %s::int[]) AS R(listing_id, quantity)
+            WHERE L.listing_id = R.listing_id
+            """,
+            (list(requested.keys()), list(requested.values()))
+        )
 
-            cur.execute(
-                "UPDATE Listing SET stock = %s, status = %s WHERE listing_id = %s",
-                (new_stock, new_status, listing_id)
-            )
+        # 1-3. 재고가 바뀐 상품의 가격 비교 집계 갱신
+        touched_product_ids = {listings[listing_id]['product_id'] for listing_id in requested}
+        refresh_product_price_summaries(cur, touched_product_ids)
 
         # 2. 총 배송비 계산 및 최종 금액 확정
         shipping_fee = Decimal('3000')
@@ -2017,17 +4773,21 @@ def place_order():
 
         final_total = total_order_price + shipping_fee
 
-        # 3. Orderb 테이블에 주문 삽입 (단일 주문으로 처리)
-        order_ids = []
-        for detail in order_details:
-            cur.execute(
-                """
-                INSERT INTO Orderb (buyer_id, listing_id, quantity, total_price, status)
-                VALUES (%s, %s, %s, %s, '상품 준비중') RETURNING order_id
-                """,
-                (buyer_id, detail['listing_id'], detail['quantity'], detail['item_total'])
-            )
-            order_ids.append(cur.fetchone()[0])
+        # 3. Orderb 테이블에 주문 삽입 (항목별 주문 행을 한 문장으로, order_id는 요청 항목 순서대로 증가)
+        cur.execute(
+            """
+            INSERT INTO Orderb (buyer_id, listing_id, quantity, total_price, status)
+            SELECT %s, D.listing_id, D.quantity, D.total_price, '상품 준비중'
+            FROM UNNEST(%s::int[], %s::int[], %s::numeric[]) WITH ORDINALITY
+                     AS D(listing_id, quantity, total_price, seq)
+            ORDER BY D.seq
+            RETURNING order_id
+            """,
+            (buyer_id, [detail['listing_id'] for detail in order_details],
+             [detail['quantity'] for detail in order_details], [detail['item_total'] for detail in order_details])
+        )
+        order_ids = sorted(row[0] for row in cur.fetchall())
+        record_order_events(cur, [(order_id, 'placed', None, '상품 준비중') for order_id in order_ids])
 
         # 4. 장바구니에서 주문한 항목 제거
         cart_ids = [item.get('cart_id') for item in data.get('items') if item.get('cart_id')]
@@ -2044,6 +4804,9 @@ def place_order():
 
         # 5. 모든 작업 커밋
         conn.commit()
+        # 재고/판매 상태가 바뀐 상품의 상세 캐시 무효화
+        for product_id in touched_product_ids:
+            invalidate_product_detail(product_id=product_id)
         session['cart_count'] = calculate_cart_count(buyer_id, role=db_role)
 
         return jsonify({
@@ -2054,14 +4817,101 @@ def place_order():
 
     except Exception as e:
         conn.rollback()
+        # 직렬화 실패/교착 상태는 retry_transaction이 다시 실행
+        if is_retryable_db_error(e):
+            raise
         return jsonify({"error": f"주문 처리 트랜잭션 실패: {str(e)}"}), 500
     finally:
         cur.close()
         conn.close()
 
 
+# 구매자 본인의 대기표 조회 (없거나 다른 사람의 대기표면 None)
+def fetch_flash_sale_ticket(ticket_id, buyer_id, role=None):
+    conn = get_db_connection(role=role)
+    if conn is None:
+        return None
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cur.execute(
+            """
+            SELECT ticket_id, status, order_id, reject_reason, cart_id
+            FROM FlashSaleTicket
+            WHERE ticket_id = %s
+              AND buyer_id = %s
+            """,
+            (ticket_id, buyer_id)
+        )
+        ticket = cur.fetchone()
+        cur.close()
+        return ticket
+    finally:
+        conn.close()
+
+
+# --- 한정 판매 주문 대기표 조회 API (polling) ---
+# 아직 대기 중이면 다음 조회까지 기다릴 시간을 Retry-After로 알려줌
+@app.route('/api/order/tickets/<int:ticket_id>', methods=['GET'])
+def show_order_ticket(ticket_id):
+    if 'user_id' not in session or session.get('user_role') != 'Buyer':
+        return jsonify({"error": "로그인이 필요합니다."}), 401
+
+    buyer_id = session.get('user_id')
+    db_role = map_role_to_db_role(session.get('user_role'))
+    ticket = fetch_flash_sale_ticket(ticket_id, buyer_id, role=db_role)
+    if ticket is None:
+        return jsonify({"error": "대기표를 찾을 수 없습니다."}), 404
+
+    if ticket['status'] == 'queued':
+        flash_sale_consumer.ensure_started()  # 재시작 등으로 이 워커에 소비자가 없어도 대기열이 멈추지 않게
+        return jsonify(format_flash_sale_ticket(ticket)), 200, {
+            'Retry-After': str(app.config['FLASH_SALE_TICKET_RETRY_AFTER'])}
+    if ticket['status'] == 'confirmed' and ticket['cart_id']:
+        session['cart_count'] = calculate_cart_count(buyer_id, role=db_role)
+    return jsonify(format_flash_sale_ticket(ticket)), 200
+
+
+# --- 한정 판매 주문 대기표 결과 스트림 (SSE) ---
+# 처리가 끝나면 결과(event: ticket)를 한 번 보내고 닫음, ORDER_FEED_MAX_SECONDS가 지나면 닫고 브라우저가 재접속
+# 연결마다 워커 스레드를 잡으므로 SSE_STREAMS_MAX를 넘으면 503 (웹 화면은 이 스트림 대신 조회 API를 사용)
+@app.route('/api/order/tickets/<int:ticket_id>/stream', methods=['GET'])
+@route_deadline(None)
+def stream_order_ticket(ticket_id):
+    if 'user_id' not in session or session.get('user_role') != 'Buyer':
+        return jsonify({"error": "로그인이 필요합니다."}), 401
+
+    ticket = fetch_flash_sale_ticket(ticket_id, session.get('user_id'),
+                                     role=map_role_to_db_role(session.get('user_role')))
+    if ticket is None:
+        return jsonify({"error": "대기표를 찾을 수 없습니다."}), 404
+    if ticket['status'] == 'queued':
+        flash_sale_consumer.ensure_started()
+
+    def generate():
+        yield f"retry: 3000\n\n"
+        result = format_flash_sale_ticket(ticket)
+        if result['status'] == 'queued':
+            yield f"event: ticket\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+            waiter = flash_sale_ticket_watcher.watch(ticket_id)
+            try:
+                closes_at = time.monotonic() + app.config['ORDER_FEED_MAX_SECONDS']
+                while result['status'] == 'queued':
+                    if time.monotonic() >= closes_at:
+                        return
+                    try:
+                        result = waiter.get(timeout=app.config['ORDER_FEED_HEARTBEAT'])
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"
+            finally:
+                flash_sale_ticket_watcher.unwatch(ticket_id, waiter)
+        yield f"event: ticket\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+
+    return limited_event_stream(generate, retry_after=app.config['FLASH_SALE_TICKET_RETRY_AFTER'])
+
+
 # --- 주문 상태 변경 API (판매자 전용) ---
 @app.route('/api/order/update_status', methods=['POST'])
+@admission_control(buckets=False)
 def update_order_status():
     # 1. 권한 확인
     if 'user_id' not in session or session.get('user_role') not in ['PrimarySeller', 'Reseller']:
@@ -2122,6 +4972,7 @@ def update_order_status():
             "UPDATE Orderb SET status = %s WHERE order_id = %s",
             (next_status, order_id)
         )
+        record_order_events(cur, [(order_id, 'status_advanced', current_status, next_status)])
 
         conn.commit()
         return jsonify({
@@ -2137,6 +4988,239 @@ def update_order_status():
         conn.close()
 
 
+# --- 주문 상태 일괄 변경 API (판매자 전용) ---
+app.config['BULK_ORDER_STATUS_MAX'] = int(os.environ.get('BULK_ORDER_STATUS_MAX', '1000'))  # 한 번에 처리할 최대 주문 수
+
+
+# 여러 주문을 한 단계씩 진행 (상품 준비중 -> 배송 중 -> 배송 완료)
+# 요청: {"order_ids": [1, 2, ...], "from_status": "상품 준비중"(선택), "atomic": false(선택)}
+#   from_status: 지정하면 현재 그 상태인 주문만 변경 (중복 클릭으로 두 단계 진행되는 것 방지)
+#   atomic: true이면 하나라도 변경할 수 없는 주문이 있을 때 전체를 취소
+# 소유권/현재 상태 확인, 잠금, 변경을 SQL 한 문장으로 처리하고 주문별 결과를 반환
+@app.route('/api/order/bulk_update_status', methods=['POST'])
+@route_deadline(3000, lock_timeout_ms=1000)
+@admission_control(buckets=False)
+@retry_transaction
+def bulk_update_order_status():
+    if 'user_id' not in session or session.get('user_role') not in ['PrimarySeller', 'Reseller']:
+        return jsonify({"error": "판매자만 주문 상태를 변경할 수 있습니다."}), 403
+
+    data = request.json or {}
+    order_ids = data.get('order_ids')
+    from_status = data.get('from_status')
+    atomic = data.get('atomic', False)
+    user_role = session.get('user_role')
+    db_role = map_role_to_db_role(user_role)
+    seller_id = session.get('user_id')
+
+    if not isinstance(order_ids, list) or not order_ids:
+        return jsonify({"error": "주문 ID 목록이 필요합니다."}), 400
+    try:
+        # 중복 제거 (요청 순서 유지)
+        order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "주문 ID는 정수여야 합니다."}), 400
+    if len(order_ids) > app.config['BULK_ORDER_STATUS_MAX']:
+        return jsonify({"error": f"한 번에 최대 {app.config['BULK_ORDER_STATUS_MAX']}건까지 변경할 수 있습니다."}), 400
+    if from_status is not None and from_status not in ['상품 준비중', '배송 중']:
+        return jsonify({"error": "from_status는 '상품 준비중' 또는 '배송 중'이어야 합니다."}), 400
+    # 문자열 "false"가 참으로 해석되지 않도록 JSON boolean만 허용
+    if not isinstance(atomic, bool):
+        return jsonify({"error": "atomic은 true 또는 false여야 합니다."}), 400
+
+    conn = get_db_connection(role=db_role)
+    if conn is None:
+        return jsonify({"error": "데이터베이스 연결 실패"}), 500
+
+    conn.autocommit = False
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+    try:
+        # 1. 판매자 소유 주문만 잠그고(order_id 순서로 잠가 교착 상태 방지), 진행 가능한 주문을 다음 상태로 변경
+        #    요청한 주문 전체에 대해 (이전 상태, 새 상태)를 돌려받음 (소유하지 않은/없는 주문은 둘 다 NULL)
+        cur.execute(
+            """
+            WITH requested AS (
+                SELECT UNNEST(%(order_ids)s::int[]) AS order_id
+            ),
+            locked AS (
+                SELECT O.order_id, O.status
+                FROM Orderb O
+                         JOIN Listing L ON O.listing_id = L.listing_id
+                WHERE O.order_id = ANY(%(order_ids)s::int[])
+                  AND L.seller_id = %(seller_id)s
+                ORDER BY O.order_id
+                    FOR UPDATE OF O
+            ),
+            updated AS (
+                UPDATE Orderb O
+                SET status = CASE locked.status WHEN '상품 준비중' THEN '배송 중' ELSE '배송 완료' END
+                FROM locked
+                WHERE O.order_id = locked.order_id
+                  AND locked.status IN ('상품 준비중', '배송 중')
+                  AND (%(from_status)s::varchar IS NULL OR locked.status = %(from_status)s::varchar)
+                RETURNING O.order_id, O.status AS new_status
+            )
+            SELECT requested.order_id, locked.status AS previous_status, updated.new_status
+            FROM requested
+                     LEFT JOIN locked ON locked.order_id = requested.order_id
+                     LEFT JOIN updated ON updated.order_id = requested.order_id
+            """,
+            {'order_ids': order_ids, 'seller_id': seller_id, 'from_status': from_status}
+        )
+        rows = {row['order_id']: row for row in cur.fetchall()}
+
+        # 2. 주문별 결과 정리
+        results = []
+        for order_id in order_ids:
+            row = rows[order_id]
+            if row['previous_status'] is None:
+                results.append({"order_id": order_id, "result": "not_found",
+                                "error": "주문을 찾을 수 없거나 해당 주문의 판매자가 아닙니다."})
+            elif row['new_status'] is None:
+                if from_status and row['previous_status'] in ['상품 준비중', '배송 중']:
+                    error = f"현재 주문 상태가 '{row['previous_status']}'로 '{from_status}' 상태가 아닙니다."
+                else:
+                    error = f"주문 상태 '{row['previous_status']}'에서는 변경할 수 없습니다."
+                results.append({"order_id": order_id, "result": "skipped", "status": row['previous_status'],
+                                "error": error})
+            else:
+                results.append({"order_id": order_id, "result": "updated",
+                                "previous_status": row['previous_status'], "new_status": row['new_status']})
+
+        updated_count = sum(1 for result in results if result['result'] == 'updated')
+        failed_count = len(results) - updated_count
+
+        if atomic and failed_count:
+            conn.rollback()
+            return jsonify({
+                "error": f"변경할 수 없는 주문 {failed_count}건이 있어 전체 변경을 취소했습니다.",
+                "updated": 0,
+                "failed": failed_count,
+                "results": results
+            }), 409
+
+        record_order_events(cur, [
+            (result['order_id'], 'status_advanced', result['previous_status'], result['new_status'])
+            for result in results if result['result'] == 'updated'
+        ])
+        conn.commit()
+        return jsonify({
+            "message": f"주문 {updated_count}건의 상태가 변경되었습니다." + (f" ({failed_count}건 제외)" if failed_count else ""),
+            "updated": updated_count,
+            "failed": failed_count,
+            "results": results
+        }), 200
+
+    except Exception as e:
+        conn.rollback()
+        # 직렬화 실패/교착 상태는 retry_transaction이 다시 실행
+        if is_retryable_db_error(e):
+            raise
+        return jsonify({"error": f"주문 상태 일괄 변경 실패: {str(e)}"}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+# --- 판매자 주문 실시간 피드 (Server-Sent Events) ---
+app.config['ORDER_FEED_HEARTBEAT'] = float(os.environ.get('ORDER_FEED_HEARTBEAT', '15'))  # keep-alive 주석 전송 주기 (초)
+app.config['ORDER_FEED_MAX_SECONDS'] = float(os.environ.get('ORDER_FEED_MAX_SECONDS', '300'))  # 연결 유지 최대 시간 (초)
+app.config['ORDER_FEED_BACKLOG_MAX'] = int(os.environ.get('ORDER_FEED_BACKLOG_MAX', '500'))  # 재접속 시 다시 보내는 최대 이벤트 수
+
+
+# sse_id: 브라우저가 재접속 때 Last-Event-ID로 돌려보낼 값 (지금까지 보낸 가장 큰 event_id, 없으면 이 이벤트의 event_id)
+def format_sse(event, event_name='order', sse_id=None):
+    if sse_id is None:
+        sse_id = event['event_id']
+    return f"id: {sse_id}\nevent: {event_name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+# 판매자의 새 주문/주문 상태 변경을 실시간으로 전달 (마이페이지 판매 내역을 다시 조회하지 않아도 됨)
+# 재접속 시 브라우저가 보내는 Last-Event-ID(보낸 가장 큰 event_id) 이후의 놓친 이벤트를 OrderEvent에서 먼저 보냄
+# event_id는 커밋 순서가 아니므로 Last-Event-ID보다 ORDER_EVENT_RESUME_OVERLAP만큼 앞의 이벤트도 다시 보냄
+# (이미 받은 이벤트가 다시 올 수 있으므로 브라우저는 event_id로 중복을 거름)
+# 연결마다 워커 스레드 1개를 최대 ORDER_FEED_MAX_SECONDS 동안 잡으므로 워커당 SSE_STREAMS_MAX개까지만 열고 넘으면 503
+# ORDER_FEED_MAX_SECONDS가 지나면 연결을 닫음 (브라우저가 Last-Event-ID로 자동 재접속, 워커 스레드 정리)
+@app.route('/api/seller/orders/stream', methods=['GET'])
+@route_deadline(None)
+def stream_seller_orders():
+    if 'user_id' not in session or session.get('user_role') not in ['PrimarySeller', 'Reseller']:
+        return jsonify({"error": "판매자만 주문 피드를 받을 수 있습니다."}), 403
+
+    seller_id = session.get('user_id')
+    db_role = map_role_to_db_role(session.get('user_role'))
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('after') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    def generate():
+        # 구독을 먼저 시작한 뒤 밀린 이벤트를 읽어야 그 사이의 이벤트가 빠지지 않음 (중복은 seen으로 걸러냄)
+        subscriber = order_event_hub.subscribe(seller_id)
+        seen = RecentEventIds(app.config['ORDER_EVENT_SEEN_MAX'])
+        high_water = last_event_id
+        try:
+            yield f"retry: 3000\n\n"
+            if last_event_id:
+                conn = get_db_connection(role=db_role)
+                if conn is not None:
+                    try:
+                        # 겹치는 구간(Last-Event-ID 이하)은 최근 것부터 최대 ORDER_FEED_BACKLOG_MAX개,
+                        # 그 이후는 오래된 것부터 최대 ORDER_FEED_BACKLOG_MAX개 (잘리면 재접속으로 이어 받으며 high_water가 항상 전진)
+                        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                        cur.execute(
+                            """
+                            (SELECT event_id, order_id, buyer_id, seller_id, event_type, from_status, to_status, created_at
+                             FROM OrderEvent
+                             WHERE seller_id = %s
+                               AND event_id > %s
+                               AND event_id <= %s
+                             ORDER BY event_id DESC
+                             LIMIT %s)
+                            UNION ALL
+                            (SELECT event_id, order_id, buyer_id, seller_id, event_type, from_status, to_status, created_at
+                             FROM OrderEvent
+                             WHERE seller_id = %s
+                               AND event_id > %s
+                             ORDER BY event_id
+                             LIMIT %s)
+                            ORDER BY event_id
+                            """,
+                            (seller_id, last_event_id - app.config['ORDER_EVENT_RESUME_OVERLAP'], last_event_id,
+                             app.config['ORDER_FEED_BACKLOG_MAX'],
+                             seller_id, last_event_id, app.config['ORDER_FEED_BACKLOG_MAX'])
+                        )
+                        backlog = cur.fetchall()
+                        cur.close()
+                    finally:
+                        conn.close()
+                    for event in backlog:
+                        event = dict(event)
+                        event['created_at'] = event['created_at'].isoformat()
+                        seen.add(event['event_id'])
+                        high_water = max(high_water, event['event_id'])
+                        yield format_sse(event, sse_id=high_water)
+                    if sum(1 for event in backlog if event['event_id'] > last_event_id) >= app.config['ORDER_FEED_BACKLOG_MAX']:
+                        return  # 남은 이벤트는 재접속(Last-Event-ID)으로 이어서 보냄
+
+            closes_at = time.monotonic() + app.config['ORDER_FEED_MAX_SECONDS']
+            while time.monotonic() < closes_at and not subscriber.overflowed:
+                try:
+                    event = subscriber.get(timeout=app.config['ORDER_FEED_HEARTBEAT'])
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if not seen.add(event['event_id']):
+                    continue
+                high_water = max(high_water, event['event_id'])
+                yield format_sse(event, sse_id=high_water)
+        finally:
+            order_event_hub.unsubscribe(seller_id, subscriber)
+
+    return limited_event_stream(generate, retry_after=30)
+
+
 # --- 회원 정보 수정 API ---
 @app.route('/api/mypage/update', methods=['POST'])
 def api_update_profile():
@@ -2193,6 +5277,7 @@ def api_update_profile():
             cur.execute("UPDATE SellerProfile SET store_name = %s WHERE user_id = %s", (new_store_name, user_id))
 
         conn.commit()
+        invalidate_user_profile(user_id)
         return jsonify({"message": "회원 정보가 성공적으로 업데이트되었습니다."}), 200
 
     except Exception as e:
@@ -2288,8 +5373,13 @@ def update_product_listing():
             (price, stock, status, final_condition, listing_id)
         )
 
+        # 4. 상품별 가격 비교 집계 갱신 (가격/재고/상태/condition 변경 반영)
+        refresh_product_price_summary(cur, product_id)
+
         conn.commit()
         cur.close()
+        # 상품명/카테고리/가격 비교 정보는 같은 상품의 모든 판매글이 공유하므로 상품 단위로 무효화
+        invalidate_product_detail(listing_id=int(listing_id), product_id=product_id)
         return jsonify({"message": f"상품 (Listing ID: {listing_id}) 정보가 성공적으로 업데이트되었습니다."}), 200
 
     except psycopg2.Error as e:
@@ -2307,6 +5397,8 @@ def update_product_listing():
 
 # 관리자에게 분쟁 요청(구매자)
 @app.route('/api/dispute/create', methods=['POST'])
+@admission_control(buckets=False)
+@idempotent
 def create_dispute():
     # 1. 권한 확인 (구매자만 가능)
     if 'user_id' not in session or session.get('user_role') != 'Buyer':
@@ -2380,6 +5472,7 @@ def create_dispute():
             "UPDATE Orderb SET status = %s WHERE order_id = %s",
             (issue_type, order_id)  # issue_type은 '환불' 또는 '교환'이므로 ENUM에 맞는 값입니다.
         )
+        record_order_events(cur, [(order_id, 'dispute_opened', '배송 완료', issue_type)])
 
         # 4. 트랜잭션 커밋
         conn.commit()
@@ -2418,6 +5511,7 @@ def update_dispute_status():
 
     conn.autocommit = False
     cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    refunded_product_id = None  # 환불로 재고가 복원된 상품 (상세 캐시 무효화용)
 
     try:
         # 1. 분쟁 정보 및 현재 상태 확인 (FOR UPDATE)
@@ -2473,9 +5567,11 @@ def update_dispute_status():
 
             if resolution == '거절':
                 cur.execute(
-                    "UPDATE Orderb SET status = '구매 확정' WHERE order_id = %s AND status IN ('환불', '교환')",
+                    "UPDATE Orderb SET status = '구매 확정' WHERE order_id = %s AND status IN ('환불', '교환') RETURNING order_id",
                     (order_id,)
                 )
+                if cur.fetchone():
+                    record_order_events(cur, [(order_id, 'dispute_rejected', order_status, '구매 확정')])
                 message = f"분쟁 #{dispute_id} 요청이 관리자에 의해 거절되어 처리가 완료되었습니다. 주문 상태가 '구매 확정'으로 변경되었습니다."
 
             elif resolution in ['환불', '교환']:
@@ -2514,13 +5610,18 @@ def update_dispute_status():
                     "UPDATE Orderb SET status = %s WHERE order_id = %s",
                     (final_order_status, order_id)
                 )
+                record_order_events(cur, [(order_id, 'refund_approved' if resolution == '환불' else 'exchange_approved',
+                                            order_status, final_order_status)])
 
                 # C. 환불일 경우에만 Listing 재고 복원
                 if resolution == '환불':
                     cur.execute(
-                        "UPDATE Listing SET stock = stock + %s, status = '판매중' WHERE listing_id = %s",
+                        "UPDATE Listing SET stock = stock + %s, status = '판매중' WHERE listing_id = %s RETURNING product_id",
                         (quantity, listing_id)
                     )
+                    # 재고 복원으로 다시 판매중이 된 Listing을 가격 비교 집계에 반영
+                    refunded_product_id = cur.fetchone()['product_id']
+                    refresh_product_price_summary(cur, refunded_product_id)
                     message = f"분쟁 #{dispute_id} 승인: 주문 #{order_id}가 환불 처리되었으며, 재고 {quantity}개가 복원되었습니다."
                 else:
                     # 교환일 경우 재고 복원 없이 Orderb 상태만 변경
@@ -2532,6 +5633,8 @@ def update_dispute_status():
 
         # 4. 트랜잭션 커밋
         conn.commit()
+        if refunded_product_id is not None:
+            invalidate_product_detail(product_id=refunded_product_id)
         return jsonify({"message": message, "new_status": new_dispute_status}), 200
 
     except Exception as e:
@@ -2544,6 +5647,7 @@ def update_dispute_status():
 
 #구매 확정 라우터
 @app.route('/api/order/confirm_purchase', methods=['POST'])
+@admission_control(buckets=False)
 def confirm_purchase():
     # 1. 권한 확인
     if session.get('user_role') != 'Buyer':
@@ -2596,6 +5700,7 @@ def confirm_purchase():
             "UPDATE Orderb SET status = '구매 확정' WHERE order_id = %s",
             (order_id,)
         )
+        record_order_events(cur, [(order_id, 'purchase_confirmed', current_status, '구매 확정')])
 
         conn.commit()
         return jsonify({"message": f"주문 #{order_id}가 구매 확정되었습니다. 감사합니다.", "new_status": "구매 확정"}), 200
@@ -2647,6 +5752,7 @@ def update_product_by_admin():
         )
 
         conn.commit()
+        invalidate_product_detail(product_id=int(product_id))
         return jsonify({"message": f"상품(ID: {product_id}) 등급이 '{rating}'(으)로 수정되었습니다."}), 200
 
     except Exception as e:
@@ -2773,6 +5879,8 @@ def api_admin_seller_eval():
             message = "피드백이 거절되었으며, 통계에서 제외되었습니다."
 
         conn.commit()
+        # update_seller_evaluation에서 등급/평점이 다시 계산되었으므로 판매자 프로필 캐시 무효화
+        invalidate_user_profile(seller_id)
         return jsonify({"message": message, "feedback_id": feedback_id, "action": action}), 200
 
     except Exception as e:
@@ -2789,6 +5897,124 @@ def api_admin_seller_eval():
             conn.close()
 
 
+# === 운영 지표 ===
+#=================
+
+# Prometheus 수집(scrape)용 지표 조회
+@app.route('/metrics', methods=['GET'])
+def show_metrics():
+    if not app.config['METRICS_ENABLED']:
+        return "지표 수집이 비활성화되어 있습니다.", 404
+
+    lines = []
+    if app.config['METRICS_MULTIPROC_DIR']:
+        # 모든 워커의 값을 합산 (설정하지 않으면 이 워커의 값만)
+        totals = metrics_file_store.collect()
+        for metric in METRICS:
+            lines.extend(metric.render(totals[metric.name]))
+    else:
+        for metric in METRICS:
+            lines.extend(metric.render())
+    return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# 관리자용 SQL 지문별 통계 보고서 (상위 N개)
+# 예: /admin/query_stats?top=20&order_by=p99   (order_by: total, p99, calls, max)
+@app.route('/admin/query_stats', methods=['GET'])
+def show_query_stats():
+    if session.get('user_role') != 'Administrator':
+        return jsonify({"error": "관리자만 접근 가능합니다."}), 403
+
+    top_n = request.args.get('top', 20, type=int)
+    order_by = request.args.get('order_by', 'total')
+    return jsonify({
+        "slow_query_ms": app.config['SLOW_QUERY_MS'],
+        "order_by": order_by,
+        "queries": query_stats.report(top_n=top_n, order_by=order_by)
+    }), 200
+
+
+# 관리자용 저장된 프로파일 목록 (라우트별 최신순)
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    if session.get('user_role') != 'Administrator':
+        return jsonify({"error": "관리자만 접근 가능합니다."}), 403
+
+    profile_dir = app.config['PROFILE_DIR']
+    profiles = {}
+    if os.path.isdir(profile_dir):
+        for endpoint in sorted(os.listdir(profile_dir)):
+            route_dir = os.path.join(profile_dir, endpoint)
+            if not os.path.isdir(route_dir):
+                continue
+            profiles[endpoint] = [
+                {
+                    "file": filename,
+                    "size": os.path.getsize(os.path.join(route_dir, filename)),
+                    "url": url_for('download_profile', route=endpoint, filename=filename)
+                }
+                for filename in sorted(os.listdir(route_dir), reverse=True) if filename.endswith('.prof')
+            ]
+    return jsonify({"profiles": profiles}), 200
+
+
+# 관리자용 프로파일 다운로드 (?format=text 이면 누적 시간 상위 함수 요약을 텍스트로 반환)
+@app.route('/admin/profiles/<route>/<filename>', methods=['GET'])
+def download_profile(route, filename):
+    if session.get('user_role') != 'Administrator':
+        return jsonify({"error": "관리자만 접근 가능합니다."}), 403
+
+    route_dir = os.path.join(app.config['PROFILE_DIR'], secure_filename(route))
+    file_path = os.path.join(route_dir, secure_filename(filename))
+    if not filename.endswith('.prof') or not os.path.isfile(file_path):
+        abort(404)
+
+    if request.args.get('format') == 'text':
+        output = io.StringIO()
+        pstats.Stats(file_path, stream=output).sort_stats('cumulative').print_stats(50)
+        return Response(output.getvalue(), content_type='text/plain; charset=utf-8')
+    return send_from_directory(os.path.abspath(route_dir), secure_filename(filename), as_attachment=True)
+
+
+# --- 애플리케이션 팩토리 ---
+# 라우트가 모듈 수준 app에 등록되어 있으므로 같은 app에 설정을 덮어쓰고, 설정에서 만들어지는 구성 요소를 다시 맞춤
+# config: 환경 변수 대신 쓸 설정 값 (테스트/스크립트용)
+# require_secret: True이면 SECRET_KEY가 외부에서 주어지지 않았거나 ADMIN_AUTH_CODE가 개발용 기본값이면 시작하지 않음
+#                 (운영용, 워커 간 세션 공유 및 관리자 가입 보호)
+def create_app(config=None, require_secret=False):
+    if config:
+        app.config.update(config)
+        if config.get('SECRET_KEY'):
+            app.config['SECRET_KEY_EXTERNAL'] = True
+    if require_secret and not app.config['SECRET_KEY_EXTERNAL']:
+        raise RuntimeError("SECRET_KEY(또는 SECRET_KEY_FILE)가 설정되지 않았습니다. "
+                           "워커마다 다른 키가 생성되어 세션이 공유되지 않습니다.")
+    if require_secret and app.config['ADMIN_AUTH_CODE'] == DEFAULT_ADMIN_AUTH_CODE:
+        raise RuntimeError("ADMIN_AUTH_CODE(또는 ADMIN_AUTH_CODE_FILE)가 설정되지 않았습니다. "
+                           "개발용 기본 인증 번호로는 누구나 관리자로 가입할 수 있습니다.")
+    if not app.config['SECRET_KEY_EXTERNAL']:
+        print("[설정 경고] SECRET_KEY가 없어 임의 키를 사용합니다. 재시작하거나 워커가 여러 개이면 로그인이 풀립니다.")
+
+    if not os.path.exists(app.config['UPLOAD_FOLDER']):
+        os.makedirs(app.config['UPLOAD_FOLDER'])
+    if app.config['METRICS_MULTIPROC_DIR']:
+        os.makedirs(app.config['METRICS_MULTIPROC_DIR'], exist_ok=True)
+    product_detail_cache.ttl = app.config['PRODUCT_DETAIL_CACHE_TTL']
+    product_detail_cache.max_entries = app.config['PRODUCT_DETAIL_CACHE_MAX']
+    idempotency_cache.ttl = app.config['IDEMPOTENCY_CACHE_TTL']
+    flash_sale_listing_cache.ttl = app.config['FLASH_SALE_LISTING_CACHE_TTL']
+    user_profile_cache.ttl = app.config['USER_PROFILE_CACHE_TTL']
+    user_profile_cache.max_entries = app.config['USER_PROFILE_CACHE_MAX']
+    last_good_cache.ttl = app.config['STALE_CACHE_TTL']
+    last_good_cache.max_entries = app.config['STALE_CACHE_MAX']
+    memory_rate_buckets.max_entries = app.config['RATE_LIMIT_MAX_BUCKETS']
+    write_limiter.limit = app.config['WRITE_CONCURRENCY_MAX']
+    stream_limiter.limit = app.config['SSE_STREAMS_MAX']
+    db_breaker.failure_threshold = app.config['DB_BREAKER_FAILURE_THRESHOLD']
+    db_breaker.probe_interval = app.config['DB_BREAKER_PROBE_INTERVAL']
+    return app
+
+
 if __name__ == '__main__':
-    # 디버그 모드를 켜고 실행
-    app.run(debug=True)
\ No newline at end of file
+    # 개발 서버로 실행 (운영은 gunicorn -c gunicorn.conf.py wsgi:app)
+    create_app().run(debug=os.environ.get('FLASK_DEBUG', '1') == '1')
\ No newline at end of file
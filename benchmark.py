@@ -0,0 +1,212 @@
+# 주요 경로 벤치마크
+# 실제 Flask 앱(app.test_client)과 로컬 PostgreSQL로 시나리오별 요청을 동시에 실행하고
+# 처리량, p50/p95/p99 지연 시간, 요청당 SQL 수/DB 왕복 횟수를 JSON으로 출력함
+# 데이터는 datagen.py로 매 실행마다 같은 seed로 생성 (빈 DB에서 실행해야 결과 비교가 가능)
+#
+# 사용 예:
+#     python benchmark.py --requests 500 --concurrency 8 --output benchmark.json
+#     python benchmark.py --scenarios catalog,product_detail --requests 1000
+#
+# 입장 제어(RATE_LIMIT_ENABLED)는 기본으로 끄고 실행 (켜면 구매자별 초당 요청 수 제한 때문에 쓰기 시나리오가 대부분 429)
+# --rate-limit으로 켜면 429 응답 수는 rate_limited로 따로 세고, 지연 시간은 429를 뺀 요청으로만 계산
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import datagen
+from app import app, query_listeners, percentile
+
+SORT_OPTIONS = ['latest', 'low_price', 'high_price', 'rating']
+
+# 스레드별 SQL 수 / DB 왕복 횟수 집계 (요청마다 0으로 초기화)
+query_counts = threading.local()
+
+
+def count_query(query, elapsed, round_trips):
+    if getattr(query_counts, 'active', False):
+        query_counts.queries += 1
+        query_counts.round_trips += round_trips
+
+
+# --- 시나리오: (client, rng, dataset, state) -> 응답 ---
+def scenario_catalog(client, rng, dataset, state):
+    category = rng.choice(datagen.CATEGORIES)
+    return client.get(f"/category/{category}?sort_by={rng.choice(SORT_OPTIONS)}")
+
+
+def scenario_search(client, rng, dataset, state):
+    product_id = dataset['product_ids'][datagen.skewed_index(rng, len(dataset['product_ids']))]
+    return client.get(f"/search?query=상품 {product_id}&sort_by={rng.choice(SORT_OPTIONS)}")
+
+
+def scenario_product_detail(client, rng, dataset, state):
+    listing_id = dataset['listing_ids'][datagen.skewed_index(rng, len(dataset['listing_ids']))]
+    return client.get(f"/product/{listing_id}")
+
+
+def scenario_add_to_cart(client, rng, dataset, state):
+    listing_id = dataset['listing_ids'][datagen.skewed_index(rng, len(dataset['listing_ids']))]
+    return client.post('/api/cart/add', json={'listing_id': listing_id, 'quantity': 1})
+
+
+def scenario_checkout(client, rng, dataset, state):
+    # 재고가 충분한 1차 판매 Listing에 주문 (인기 상품에 주문이 몰리도록 편중 선택)
+    listing_id = dataset['primary_listing_ids'][datagen.skewed_index(rng, len(dataset['primary_listing_ids']))]
+    return client.post('/api/order/place', json={'items': [{'listing_id': listing_id, 'quantity': 1}]})
+
+
+def scenario_auction_bid(client, rng, dataset, state):
+    # 진행 중인 경매에 입찰가를 계속 올려 가며 입찰 (동시에 같은 가격을 낸 요청은 400으로 실패할 수 있음)
+    # 시작가는 생성된 경매의 현재가(최대 35만원)보다 높게 잡음
+    live_auction_ids = dataset['auction_ids_by_state']['live']
+    auction_id = live_auction_ids[datagen.skewed_index(rng, len(live_auction_ids))]
+    with state['lock']:
+        bid_price = state['bids'].get(auction_id, 1000000) + 1000
+        state['bids'][auction_id] = bid_price
+    return client.post('/api/auction/bid', json={'auction_id': auction_id, 'bid_price': bid_price})
+
+
+SCENARIOS = {
+    'catalog': scenario_catalog,
+    'search': scenario_search,
+    'product_detail': scenario_product_detail,
+    'add_to_cart': scenario_add_to_cart,
+    'checkout': scenario_checkout,
+    'auction_bid': scenario_auction_bid,
+}
+
+
+def buyer_client(buyer_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = buyer_id
+        sess['user_role'] = 'Buyer'
+        sess['user_name'] = f"사용자{buyer_id}"
+    return client
+
+
+def run_scenario(name, dataset, state, total_requests, concurrency, seed):
+    scenario = SCENARIOS[name]
+    samples = []
+    samples_lock = threading.Lock()
+    per_worker = [total_requests // concurrency + (1 if index < total_requests % concurrency else 0)
+                  for index in range(concurrency)]
+
+    def worker(index):
+        rng = random.Random(f"{seed}-{name}-{index}")
+        client = buyer_client(dataset['buyer_ids'][index % len(dataset['buyer_ids'])])
+        local_samples = []
+        for _ in range(per_worker[index]):
+            query_counts.active = True
+            query_counts.queries = 0
+            query_counts.round_trips = 0
+            start = time.perf_counter()
+            try:
+                status = scenario(client, rng, dataset, state).status_code
+            except Exception as e:
+                print(f"[벤치마크] {name} 요청 오류: {e}")
+                status = 0
+            elapsed = time.perf_counter() - start
+            query_counts.active = False
+            local_samples.append((elapsed, status, query_counts.queries, query_counts.round_trips))
+        with samples_lock:
+            samples.extend(local_samples)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    # 입장 제어가 바로 돌려보낸 429는 처리 지연에서 제외
+    latencies = sorted(sample[0] * 1000 for sample in samples if sample[1] != 429)
+    status_counts = {}
+    for sample in samples:
+        status_counts[str(sample[1])] = status_counts.get(str(sample[1]), 0) + 1
+    count = len(samples) or 1
+    return {
+        'requests': len(samples),
+        'concurrency': concurrency,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0,
+        'status_counts': status_counts,
+        'rate_limited': status_counts.get('429', 0),
+        'errors': sum(1 for sample in samples if sample[1] == 0 or sample[1] >= 500),
+        'latency_ms': {
+            'mean': round(sum(latencies) / (len(latencies) or 1), 2),
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+        'queries_per_request': round(sum(sample[2] for sample in samples) / count, 2),
+        'db_round_trips_per_request': round(sum(sample[3] for sample in samples) / count, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='마켓 주요 경로 벤치마크')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='쉼표로 구분한 시나리오 목록')
+    parser.add_argument('--requests', type=int, default=200, help='시나리오별 요청 수')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=20, help='시나리오별 측정 전 예열 요청 수')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--buyers', type=int, default=500)
+    parser.add_argument('--sellers', type=int, default=50)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--auctions', type=int, default=50)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--rate-limit', action='store_true', help='입장 제어(요청 속도/동시 실행 수 제한)를 켠 채로 측정')
+    # 앱의 접속 로그가 표준 출력으로 나가므로 결과는 파일로 저장
+    parser.add_argument('--output', default='benchmark.json', help='결과 JSON 파일 경로')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"알 수 없는 시나리오: {', '.join(unknown)} (가능: {', '.join(SCENARIOS)})")
+
+    dataset = datagen.generate(buyers=args.buyers, sellers=args.sellers, products=args.products,
+                               auctions=args.auctions, orders=args.orders, seed=args.seed)
+
+    app.config['RATE_LIMIT_ENABLED'] = args.rate_limit
+    query_listeners.append(count_query)
+    results = {}
+    for name in names:
+        # 예열과 측정이 같은 상태(경매별 마지막 입찰가 등)를 이어서 사용
+        state = {'lock': threading.Lock(), 'bids': {}}
+        if args.warmup:
+            run_scenario(name, dataset, state, args.warmup, min(args.concurrency, args.warmup), args.seed + 1)
+        results[name] = run_scenario(name, dataset, state, args.requests, args.concurrency, args.seed)
+        print(f"[벤치마크] {name}: {results[name]['throughput_rps']} req/s, "
+              f"p95 {results[name]['latency_ms']['p95']}ms, 429 {results[name]['rate_limited']}건", file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'scenarios': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print(f"[벤치마크] 결과 저장: {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+# 대량 테스트 데이터 생성기
+# COPY로 Users/프로필/Product/Listing/ListingImage/Auction/Orderb 행을 한 번에 적재하고,
+# Dispute/Feedback/OrderEvent/판매자 평가는 적재한 주문을 바탕으로 SQL(INSERT ... SELECT)로 만듦
+# 같은 seed와 규모(scale)면 항상 같은 데이터가 만들어짐 (벤치마크 재현용)
+#
+# 분포는 실제 서비스처럼 한쪽으로 치우치게 생성함
+# - 인기 상품: 상위 1% 상품에 주문의 약 20%, 상위 10% 상품에 약 45%가 몰림
+# - 파워 판매자: 상위 1% 리셀러가 리셀 Listing의 약 20%를 등록
+#
+# 사용 예:
+#     python datagen.py --seed 42                  # 기본 규모 (수만 행)
+#     python datagen.py --scale 1000 --seed 42 --skip-fk-checks
+#         -> 약 3천만 행 (Users 105만, Product 200만, Listing 600만, ListingImage 1000만, Orderb 1000만 ...)
+import argparse
+import array
+import datetime
+import io
+import random
+import time
+
+from app import app, open_db_connection, PRICE_SUMMARY_ALL, PRICE_SUMMARY_NO_CONDITION
+
+# base.html 카테고리 메뉴와 동일
+CATEGORIES = ['음반', '피규어', '인형', '아크릴', '응원도구', '포카', '의류', '기타']
+CONDITIONS = ['미개봉', '최상', '중', '하']
+RATINGS = ['S', 'A', 'B', 'C']
+# COPY 텍스트 형식에서 이스케이프가 필요한 문자
+ESCAPE_CHARS = frozenset('\\\t\n\r')
+
+# 주문 상태별 비율 (place_order -> update_order_status -> 구매 확정 / 분쟁 흐름의 모든 상태)
+ORDER_STATUS_WEIGHTS = [('상품 준비중', 8), ('배송 중', 10), ('배송 완료', 17), ('구매 확정', 55), ('환불', 5), ('교환', 5)]
+# 경매 생명주기: 예정 / 진행 중 / 종료됐지만 미처리 / 처리 완료(낙찰 주문 생성)
+AUCTION_STATES = ['scheduled', 'live', 'ended', 'finalized']
+
+# --scale 1 기준 규모
+DEFAULT_SIZES = {
+    'buyers': 1000,
+    'sellers': 50,
+    'admins': 2,
+    'products': 2000,
+    'listings_per_product': 3,
+    'auctions': 100,
+    'orders': 10000,
+}
+
+
+# 행(tuple) 생성기를 COPY ... FROM STDIN (텍스트 형식) 입력 스트림으로 변환
+# 전체 데이터를 메모리에 올리지 않고 필요한 만큼씩 만들어서 전달함
+class CopyStream(io.RawIOBase):
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = bytearray()
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        if len(self.buffer) < len(target):
+            lines = []
+            size = len(self.buffer)
+            for row in self.rows:
+                line = ('\t'.join(map(copy_value, row)) + '\n').encode('utf-8')
+                lines.append(line)
+                size += len(line)
+                if size >= len(target):
+                    break
+            self.buffer += b''.join(lines)
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        del self.buffer[:size]
+        return size
+
+
+# COPY 텍스트 형식 값 변환 (NULL은 \N, 특수문자는 이스케이프)
+def copy_value(value):
+    value_type = type(value)
+    if value_type is int:
+        return str(value)
+    if value is None:
+        return '\\N'
+    if value_type is bool:
+        return 't' if value else 'f'
+    if value_type is str and not ESCAPE_CHARS.intersection(value):
+        return value
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+# 다른 세션이 같은 테이블에 INSERT하지 못하게 잠근 뒤 다음 id부터 count개를 예약
+# COPY에 id를 직접 넣고 끝나면 시퀀스를 맞춰 둠 (생성한 행의 id 범위를 바로 알 수 있음)
+def reserve_ids(cur, table, id_column, count):
+    cur.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+    cur.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}")
+    first_id = cur.fetchone()[0] + 1
+    if count > 0:
+        cur.execute("SELECT setval(pg_get_serial_sequence(%s, %s), %s)",
+                    (table.lower(), id_column, first_id + count - 1))
+    return first_id
+
+
+def copy_rows(cur, table, columns, rows):
+    start = time.perf_counter()
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", CopyStream(iter(rows)), size=1 << 20)
+    elapsed = time.perf_counter() - start
+    print(f"[데이터 생성] {table}: {cur.rowcount:,}행 ({elapsed:.1f}초, {cur.rowcount / max(elapsed, 1e-9):,.0f}행/초)")
+    return cur.rowcount
+
+
+def execute_timed(cur, label, query, params=None):
+    start = time.perf_counter()
+    cur.execute(query, params)
+    print(f"[데이터 생성] {label}: {cur.rowcount:,}행 ({time.perf_counter() - start:.1f}초)")
+
+
+# 인기 편중 분포에서 0..size-1 범위의 인덱스 선택 (앞쪽 인덱스일수록 자주 선택됨)
+# skew=3이면 상위 1%가 약 21%, 상위 10%가 약 46%를 차지
+def skewed_index(rng, size, skew=3.0):
+    return min(size - 1, int(size * rng.random() ** skew)) if size > 1 else 0
+
+
+def weighted_picker(rng, weights):
+    values = [value for value, _ in weights]
+    cumulative = []
+    total = 0
+    for _, weight in weights:
+        total += weight
+        cumulative.append(total)
+    return lambda: rng.choices(values, cum_weights=cumulative)[0]
+
+
+def generate(buyers=1000, sellers=50, admins=2, products=2000, listings_per_product=3, auctions=100,
+             orders=10000, seed=42, skip_fk_checks=False):
+    if listings_per_product < 1:
+        raise ValueError("상품별 Listing 수는 1 이상이어야 합니다.")
+    if auctions > products * listings_per_product:
+        raise ValueError("경매 수는 전체 Listing 수보다 클 수 없습니다.")
+    if buyers < 1 or sellers < 1:
+        raise ValueError("구매자와 판매자는 각각 1명 이상이어야 합니다.")
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    conn = open_db_connection()
+    conn.autocommit = False
+    cur = conn.cursor()
+    try:
+        # 대량 적재용 세션 설정 (커밋 시 WAL flush 대기 생략)
+        cur.execute("SET synchronous_commit = off")
+        if skip_fk_checks:
+            # 행마다 실행되는 외래 키 검사 트리거를 건너뜀 (슈퍼유저 필요, 생성 데이터는 참조 관계가 맞게 만들어짐)
+            cur.execute("SET session_replication_role = replica")
+        # 앱과 같은 기준(KST)의 현재 시각
+        cur.execute("SELECT NOW() AT TIME ZONE 'KST'")
+        now = cur.fetchone()[0]
+
+        # --- Users / 프로필: [구매자][1차 판매자][리셀러][관리자] 순서로 연속된 id ---
+        tag = f"gen{seed}_{int(time.time())}"
+        primary_sellers = max(1, sellers // 2)
+        resellers = max(1, sellers - primary_sellers)
+        user_count = buyers + primary_sellers + resellers + admins
+        first_buyer_id = reserve_ids(cur, 'Users', 'user_id', user_count)
+        first_primary_id = first_buyer_id + buyers
+        first_reseller_id = first_primary_id + primary_sellers
+        first_admin_id = first_reseller_id + resellers
+
+        def user_role(user_id):
+            if user_id < first_primary_id:
+                return 'Buyer'
+            if user_id < first_reseller_id:
+                return 'PrimarySeller'
+            return 'Reseller' if user_id < first_admin_id else 'Administrator'
+
+        copy_rows(cur, 'Users', ('user_id', 'user_uid', 'password', 'name', 'role'), (
+            (user_id, f"{tag}_{user_id}", 'pw', f"사용자{user_id}", user_role(user_id))
+            for user_id in range(first_buyer_id, first_buyer_id + user_count)
+        ))
+        copy_rows(cur, 'BuyerProfile', ('user_id', 'address'),
+                  ((user_id, f"서울시 테스트구 {user_id}") for user_id in range(first_buyer_id, first_primary_id)))
+        copy_rows(cur, 'SellerProfile', ('user_id', 'store_name', 'grade'),
+                  ((user_id, f"상점{user_id}", 'Bronze') for user_id in range(first_primary_id, first_admin_id)))
+        copy_rows(cur, 'SellerEvaluation', ('seller_id', 'avg_score', 'grade'),
+                  ((user_id, 0, 'Bronze') for user_id in range(first_primary_id, first_admin_id)))
+        if admins:
+            copy_rows(cur, 'AdminProfile', ('user_id',),
+                      ((user_id,) for user_id in range(first_admin_id, first_admin_id + admins)))
+
+        # --- Product ---
+        first_product_id = reserve_ids(cur, 'Product', 'product_id', products)
+        copy_rows(cur, 'Product', ('product_id', 'name', 'category', 'description', 'image_url', 'rating'), (
+            (product_id, f"상품 {product_id}", rng.choice(CATEGORIES), f"테스트 상품 {product_id} 설명",
+             None, rng.choice(RATINGS))
+            for product_id in range(first_product_id, first_product_id + products)
+        ))
+
+        # --- Listing: 상품마다 1차 판매 1건 + 리셀 (listings_per_product - 1)건, 마지막 auctions건은 경매 ---
+        listing_count = products * listings_per_product
+        first_listing_id = reserve_ids(cur, 'Listing', 'listing_id', listing_count)
+        first_auction_listing_id = first_listing_id + listing_count - auctions
+        # 주문 생성 시 사용할 Listing별 가격 (array로 메모리 사용 최소화)
+        listing_prices = array.array('l', bytes(8 * listing_count))
+
+        def listing_rows():
+            listing_id = first_listing_id
+            for product_id in range(first_product_id, first_product_id + products):
+                base_price = rng.randrange(5, 300) * 1000
+                for position in range(listings_per_product):
+                    if listing_id >= first_auction_listing_id:
+                        # 상태는 경매 생명주기 단계에 맞게 아래에서 다시 설정
+                        row = (listing_id, product_id, first_reseller_id + skewed_index(rng, resellers), 'Resale',
+                               base_price, 1, '경매 중', rng.choice(CONDITIONS), None)
+                    elif position == 0:
+                        row = (listing_id, product_id, first_primary_id + skewed_index(rng, primary_sellers),
+                               'Primary', base_price, rng.randrange(50, 500), '판매중', None, None)
+                    else:
+                        row = (listing_id, product_id, first_reseller_id + skewed_index(rng, resellers), 'Resale',
+                               int(base_price * rng.uniform(0.6, 1.8)) // 100 * 100, 1, '판매중',
+                               rng.choice(CONDITIONS), None)
+                    listing_prices[listing_id - first_listing_id] = row[4]
+                    yield row
+                    listing_id += 1
+
+        copy_rows(cur, 'Listing', ('listing_id', 'product_id', 'seller_id', 'listing_type', 'price', 'stock',
+                                   'status', 'condition', 'list_description'), listing_rows())
+
+        # 대표 이미지 1장 + 리셀 Listing은 추가 이미지 0~3장
+        def image_rows():
+            for listing_id in range(first_listing_id, first_listing_id + listing_count):
+                yield (listing_id, f"/static/uploads/{listing_id}_0.png", True)
+                if (listing_id - first_listing_id) % listings_per_product:
+                    for number in range(1, rng.randrange(1, 5)):
+                        yield (listing_id, f"/static/uploads/{listing_id}_{number}.png", False)
+
+        copy_rows(cur, 'ListingImage', ('listing_id', 'image_url', 'is_main'), image_rows())
+
+        # --- Auction: 생명주기 단계를 번갈아 배정 ---
+        first_auction_id = reserve_ids(cur, 'Auction', 'auction_id', auctions)
+        auction_states = {state: [] for state in AUCTION_STATES}
+        winners = []  # 처리 완료 경매의 (listing_id, buyer_id, price, end_date) -> 낙찰 주문
+
+        def auction_rows():
+            for index in range(auctions):
+                auction_id = first_auction_id + index
+                listing_id = first_auction_listing_id + index
+                state = AUCTION_STATES[index % len(AUCTION_STATES)]
+                auction_states[state].append(auction_id)
+                start_price = listing_prices[listing_id - first_listing_id]
+                bidder_id = first_buyer_id + skewed_index(rng, buyers)
+                current_price = start_price + rng.randrange(1, 50) * 1000
+                if state == 'scheduled':
+                    start_date = now + datetime.timedelta(hours=rng.randrange(1, 72))
+                    yield (auction_id, listing_id, start_price, start_price, start_date,
+                           start_date + datetime.timedelta(days=7), None)
+                elif state == 'live':
+                    start_date = now - datetime.timedelta(hours=rng.randrange(1, 72))
+                    has_bid = rng.random() < 0.7
+                    yield (auction_id, listing_id, start_price, current_price if has_bid else start_price, start_date,
+                           now + datetime.timedelta(hours=rng.randrange(1, 168)), bidder_id if has_bid else None)
+                else:
+                    end_date = now - datetime.timedelta(hours=rng.randrange(1, 720))
+                    if state == 'finalized':
+                        winners.append((listing_id, bidder_id, current_price, end_date))
+                    yield (auction_id, listing_id, start_price, current_price, end_date - datetime.timedelta(days=7),
+                           end_date, bidder_id)
+
+        copy_rows(cur, 'Auction', ('auction_id', 'listing_id', 'start_price', 'current_price', 'start_date',
+                                   'end_date', 'current_highest_bidder_id'), auction_rows())
+        if auction_states['scheduled']:
+            execute_timed(cur, 'Listing 경매 예정', """
+                UPDATE Listing SET status = '경매 예정'
+                WHERE listing_id IN (SELECT listing_id FROM Auction WHERE auction_id = ANY (%s))
+                """, (auction_states['scheduled'],))
+        if auction_states['finalized']:
+            execute_timed(cur, 'Listing 낙찰 완료', """
+                UPDATE Listing SET status = '판매 종료', stock = 0
+                WHERE listing_id IN (SELECT listing_id FROM Auction WHERE auction_id = ANY (%s))
+                """, (auction_states['finalized'],))
+
+        # --- Orderb: 인기 상품에 편중, 최근 1년 사이 주문일, 모든 주문 상태 포함 ---
+        sellable_products = (first_auction_listing_id - first_listing_id) // listings_per_product
+        if not sellable_products:
+            orders = 0
+        order_count = orders + len(winners)
+        first_order_id = reserve_ids(cur, 'Orderb', 'order_id', order_count)
+        pick_status = weighted_picker(rng, ORDER_STATUS_WEIGHTS)
+
+        def order_rows():
+            order_id = first_order_id
+            for _ in range(orders):
+                product_index = skewed_index(rng, sellable_products)
+                # 주문의 80%는 재고가 많은 1차 판매 Listing, 나머지는 리셀 Listing
+                position = 0
+                if listings_per_product > 1 and rng.random() >= 0.8:
+                    position = rng.randrange(1, listings_per_product)
+                index = product_index * listings_per_product + position
+                quantity = rng.randrange(1, 4) if position == 0 else 1
+                status = pick_status()
+                order_date = now - datetime.timedelta(seconds=rng.randrange(0, 365 * 86400))
+                feedback_submitted = status == '구매 확정' and rng.random() < 0.6
+                yield (order_id, first_buyer_id + skewed_index(rng, buyers, skew=1.5), first_listing_id + index,
+                       quantity, listing_prices[index] * quantity, order_date, status, feedback_submitted)
+                order_id += 1
+            # 낙찰 주문 (경매 종료 처리 시 자동 생성되는 주문)
+            for listing_id, buyer_id, price, end_date in winners:
+                yield (order_id, buyer_id, listing_id, 1, price, end_date, pick_status(), False)
+                order_id += 1
+
+        copy_rows(cur, 'Orderb', ('order_id', 'buyer_id', 'listing_id', 'quantity', 'total_price', 'order_date',
+                                  'status', 'feedback_submitted'), order_rows())
+        last_order_id = first_order_id + order_count - 1
+
+        # 주문된 리셀 Listing(재고 1개)은 품절 처리
+        execute_timed(cur, 'Listing 리셀 품절', """
+            UPDATE Listing L SET status = '품절', stock = 0
+            WHERE L.listing_type = 'Resale'
+              AND L.status = '판매중'
+              AND L.listing_id BETWEEN %s AND %s
+              AND EXISTS (SELECT 1 FROM Orderb O WHERE O.listing_id = L.listing_id AND O.order_id BETWEEN %s AND %s)
+            """, (first_listing_id, first_auction_listing_id - 1, first_order_id, last_order_id))
+
+        # --- Dispute / Feedback: 적재한 주문에서 SQL로 생성 (setseed로 같은 seed면 같은 결과) ---
+        cur.execute("SELECT setseed(%s)", ((seed % 1000) / 1000.0,))
+        admin_ids = list(range(first_admin_id, first_admin_id + admins))
+        # 환불/교환 상태 주문: 처리 전(미배정)/처리 중 분쟁
+        # 일부 구매 확정 주문: 관리자가 거절해 처리 완료된 분쟁
+        execute_timed(cur, 'Dispute', """
+            INSERT INTO Dispute (order_id, issue_type, status, reason, admin_id)
+            SELECT order_id, issue_type, dispute_status, '테스트 분쟁 사유',
+                   CASE WHEN dispute_status = '처리 전' OR cardinality(%s::int[]) = 0 THEN NULL
+                        ELSE (%s::int[])[1 + order_id %% greatest(cardinality(%s::int[]), 1)] END
+            FROM (SELECT order_id,
+                         CASE WHEN status IN ('환불', '교환') THEN status
+                              WHEN random() < 0.5 THEN '환불' ELSE '교환' END AS issue_type,
+                         CASE WHEN status = '구매 확정' THEN '처리 완료'
+                              WHEN random() < 0.5 THEN '처리 전' ELSE '처리 중' END AS dispute_status
+                  FROM Orderb
+                  WHERE order_id BETWEEN %s AND %s
+                    AND (status IN ('환불', '교환')
+                      OR (status = '구매 확정' AND NOT feedback_submitted AND random() < 0.05))) D
+            """, (admin_ids, admin_ids, admin_ids, first_order_id, last_order_id))
+        execute_timed(cur, 'Feedback', """
+            INSERT INTO Feedback (order_id, target_seller_id, rating, comment, is_checked)
+            SELECT O.order_id, L.seller_id,
+                   (ARRAY [5, 5, 5, 5, 5, 4, 4, 4, 3, 2, 1])[1 + floor(random() * 11)::int],
+                   '테스트 후기',
+                   random() < 0.7
+            FROM Orderb O
+                     JOIN Listing L ON O.listing_id = L.listing_id
+            WHERE O.order_id BETWEEN %s AND %s
+              AND O.feedback_submitted
+            """, (first_order_id, last_order_id))
+
+        # --- OrderEvent: 주문마다 생성 이벤트, 현재 상태가 '상품 준비중'이 아니면 현재 상태로의 변경 이벤트 1건 ---
+        execute_timed(cur, 'OrderEvent', """
+            INSERT INTO OrderEvent (order_id, buyer_id, seller_id, event_type, from_status, to_status, created_at)
+            SELECT O.order_id, O.buyer_id, L.seller_id, E.event_type, E.from_status, E.to_status, E.created_at
+            FROM Orderb O
+                     JOIN Listing L ON O.listing_id = L.listing_id
+                     CROSS JOIN LATERAL (
+                VALUES (CASE WHEN L.listing_id >= %s THEN 'auction_won' ELSE 'placed' END,
+                        NULL, '상품 준비중', O.order_date),
+                       ('status_changed', '상품 준비중', O.status, O.order_date + INTERVAL '1 day')
+                ) AS E(event_type, from_status, to_status, created_at)
+            WHERE O.order_id BETWEEN %s AND %s
+              AND (E.from_status IS NULL OR O.status <> '상품 준비중')
+            ORDER BY O.order_id, E.created_at
+            """, (first_auction_listing_id, first_order_id, last_order_id))
+
+        # 판매자 평가/등급 일괄 계산 (update_seller_evaluation과 같은 기준)
+        execute_timed(cur, 'SellerEvaluation', """
+            UPDATE SellerEvaluation SE
+            SET avg_score = S.avg_score,
+                grade     = CASE WHEN S.avg_score = 5.0 THEN 'Platinum'
+                                 WHEN S.avg_score >= 4.0 THEN 'Gold'
+                                 WHEN S.avg_score >= 3.0 THEN 'Silver'
+                                 ELSE 'Bronze' END
+            FROM (SELECT target_seller_id, AVG(rating) AS avg_score
+                  FROM Feedback
+                  WHERE target_seller_id BETWEEN %s AND %s
+                  GROUP BY target_seller_id
+                  HAVING COUNT(CASE WHEN is_checked THEN 1 END) >= 3) S
+            WHERE SE.seller_id = S.target_seller_id
+            """, (first_primary_id, first_admin_id - 1))
+        execute_timed(cur, 'SellerProfile 등급', """
+            UPDATE SellerProfile SP
+            SET grade = SE.grade
+            FROM SellerEvaluation SE
+            WHERE SP.user_id = SE.seller_id
+              AND SP.user_id BETWEEN %s AND %s
+            """, (first_primary_id, first_admin_id - 1))
+
+        # 생성한 상품의 가격 비교 집계 적재
+        execute_timed(cur, 'ProductPriceSummary', """
+            INSERT INTO ProductPriceSummary (product_id, condition, listing_count, min_price, max_price, avg_price,
+                                             cheapest_listing_id)
+            SELECT product_id,
+                   CASE WHEN GROUPING(condition) = 1 THEN %s ELSE COALESCE(condition::text, %s) END,
+                   COUNT(*), MIN(price), MAX(price), ROUND(AVG(price), 0),
+                   (ARRAY_AGG(listing_id ORDER BY price ASC, listing_id ASC))[1]
+            FROM Listing
+            WHERE product_id BETWEEN %s AND %s
+              AND status = '판매중'
+              AND stock > 0
+            GROUP BY GROUPING SETS ((product_id), (product_id, condition))
+            """, (PRICE_SUMMARY_ALL, PRICE_SUMMARY_NO_CONDITION, first_product_id, first_product_id + products - 1))
+        conn.commit()
+        conn.autocommit = True
+        cur.execute("ANALYZE")
+        print(f"[데이터 생성] 완료 ({time.perf_counter() - started:.1f}초)")
+
+        return {
+            'buyer_ids': list(range(first_buyer_id, first_primary_id)),
+            'seller_ids': list(range(first_primary_id, first_admin_id)),
+            'admin_ids': admin_ids,
+            'product_ids': list(range(first_product_id, first_product_id + products)),
+            'listing_ids': list(range(first_listing_id, first_auction_listing_id)),
+            # 상품별 첫 Listing이 재고가 많은 1차 판매 Listing
+            'primary_listing_ids': list(range(first_listing_id, first_auction_listing_id, listings_per_product)),
+            'auction_ids': list(range(first_auction_id, first_auction_id + auctions)),
+            'auction_ids_by_state': auction_states,
+            'order_id_range': (first_order_id, last_order_id),
+        }
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='대량 테스트 데이터 생성')
+    parser.add_argument('--scale', type=float, default=1.0, help='기본 규모의 배수 (개별 옵션이 우선)')
+    for size_name in DEFAULT_SIZES:
+        parser.add_argument(f"--{size_name.replace('_', '-')}", type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-fk-checks', action='store_true', help='적재 중 외래 키 검사 생략 (슈퍼유저 필요)')
+    args = parser.parse_args()
+
+    # 대량 적재 SQL은 원래 느리므로 앱의 느린 쿼리 로그를 끔
+    app.config['QUERY_STATS_ENABLED'] = False
+    sizes = {}
+    for size_name, default in DEFAULT_SIZES.items():
+        value = getattr(args, size_name)
+        if value is None:
+            # 상품별 Listing 수는 규모와 무관
+            value = default if size_name == 'listings_per_product' else max(1, int(default * args.scale))
+        sizes[size_name] = value
+    generate(seed=args.seed, skip_fk_checks=args.skip_fk_checks, **sizes)
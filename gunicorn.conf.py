@@ -0,0 +1,50 @@
+# gunicorn 운영 설정 (gunicorn -c gunicorn.conf.py wsgi:app)
+# 모든 값은 환경 변수로 덮어쓸 수 있음
+import multiprocessing
+import os
+import random
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+# 워커 프로세스 수: 기본 (CPU 코어 수 * 2 + 1)
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# 워커당 스레드 수: 요청 대부분이 DB 대기이므로 스레드로 동시 처리 수를 늘림
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# 로드 밸런서 뒤에서 연결을 재사용하도록 keep-alive 유지 (LB의 idle timeout보다 길게)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '75'))
+# 마스터에서 앱을 한 번만 불러온 뒤 fork (시작 시간과 메모리 절약, 설정 오류 시 바로 종료)
+preload_app = True
+# 워커 응답 없음 판정 시간 (라우트 deadline보다 충분히 길게)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# 메모리 누수 대비로 일정 요청 수마다 워커 재시작 (동시에 재시작되지 않도록 jitter)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# 워커가 여러 개이므로 /metrics가 모든 워커의 합계를 보여주도록 지표 파일 디렉터리 지정 (app.py의 METRICS_MULTIPROC_DIR)
+os.environ.setdefault('METRICS_MULTIPROC_DIR', '/tmp/app-metrics')
+
+
+def on_starting(server):
+    # 이전 실행에서 남은 워커 지표 파일 정리 (카운터는 서버 시작 시 0부터)
+    directory = os.environ['METRICS_MULTIPROC_DIR']
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.startswith('metrics-'):
+                os.remove(os.path.join(directory, name))
+
+
+def post_fork(server, worker):
+    # preload 후 fork하면 모든 워커가 같은 난수 상태를 물려받음 -> 재시도 지연(jitter) 등이 겹치지 않도록 다시 초기화
+    random.seed()
+
+
+def worker_exit(server, worker):
+    # 종료(max_requests 재시작 포함)되는 워커의 지표를 retired 합계로 넘김
+    from app import metrics_file_store
+    metrics_file_store.close()
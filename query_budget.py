@@ -0,0 +1,100 @@
+# 라우트별 SQL 실행 횟수 검사 도구 (테스트용)
+# 요청 하나가 실행한 SQL 문 수 / DB 왕복 횟수를 세고, 선언한 예산(budget)을 넘거나
+# 같은 형태의 SQL이 반복 실행(N+1 패턴)되면 AssertionError를 발생시킴
+#
+# 사용 예:
+#     from app import app
+#     from query_budget import assert_query_budget
+#
+#     client = app.test_client()
+#     assert_query_budget(client.get, '/cart', max_queries=2, max_repeats=1)
+#
+#     with QueryCounter() as counter:
+#         client.post('/api/cart/update', json={...})
+#     counter.assert_budget(max_queries=4)
+import threading
+
+from app import query_listeners, fingerprint_sql
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# 블록 안에서 실행된 SQL을 기록 (같은 스레드에서 실행된 SQL만 집계)
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+        self._thread_id = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        query_listeners.append(self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        query_listeners.remove(self._record)
+        return False
+
+    def _record(self, query, elapsed, round_trips):
+        if threading.get_ident() != self._thread_id:
+            return
+        fingerprint, normalized = fingerprint_sql(query)
+        self.statements.append({
+            'fingerprint': fingerprint,
+            'sql': normalized,
+            'elapsed_ms': elapsed * 1000,
+            'round_trips': round_trips
+        })
+
+    @property
+    def query_count(self):
+        return len(self.statements)
+
+    @property
+    def round_trips(self):
+        return sum(statement['round_trips'] for statement in self.statements)
+
+    # 같은 지문(fingerprint)의 SQL이 threshold번 이상 실행된 목록 (반복문 안의 쿼리 의심)
+    # executemany도 파라미터 묶음마다 한 번씩 실행된 것으로 셈
+    def repeated(self, threshold=2):
+        counts = {}
+        for statement in self.statements:
+            entry = counts.setdefault(statement['fingerprint'], {'sql': statement['sql'], 'count': 0})
+            entry['count'] += statement['round_trips']
+        return [
+            {'fingerprint': fingerprint, 'sql': entry['sql'], 'count': entry['count']}
+            for fingerprint, entry in counts.items() if entry['count'] >= threshold
+        ]
+
+    def report(self):
+        lines = [f"SQL {self.query_count}개, DB 왕복 {self.round_trips}회"]
+        for index, statement in enumerate(self.statements, 1):
+            lines.append(f"  {index:3d}. [{statement['fingerprint']}] x{statement['round_trips']} "
+                         f"{statement['elapsed_ms']:.1f}ms {statement['sql'][:200]}")
+        return '\n'.join(lines)
+
+    # 예산 초과 시 QueryBudgetExceeded 발생
+    # max_repeats: 같은 형태의 SQL이 허용되는 최대 실행 횟수 (None이면 검사 안 함)
+    def assert_budget(self, max_queries=None, max_round_trips=None, max_repeats=None, label=''):
+        problems = []
+        if max_queries is not None and self.query_count > max_queries:
+            problems.append(f"SQL 수 {self.query_count}개가 예산 {max_queries}개를 초과")
+        if max_round_trips is not None and self.round_trips > max_round_trips:
+            problems.append(f"DB 왕복 {self.round_trips}회가 예산 {max_round_trips}회를 초과")
+        if max_repeats is not None:
+            for entry in self.repeated(threshold=max_repeats + 1):
+                problems.append(f"같은 형태의 SQL이 {entry['count']}회 반복 실행됨 (N+1 의심): {entry['sql'][:200]}")
+        if problems:
+            title = f"쿼리 예산 초과 {label}".rstrip()
+            raise QueryBudgetExceeded(f"{title}\n" + '\n'.join(f"- {problem}" for problem in problems)
+                                      + '\n' + self.report())
+
+
+# 요청 함수(client.get, client.post 등)를 실행하고 예산을 검사한 뒤 응답과 카운터를 반환
+def assert_query_budget(request_func, url, max_queries=None, max_round_trips=None, max_repeats=None, **kwargs):
+    with QueryCounter() as counter:
+        response = request_func(url, **kwargs)
+    counter.assert_budget(max_queries=max_queries, max_round_trips=max_round_trips,
+                          max_repeats=max_repeats, label=url)
+    return response, counter
@@ -0,0 +1,42 @@
+-- 한정 판매(flash sale) 주문 대기열
+-- FlashSaleListing에 등록한 판매 목록은 /api/order/place가 Listing을 잠그지 않고 FlashSaleTicket에 대기표만 넣는다.
+-- app.py의 FlashSaleConsumer가 판매 목록마다 하나씩(advisory lock) 대기표를 접수 순서대로 묶어서 처리하고,
+-- 묶음마다 Listing 잠금 한 번과 SQL 한 문장으로 재고 차감/주문 생성/대기표 결과 기록을 한다.
+--
+-- 한정 판매 지정/해제 (앱은 FLASH_SALE_LISTING_CACHE_TTL초 안에 반영):
+--   INSERT INTO FlashSaleListing (listing_id) VALUES (123);
+--   DELETE FROM FlashSaleListing WHERE listing_id = 123;  -- 남은 대기표는 계속 처리됨
+
+CREATE TABLE IF NOT EXISTS FlashSaleListing (
+    listing_id INT       PRIMARY KEY REFERENCES Listing (listing_id),
+    created_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'KST')
+);
+
+CREATE TABLE IF NOT EXISTS FlashSaleTicket (
+    ticket_id     BIGSERIAL    PRIMARY KEY,                 -- 접수 순서
+    listing_id    INT          NOT NULL REFERENCES Listing (listing_id),
+    buyer_id      INT          NOT NULL REFERENCES Users (user_id),
+    quantity      INT          NOT NULL CHECK (quantity > 0),
+    cart_id       INT,                                      -- 장바구니에서 주문한 경우 확정 시 장바구니에서 삭제
+    status        VARCHAR(20)  NOT NULL DEFAULT 'queued',   -- queued / confirmed / rejected
+    order_id      INT          REFERENCES Orderb (order_id), -- 확정된 주문
+    reject_reason VARCHAR(200),
+    created_at    TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    processed_at  TIMESTAMPTZ
+);
+
+-- 소비자: 판매 목록별 대기 중인 대기표를 접수 순서대로 (처리된 대기표는 인덱스에서 빠짐)
+CREATE INDEX IF NOT EXISTS idx_flash_sale_ticket_queued
+    ON FlashSaleTicket (listing_id, ticket_id)
+    WHERE status = 'queued';
+
+-- 구매자별 대기표 조회
+CREATE INDEX IF NOT EXISTS idx_flash_sale_ticket_buyer
+    ON FlashSaleTicket (buyer_id, ticket_id);
+
+-- 구매자는 대기표를 넣고 자기 대기표를 조회, 소비자는 앱 기본 계정으로 처리
+GRANT SELECT ON FlashSaleListing TO buyer_role, primary_seller_role, reseller_role, administrator_role;
+GRANT INSERT, UPDATE, DELETE ON FlashSaleListing TO administrator_role;
+GRANT SELECT, INSERT ON FlashSaleTicket TO buyer_role;
+GRANT SELECT ON FlashSaleTicket TO administrator_role, system_developer_role;
+GRANT USAGE ON SEQUENCE flashsaleticket_ticket_id_seq TO buyer_role;
@@ -0,0 +1,26 @@
+-- 멱등성 키(Idempotency-Key) 저장 테이블
+-- 주문/입찰/분쟁 요청 API가 같은 키로 재시도되면 app.py의 idempotent 데코레이터가
+-- 처음 요청의 응답을 이 테이블에서 돌려주고, Listing/Auction/Orderb는 다시 건드리지 않는다.
+-- 워커/서버가 여러 대여도 같은 키는 한 번만 실행되도록 (user_id, endpoint, idem_key)를 기본 키로 둔다.
+
+CREATE TABLE IF NOT EXISTS IdempotencyKey (
+    user_id         INT          NOT NULL,
+    endpoint        VARCHAR(100) NOT NULL,
+    idem_key        VARCHAR(255) NOT NULL,
+    request_hash    CHAR(64)     NOT NULL,                      -- 요청 본문 SHA-256 (같은 키로 다른 요청을 보내면 거부)
+    state           VARCHAR(20)  NOT NULL DEFAULT 'in_progress', -- in_progress / committed(처리 커밋, 응답 저장 전) / done
+    response_status INT,
+    response_body   TEXT,
+    content_type    VARCHAR(100),
+    created_at      TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    expires_at      TIMESTAMPTZ  NOT NULL,
+    PRIMARY KEY (user_id, endpoint, idem_key)
+);
+
+-- 만료된 키 정리용
+CREATE INDEX IF NOT EXISTS idx_idempotency_key_expires
+    ON IdempotencyKey (expires_at);
+
+-- 멱등성 키를 쓰는 API(주문/입찰/분쟁)를 호출하는 역할
+GRANT SELECT, INSERT, UPDATE, DELETE ON IdempotencyKey TO buyer_role, primary_seller_role, reseller_role,
+    administrator_role;
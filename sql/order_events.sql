@@ -0,0 +1,41 @@
+-- 주문 상태 변경 이벤트 로그 (추가 전용)
+-- 주문 생성/상태 변경 트랜잭션 안에서 app.py의 record_order_events()가 한 번의 INSERT로 기록하고,
+-- 같은 문장에서 pg_notify('order_events', ...)를 보내 커밋과 동시에 구독자에게 전달한다.
+-- 구독자(집계, 캐시, 판매자 주문 피드)는 마지막으로 처리한 event_id 이후만 읽으면 되므로 Orderb를 다시 훑지 않는다.
+
+CREATE TABLE IF NOT EXISTS OrderEvent (
+    event_id    BIGSERIAL   PRIMARY KEY,
+    order_id    INT         NOT NULL REFERENCES Orderb (order_id),
+    buyer_id    INT         NOT NULL,
+    seller_id   INT         NOT NULL,
+    event_type  VARCHAR(30) NOT NULL,  -- placed, auction_won, status_advanced, dispute_opened, ...
+    from_status VARCHAR(20),           -- 주문 생성 이벤트는 NULL
+    to_status   VARCHAR(20) NOT NULL,
+    created_at  TIMESTAMP   NOT NULL DEFAULT (NOW() AT TIME ZONE 'KST')
+);
+
+-- 주문별 이력 조회
+CREATE INDEX IF NOT EXISTS idx_order_event_order
+    ON OrderEvent (order_id, event_id);
+
+-- 판매자 주문 피드: 특정 판매자의 event_id 이후 이벤트
+CREATE INDEX IF NOT EXISTS idx_order_event_seller
+    ON OrderEvent (seller_id, event_id);
+
+-- 추가 전용: 기록된 이벤트는 수정/삭제할 수 없다.
+CREATE OR REPLACE FUNCTION order_event_append_only() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'OrderEvent는 추가 전용 테이블입니다. (%)', TG_OP;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_order_event_append_only ON OrderEvent;
+CREATE TRIGGER trg_order_event_append_only
+    BEFORE UPDATE OR DELETE ON OrderEvent
+    FOR EACH ROW EXECUTE FUNCTION order_event_append_only();
+
+-- 주문 상태를 바꾸는 모든 역할이 이벤트를 기록하고, 구독자가 읽을 수 있어야 한다.
+GRANT SELECT, INSERT ON OrderEvent TO buyer_role, primary_seller_role, reseller_role, administrator_role;
+GRANT SELECT ON OrderEvent TO system_developer_role;
+GRANT USAGE ON SEQUENCE orderevent_event_id_seq TO buyer_role, primary_seller_role, reseller_role,
+    administrator_role;
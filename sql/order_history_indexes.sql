@@ -0,0 +1,23 @@
+-- 구매자 주문 내역(마이페이지 주문/배송 내역, 후기 탭) keyset 페이지네이션용 인덱스
+-- app.py의 get_orders_for_buyer()는 (order_date, order_id) 내림차순으로 한 페이지씩 읽는다.
+-- 주문 이력이 길어도 인덱스 범위의 앞부분(페이지 크기 + 1건)만 읽도록 정렬 순서까지 맞춘다.
+
+-- 주문/배송 내역 (전체)
+CREATE INDEX IF NOT EXISTS idx_orderb_buyer_date
+    ON Orderb (buyer_id, order_date DESC, order_id DESC);
+
+-- 주문/배송 내역 (배송 상태 필터)
+CREATE INDEX IF NOT EXISTS idx_orderb_buyer_status_date
+    ON Orderb (buyer_id, status, order_date DESC, order_id DESC);
+
+-- 후기 탭: 구매 확정 주문을 후기 작성 여부 구간별로 최신순 조회
+CREATE INDEX IF NOT EXISTS idx_orderb_buyer_confirmed_feedback_date
+    ON Orderb (buyer_id, feedback_submitted, order_date DESC, order_id DESC)
+    WHERE status = '구매 확정';
+
+-- 한 페이지의 주문마다 분쟁/후기를 찾기 위한 인덱스
+CREATE INDEX IF NOT EXISTS idx_dispute_order
+    ON Dispute (order_id);
+
+CREATE INDEX IF NOT EXISTS idx_feedback_order
+    ON Feedback (order_id);
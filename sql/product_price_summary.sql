@@ -0,0 +1,47 @@
+-- 상품(Product)별 가격 비교 집계 테이블
+-- 동일 Product를 여러 판매자가 등록한 경우, 판매중인 Listing들의 가격 통계를 미리 계산해 둔다.
+-- condition = '전체' 행은 상품 전체 집계, 그 외 행은 상품 상태(condition)별 집계이다.
+-- (1차 판매처럼 condition이 없는 Listing은 '미표기'로 집계)
+-- 갱신은 app.py의 refresh_product_price_summary()가 Listing 변경 트랜잭션 안에서 수행한다.
+
+CREATE TABLE IF NOT EXISTS ProductPriceSummary (
+    product_id          INT         NOT NULL REFERENCES Product (product_id) ON DELETE CASCADE,
+    condition           VARCHAR(20) NOT NULL,
+    listing_count       INT         NOT NULL,
+    min_price           NUMERIC     NOT NULL,
+    max_price           NUMERIC     NOT NULL,
+    avg_price           NUMERIC     NOT NULL,
+    cheapest_listing_id INT         NOT NULL REFERENCES Listing (listing_id) ON DELETE CASCADE,
+    updated_at          TIMESTAMP   NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (product_id, condition)
+);
+
+-- 카탈로그 '상품별 보기'는 condition = '전체' 행만 읽는다.
+CREATE INDEX IF NOT EXISTS idx_price_summary_all
+    ON ProductPriceSummary (condition, min_price);
+
+-- 집계 갱신 시 product_id 단위로 판매중 Listing을 찾기 위한 인덱스
+CREATE INDEX IF NOT EXISTS idx_listing_product_status
+    ON Listing (product_id, status);
+
+-- 기존 데이터 초기 적재 (최초 1회)
+TRUNCATE ProductPriceSummary;
+INSERT INTO ProductPriceSummary (product_id, condition, listing_count, min_price, max_price, avg_price,
+                                 cheapest_listing_id)
+SELECT product_id,
+       CASE WHEN GROUPING(condition) = 1 THEN '전체' ELSE COALESCE(condition::text, '미표기') END,
+       COUNT(*),
+       MIN(price),
+       MAX(price),
+       ROUND(AVG(price), 0),
+       (ARRAY_AGG(listing_id ORDER BY price ASC, listing_id ASC))[1]
+FROM Listing
+WHERE status = '판매중'
+  AND stock > 0
+GROUP BY GROUPING SETS ((product_id), (product_id, condition));
+
+-- 판매자/구매자/관리자 모두 Listing 변경 트랜잭션에서 집계를 갱신하므로 쓰기 권한이 필요하다.
+GRANT SELECT ON ProductPriceSummary TO buyer_role, primary_seller_role, reseller_role, administrator_role,
+    system_developer_role;
+GRANT INSERT, UPDATE, DELETE ON ProductPriceSummary TO buyer_role, primary_seller_role, reseller_role,
+    administrator_role;
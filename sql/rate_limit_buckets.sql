@@ -0,0 +1,14 @@
+-- 요청 속도 제한(토큰 버킷) 공유 저장소
+-- RATE_LIMIT_BACKEND=postgres일 때 app.py의 PostgresTokenBuckets가 사용한다. (기본값 memory는 워커마다 따로 제한)
+-- 여러 워커/서버가 같은 사용자별/상품별 한도를 지키도록 버킷 상태(남은 토큰, 마지막 갱신 시각)를 행 하나로 둔다.
+-- 버킷은 잃어버려도 다시 가득 찬 상태로 시작하면 되므로 WAL을 남기지 않는 UNLOGGED 테이블로 만든다.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS RateLimitBucket (
+    bucket_key VARCHAR(200)     PRIMARY KEY,  -- 예: auction_bid:user:12, listing:34
+    tokens     DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ      NOT NULL DEFAULT clock_timestamp()
+);
+
+-- 오래된 버킷 정리용
+CREATE INDEX IF NOT EXISTS idx_rate_limit_bucket_updated
+    ON RateLimitBucket (updated_at);
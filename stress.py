@@ -0,0 +1,277 @@
+# 동시성 스트레스 테스트 (경매 입찰 / 재고 차감 정합성 검사)
+# 하나의 인기 Listing/경매에 여러 프로세스 x 스레드로 동시에 주문/입찰을 보내고
+# 처리량, 잠금 대기 시간(FOR UPDATE 문 실행 시간)을 측정한 뒤 불변 조건을 검사함
+# - 주문: 재고가 음수가 되지 않고, 성공한 주문 수량 합 = 감소한 재고, 재고 0이면 '품절'
+# - 입찰: current_price가 감소하지 않고, 최종 current_price = 성공한 입찰 중 최고가
+# - 경매 종료: 동시에 여러 번 종료 요청해도 낙찰 주문은 정확히 1건
+# 불변 조건이 하나라도 깨지면 종료 코드 1
+#
+# 사용 예:
+#     python stress.py --mode all --processes 4 --threads 16 --requests 2000 --stock 500
+#
+# 입장 제어(RATE_LIMIT_ENABLED)는 기본으로 끄고 실행 (켜면 대부분 429로 거절되어 잠금 경합이 측정되지 않음)
+# --rate-limit으로 켜면 429 응답 수는 rate_limited로 따로 세고, 지연/잠금 대기는 429를 뺀 요청으로만 계산
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+
+import datagen
+from app import app, open_db_connection, query_listeners, percentile
+
+# 스레드별 현재 요청의 잠금 대기 시간 누적
+lock_wait = threading.local()
+
+
+def record_lock_wait(query, elapsed, round_trips):
+    if getattr(lock_wait, 'active', False) and 'FOR UPDATE' in query.upper():
+        lock_wait.seconds += elapsed
+
+
+def buyer_client(buyer_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = buyer_id
+        sess['user_role'] = 'Buyer'
+        sess['user_name'] = f"사용자{buyer_id}"
+    return client
+
+
+def db_fetchone(query, params=None):
+    conn = open_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            row = cur.fetchone()
+        conn.commit()
+        return row
+    finally:
+        conn.close()
+
+
+# --- 작업자 프로세스: threads개 스레드로 요청을 나눠 보내고 (지연, 잠금 대기, 상태, 응답) 목록 반환 ---
+def run_worker(args):
+    mode, target_id, buyer_ids, requests, threads, seed, started_at, rate_limit = args
+    query_listeners.append(record_lock_wait)
+    app.config['QUERY_STATS_ENABLED'] = False  # 경합 중 느린 쿼리 로그 억제
+    app.config['RATE_LIMIT_ENABLED'] = rate_limit  # spawn으로 만든 프로세스는 부모의 설정 변경을 물려받지 않음
+    samples = []
+    samples_lock = threading.Lock()
+
+    def thread_main(index):
+        rng = random.Random(f"{seed}-{index}")
+        local_samples = []
+        for number in range(index, requests, threads):
+            buyer_id = buyer_ids[number % len(buyer_ids)]
+            client = buyer_client(buyer_id)
+            lock_wait.active = True
+            lock_wait.seconds = 0.0
+            start = time.perf_counter()
+            if mode == 'order':
+                response = client.post('/api/order/place',
+                                       json={'items': [{'listing_id': target_id, 'quantity': 1}]})
+            elif mode == 'bid':
+                # 시간이 지날수록 오르는 입찰가 (같은 순간의 입찰끼리는 가격이 겹치거나 역전되어 경합)
+                bid_price = 1000000 + int((time.time() - started_at) * 10000) + rng.randrange(0, 500)
+                response = client.post('/api/auction/bid', json={'auction_id': target_id, 'bid_price': bid_price})
+            else:
+                response = client.post('/api/auction/finalize', json={'auction_id': target_id})
+            elapsed = time.perf_counter() - start
+            lock_wait.active = False
+            local_samples.append((elapsed, lock_wait.seconds, response.status_code, buyer_id, response.get_json()))
+        with samples_lock:
+            samples.extend(local_samples)
+
+    workers = [threading.Thread(target=thread_main, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def run_load(mode, target_id, buyer_ids, total_requests, processes, threads, seed, rate_limit=False):
+    per_process = [total_requests // processes + (1 if index < total_requests % processes else 0)
+                   for index in range(processes)]
+    started_at = time.time()
+    tasks = [(mode, target_id, buyer_ids, count, threads, f"{seed}-{mode}-{index}", started_at, rate_limit)
+             for index, count in enumerate(per_process) if count]
+    start = time.perf_counter()
+    if processes == 1:
+        results = [run_worker(task) for task in tasks]
+    else:
+        with multiprocessing.get_context('spawn').Pool(len(tasks)) as pool:
+            results = pool.map(run_worker, tasks)
+    wall_seconds = time.perf_counter() - start
+    return [sample for result in results for sample in result], wall_seconds
+
+
+def summarize(samples, wall_seconds):
+    # 입장 제어가 바로 돌려보낸 429는 지연/잠금 대기 통계에서 제외
+    admitted = [sample for sample in samples if sample[2] != 429]
+    latencies = sorted(sample[0] * 1000 for sample in admitted)
+    lock_waits = sorted(sample[1] * 1000 for sample in admitted)
+    status_counts = {}
+    for sample in samples:
+        status_counts[str(sample[2])] = status_counts.get(str(sample[2]), 0) + 1
+    return {
+        'requests': len(samples),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0,
+        'status_counts': status_counts,
+        'rate_limited': status_counts.get('429', 0),
+        'latency_ms': {'p50': round(percentile(latencies, 50), 2), 'p95': round(percentile(latencies, 95), 2),
+                       'p99': round(percentile(latencies, 99), 2)},
+        'lock_wait_ms': {'p50': round(percentile(lock_waits, 50), 2), 'p95': round(percentile(lock_waits, 95), 2),
+                         'p99': round(percentile(lock_waits, 99), 2), 'total': round(sum(lock_waits), 1)},
+    }
+
+
+# 경매 current_price를 주기적으로 읽어 감소한 적이 있는지 확인
+class PriceMonitor(threading.Thread):
+    def __init__(self, auction_id, interval=0.01):
+        super().__init__(daemon=True)
+        self.auction_id = auction_id
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.decreases = []
+        self.samples = 0
+
+    def run(self):
+        conn = open_db_connection()
+        conn.autocommit = True
+        cur = conn.cursor()
+        last_price = None
+        try:
+            while not self.stopped.is_set():
+                cur.execute("SELECT current_price FROM Auction WHERE auction_id = %s", (self.auction_id,))
+                price = cur.fetchone()[0]
+                self.samples += 1
+                if last_price is not None and price < last_price:
+                    self.decreases.append((float(last_price), float(price)))
+                last_price = price
+                time.sleep(self.interval)
+        finally:
+            cur.close()
+            conn.close()
+
+
+def stress_orders(listing_id, stock, buyer_ids, args):
+    # 재고를 지정한 값으로 맞추고 판매중 상태로 초기화
+    db_fetchone("UPDATE Listing SET stock = %s, status = '판매중' WHERE listing_id = %s RETURNING stock",
+                (stock, listing_id))
+    first_order_id = db_fetchone("SELECT COALESCE(MAX(order_id), 0) + 1 FROM Orderb")[0]
+
+    samples, wall_seconds = run_load('order', listing_id, buyer_ids, args.requests, args.processes, args.threads,
+                                     args.seed, args.rate_limit)
+    final_stock, final_status = db_fetchone("SELECT stock, status FROM Listing WHERE listing_id = %s", (listing_id,))
+    ordered_quantity = db_fetchone(
+        "SELECT COALESCE(SUM(quantity), 0) FROM Orderb WHERE listing_id = %s AND order_id >= %s",
+        (listing_id, first_order_id))[0]
+    succeeded = sum(1 for sample in samples if sample[2] == 200)
+
+    checks = {
+        'stock_not_negative': final_stock >= 0,
+        'no_oversell': ordered_quantity <= stock,
+        'stock_matches_orders': stock - final_stock == ordered_quantity,
+        'orders_match_success_responses': ordered_quantity == succeeded,
+        'sold_out_status': (final_status == '품절') == (final_stock == 0),
+    }
+    result = summarize(samples, wall_seconds)
+    result.update({'listing_id': listing_id, 'initial_stock': stock, 'final_stock': final_stock,
+                   'ordered_quantity': int(ordered_quantity), 'checks': checks})
+    return result
+
+
+def stress_bids(auction_id, buyer_ids, args):
+    monitor = PriceMonitor(auction_id)
+    monitor.start()
+    samples, wall_seconds = run_load('bid', auction_id, buyer_ids, args.requests, args.processes, args.threads,
+                                     args.seed, args.rate_limit)
+    monitor.stopped.set()
+    monitor.join()
+
+    current_price, highest_bidder = db_fetchone(
+        "SELECT current_price, current_highest_bidder_id FROM Auction WHERE auction_id = %s", (auction_id,))
+    accepted = [(sample[4]['new_price'], sample[3]) for sample in samples if sample[2] == 200]
+    best_price = max((price for price, _ in accepted), default=None)
+
+    checks = {
+        'price_never_decreased': not monitor.decreases,
+        'final_price_is_highest_accepted_bid': best_price is None or current_price == best_price,
+        'highest_bidder_placed_highest_bid': best_price is None or (best_price, highest_bidder) in accepted,
+    }
+    result = summarize(samples, wall_seconds)
+    result.update({'auction_id': auction_id, 'accepted_bids': len(accepted), 'final_price': float(current_price),
+                   'price_samples': monitor.samples, 'checks': checks})
+    return result
+
+
+def stress_finalize(auction_id, buyer_ids, args):
+    # 경매를 이미 끝난 상태로 만든 뒤 여러 요청이 동시에 종료 처리
+    listing_id = db_fetchone("UPDATE Auction SET end_date = NOW() AT TIME ZONE 'KST' - interval '1 minute' "
+                             "WHERE auction_id = %s RETURNING listing_id", (auction_id,))[0]
+    has_winner = db_fetchone("SELECT current_highest_bidder_id FROM Auction WHERE auction_id = %s",
+                             (auction_id,))[0] is not None
+    requests = max(args.processes * args.threads, 2)
+    samples, wall_seconds = run_load('finalize', auction_id, buyer_ids, requests, args.processes, args.threads,
+                                     args.seed, args.rate_limit)
+    winning_orders = db_fetchone("SELECT COUNT(*) FROM Orderb WHERE listing_id = %s", (listing_id,))[0]
+    listing_status = db_fetchone("SELECT status FROM Listing WHERE listing_id = %s", (listing_id,))[0]
+
+    checks = {
+        'exactly_one_winning_order': winning_orders == (1 if has_winner else 0),
+        'listing_closed': listing_status == '판매 종료',
+    }
+    result = summarize(samples, wall_seconds)
+    result.update({'auction_id': auction_id, 'winning_orders': winning_orders, 'checks': checks})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='경매 입찰/재고 차감 동시성 스트레스 테스트')
+    parser.add_argument('--mode', choices=['order', 'bid', 'all'], default='all')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16, help='프로세스별 스레드 수')
+    parser.add_argument('--requests', type=int, default=1000, help='시나리오별 요청 수')
+    parser.add_argument('--stock', type=int, default=300, help='주문 대상 Listing의 초기 재고 (요청 수보다 적게 두면 품절 경합)')
+    parser.add_argument('--buyers', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rate-limit', action='store_true', help='입장 제어(요청 속도/동시 실행 수 제한)를 켠 채로 측정')
+    parser.add_argument('--output', default='stress.json', help='결과 JSON 파일 경로')
+    args = parser.parse_args()
+
+    app.config['QUERY_STATS_ENABLED'] = False
+    app.config['RATE_LIMIT_ENABLED'] = args.rate_limit
+    # 대상 Listing/경매가 들어 있는 작은 데이터셋 생성 (경매는 진행 중인 것 1건 사용)
+    dataset = datagen.generate(buyers=args.buyers, sellers=10, admins=1, products=20, auctions=4, orders=0,
+                               seed=args.seed)
+    results = {}
+    if args.mode in ('order', 'all'):
+        results['order'] = stress_orders(dataset['primary_listing_ids'][0], args.stock, dataset['buyer_ids'], args)
+    if args.mode in ('bid', 'all'):
+        auction_id = dataset['auction_ids_by_state']['live'][0]
+        results['bid'] = stress_bids(auction_id, dataset['buyer_ids'], args)
+        results['finalize'] = stress_finalize(auction_id, dataset['buyer_ids'], args)
+
+    failed = [f"{name}.{check}" for name, result in results.items()
+              for check, passed in result['checks'].items() if not passed]
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'config': vars(args), 'results': results, 'failed_checks': failed}, f, ensure_ascii=False,
+                  indent=2)
+        f.write('\n')
+
+    for name, result in results.items():
+        print(f"[스트레스] {name}: {result['throughput_rps']} req/s, 잠금 대기 p95 {result['lock_wait_ms']['p95']}ms, "
+              f"상태 {result['status_counts']}, 429 {result['rate_limited']}건", file=sys.stderr)
+    if failed:
+        print(f"[스트레스] 불변 조건 위반: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"[스트레스] 모든 불변 조건 통과 (결과: {args.output})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# 라우트별 SQL 실행 횟수 예산 테스트 (query_budget.py 사용)
+# datagen.py로 데이터를 넣은 DB가 필요하며, DB에 접속할 수 없으면 건너뜀
+#
+#     python -m pytest -q test_query_budgets.py
+#
+# 예산을 넘거나 같은 형태의 SQL이 반복 실행(N+1)되면 실행된 SQL 목록과 함께 실패함
+# 쿼리를 줄이거나 늘리는 변경을 했다면 아래 예산 표를 함께 고칠 것
+import psycopg2
+import pytest
+
+import app as appmod
+from query_budget import assert_query_budget
+
+
+def db_available():
+    try:
+        appmod.open_db_connection().close()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not db_available(), reason="DB에 접속할 수 없음")
+
+# 조회 라우트 예산: (url, 최대 SQL 수, 같은 형태 SQL의 최대 반복 수)
+READ_ROUTE_BUDGETS = [
+    ('/', 1, 1),
+    ('/search?query=a', 1, 1),
+    ('/category/auction', 1, 1),
+    ('/product/{listing_id}', 1, 1),
+    ('/cart', 1, 1),
+    ('/mypage', 1, 1),
+    ('/mypage?view=orders', 2, 1),
+]
+
+
+def fetch_one(query):
+    conn = appmod.open_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(query)
+        return cur.fetchone()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope='module')
+def buyer_id():
+    row = fetch_one("SELECT user_id FROM Users WHERE role = 'Buyer' ORDER BY user_id LIMIT 1")
+    if row is None:
+        pytest.skip("구매자 계정이 없음 (datagen.py 실행 필요)")
+    return row[0]
+
+
+@pytest.fixture(scope='module')
+def listing_id():
+    row = fetch_one("SELECT listing_id FROM Listing WHERE status = '판매중' AND stock > 0 "
+                    "AND listing_type <> 'Resale' ORDER BY listing_id LIMIT 1")
+    if row is None:
+        pytest.skip("판매중인 상품이 없음 (datagen.py 실행 필요)")
+    return row[0]
+
+
+# 서로 다른 상품의 판매중인 판매 목록 2개 (항목마다 SQL이 반복되면 반복 수 검사에 걸리도록)
+@pytest.fixture(scope='module')
+def two_listing_ids():
+    conn = appmod.open_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT MIN(listing_id) FROM Listing L
+            WHERE status = '판매중' AND stock >= 5 AND listing_type <> 'Resale'
+              AND NOT EXISTS (SELECT 1 FROM FlashSaleListing F WHERE F.listing_id = L.listing_id)
+            GROUP BY product_id ORDER BY 1 LIMIT 2
+            """
+        )
+        listing_ids = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+    if len(listing_ids) < 2:
+        pytest.skip("서로 다른 상품의 판매중인 판매 목록이 2개 이상 필요함")
+    return listing_ids
+
+
+# 장바구니가 비어 있는 구매자 (쓰기 테스트가 기존 장바구니를 건드리지 않도록)
+@pytest.fixture(scope='module')
+def empty_cart_buyer_id():
+    row = fetch_one("SELECT user_id FROM Users U WHERE role = 'Buyer' "
+                    "AND NOT EXISTS (SELECT 1 FROM ShoppingCart C WHERE C.buyer_id = U.user_id) "
+                    "ORDER BY user_id LIMIT 1")
+    if row is None:
+        pytest.skip("장바구니가 비어 있는 구매자가 없음")
+    return row[0]
+
+
+def make_client(user_id):
+    appmod.app.config.update(RATE_LIMIT_ENABLED=False, DB_REPLICA_DSNS=[], SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+    # 캐시에 남은 결과로 쿼리 수가 줄어 보이지 않도록 비움
+    for cache in (appmod.product_detail_cache, appmod.user_profile_cache, appmod.last_good_cache,
+                  appmod.flash_sale_listing_cache):
+        cache.clear()
+    test_client = appmod.app.test_client()
+    with test_client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_role'] = 'Buyer'
+        session['user_name'] = 'budget-test'
+    return test_client
+
+
+@pytest.fixture
+def client(buyer_id):
+    return make_client(buyer_id)
+
+
+@pytest.mark.parametrize('url, max_queries, max_repeats', READ_ROUTE_BUDGETS)
+def test_read_route_budget(client, listing_id, url, max_queries, max_repeats):
+    response, _ = assert_query_budget(client.get, url.format(listing_id=listing_id),
+                                      max_queries=max_queries, max_repeats=max_repeats)
+    assert response.status_code == 200
+
+
+# 장바구니 추가(2개 상품) -> 수량 변경 -> 삭제 (테스트가 만든 장바구니 항목은 마지막에 삭제됨)
+def test_cart_write_route_budgets(two_listing_ids, empty_cart_buyer_id):
+    buyer_id = empty_cart_buyer_id
+    client = make_client(buyer_id)
+    for listing_id in two_listing_ids:
+        response, _ = assert_query_budget(client.post, '/api/cart/add', max_queries=4, max_repeats=1,
+                                          json={'listing_id': listing_id, 'quantity': 1})
+        assert response.status_code == 200
+
+    conn = appmod.open_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT cart_id FROM ShoppingCart WHERE buyer_id = %s", (buyer_id,))
+        cart_ids = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+    assert len(cart_ids) == 2
+    try:
+        # 항목 수와 관계없이 일정한 수의 SQL로 처리해야 함 (항목별 반복 쿼리 금지)
+        response, _ = assert_query_budget(client.post, '/api/cart/update', max_queries=3, max_repeats=1,
+                                          json={'items': [{'cart_id': cart_id, 'quantity': 1}
+                                                          for cart_id in cart_ids]})
+        assert response.status_code == 200
+    finally:
+        response, _ = assert_query_budget(client.post, '/api/cart/remove', max_queries=2, max_repeats=1,
+                                          json={'cart_ids': cart_ids})
+        assert response.status_code == 200
+
+
+# 주문 2건(서로 다른 상품)도 항목 수와 관계없이 일정한 수의 SQL로 처리해야 함
+# 커밋 대신 롤백해서 주문/재고/주문 이벤트(추가 전용)를 DB에 남기지 않음
+def test_place_order_budget(monkeypatch, two_listing_ids, buyer_id):
+    monkeypatch.setattr(appmod.InstrumentedConnection, 'commit', lambda self: self.rollback())
+    client = make_client(buyer_id)
+    response, _ = assert_query_budget(client.post, '/api/order/place', max_queries=8, max_repeats=1,
+                                      json={'items': [{'listing_id': listing_id, 'quantity': 1}
+                                                      for listing_id in two_listing_ids]})
+    assert response.status_code == 200
+    assert len(response.get_json()['order_ids']) == 2
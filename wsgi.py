@@ -0,0 +1,9 @@
+# 운영 서버(WSGI) 진입점
+# SECRET_KEY / ADMIN_AUTH_CODE / DB_PASSWORD 등은 환경 변수나 *_FILE(비밀 파일 경로)로 전달해야 함
+#
+# 사용 예:
+#     SECRET_KEY_FILE=/run/secrets/flask_secret ADMIN_AUTH_CODE_FILE=/run/secrets/admin_code DB_HOST=db.internal \
+#         gunicorn -c gunicorn.conf.py wsgi:app
+from app import create_app
+
+app = create_app(require_secret=True)